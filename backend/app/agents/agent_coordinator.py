@@ -1,26 +1,19 @@
 from typing import Dict, Any, List, Optional
-from app.agents.requirement_reviewer import RequirementReviewer
-from app.agents.price_reference import PriceReference
-from app.agents.contract_analyzer import ContractAnalyzer
-from app.knowledge.knowledge_base import KnowledgeBase
+from app.agents.registry import AgentRegistry, agent_registry
 
 
 class AgentCoordinator:
     """智能体协调器 - 增强版，支持跨智能体协作和综合分析"""
 
-    def __init__(self):
-        self.requirement_reviewer = RequirementReviewer()
-        self.price_reference = PriceReference()
-        self.contract_analyzer = ContractAnalyzer()
+    def __init__(self, registry: Optional[AgentRegistry] = None):
+        # 从进程级注册表获取共享智能体（首次使用时才构造）
+        registry = registry or agent_registry
+        self.requirement_reviewer = registry.proxy("requirement_reviewer")
+        self.price_reference = registry.proxy("price_reference")
+        self.contract_analyzer = registry.proxy("contract_analyzer")
 
-        # 初始化知识库
-        self.knowledge_base = None
-        try:
-            self.knowledge_base = KnowledgeBase()
-            print("知识库初始化成功")
-        except Exception as e:
-            print(f"知识库初始化失败: {e}")
-            print("将继续使用基础功能")
+        # 知识库初始化失败时注册表返回 None，继续使用基础功能
+        self.knowledge_base = registry.proxy("knowledge_base")
 
     def analyze_procurement_scenario(self, product_type: str, requirements: str) -> Dict[str, Any]:
         """
@@ -1,11 +1,16 @@
+import asyncio
 import os
+import threading
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from langchain.memory import ConversationBufferMemory
 from langchain.schema import BaseMessage, HumanMessage, AIMessage
 
+from app.agents.chat_context import ChatContextPacker, ContextState
+
 # LLM客户端 - 延迟加载
 _openai_client = None
+_async_openai_client = None
 _llm_available = None
 
 # 支持的LLM提供商配置
@@ -28,6 +33,33 @@ LLM_PROVIDERS = {
 }
 
 
+def _resolve_llm_config() -> Optional[Dict[str, Any]]:
+    """按优先级检测API Key：GLM > DASHSCOPE > OPENAI，未配置时返回None"""
+    # 检测GLM（智谱AI）
+    if os.getenv("GLM_API_KEY"):
+        return {"api_key": os.getenv("GLM_API_KEY"),
+                "base_url": os.getenv("GLM_BASE_URL") or LLM_PROVIDERS["glm"]["base_url"],
+                "provider": "GLM(智谱AI)"}
+    # 检测通义千问
+    if os.getenv("DASHSCOPE_API_KEY"):
+        return {"api_key": os.getenv("DASHSCOPE_API_KEY"),
+                "base_url": os.getenv("DASHSCOPE_BASE_URL") or LLM_PROVIDERS["dashscope"]["base_url"],
+                "provider": "通义千问"}
+    # 检测OpenAI
+    if os.getenv("OPENAI_API_KEY"):
+        return {"api_key": os.getenv("OPENAI_API_KEY"),
+                "base_url": os.getenv("OPENAI_BASE_URL"),
+                "provider": "OpenAI"}
+    return None
+
+
+def _client_kwargs(config: Dict[str, Any]) -> Dict[str, Any]:
+    client_kwargs = {"api_key": config["api_key"]}
+    if config["base_url"]:
+        client_kwargs["base_url"] = config["base_url"]
+    return client_kwargs
+
+
 def _get_openai_client():
     """获取OpenAI兼容客户端（延迟加载）"""
     global _openai_client, _llm_available
@@ -38,40 +70,16 @@ def _get_openai_client():
     try:
         from openai import OpenAI
 
-        # 按优先级检测API Key：GLM > DASHSCOPE > OPENAI
-        api_key = None
-        base_url = None
-        provider_name = None
-
-        # 检测GLM（智谱AI）
-        if os.getenv("GLM_API_KEY"):
-            api_key = os.getenv("GLM_API_KEY")
-            base_url = os.getenv("GLM_BASE_URL") or LLM_PROVIDERS["glm"]["base_url"]
-            provider_name = "GLM(智谱AI)"
-        # 检测通义千问
-        elif os.getenv("DASHSCOPE_API_KEY"):
-            api_key = os.getenv("DASHSCOPE_API_KEY")
-            base_url = os.getenv("DASHSCOPE_BASE_URL") or LLM_PROVIDERS["dashscope"]["base_url"]
-            provider_name = "通义千问"
-        # 检测OpenAI
-        elif os.getenv("OPENAI_API_KEY"):
-            api_key = os.getenv("OPENAI_API_KEY")
-            base_url = os.getenv("OPENAI_BASE_URL")
-            provider_name = "OpenAI"
-
-        if not api_key:
+        config = _resolve_llm_config()
+        if not config:
             print("未配置LLM API密钥，将使用关键词匹配模式")
             print("支持的配置: GLM_API_KEY, DASHSCOPE_API_KEY, OPENAI_API_KEY")
             _llm_available = False
             return None
 
-        client_kwargs = {"api_key": api_key}
-        if base_url:
-            client_kwargs["base_url"] = base_url
-
-        _openai_client = OpenAI(**client_kwargs)
+        _openai_client = OpenAI(**_client_kwargs(config))
         _llm_available = True
-        print(f"LLM客户端初始化成功 - 提供商: {provider_name}")
+        print(f"LLM客户端初始化成功 - 提供商: {config['provider']}")
         return _openai_client
 
     except ImportError:
@@ -84,6 +92,26 @@ def _get_openai_client():
         return None
 
 
+def _get_async_openai_client():
+    """获取异步OpenAI兼容客户端（流式接口使用，与同步客户端共用配置）"""
+    global _async_openai_client
+
+    if _async_openai_client is not None:
+        return _async_openai_client
+    # 同步客户端不可用（未配置或初始化失败）时不再尝试
+    if not _get_openai_client():
+        return None
+
+    try:
+        from openai import AsyncOpenAI
+
+        _async_openai_client = AsyncOpenAI(**_client_kwargs(_resolve_llm_config()))
+        return _async_openai_client
+    except Exception as e:
+        print(f"异步LLM客户端初始化失败: {e}")
+        return None
+
+
 class ChatAgent:
     """AI聊天智能体 - 支持真实LLM的增强版"""
 
@@ -114,6 +142,7 @@ class ChatAgent:
         # 多会话管理
         self.sessions: Dict[str, Dict[str, Any]] = {}
         self.default_session_id = "default"
+        self._sessions_lock = threading.Lock()
 
         # 初始化默认会话
         self._create_session(self.default_session_id)
@@ -123,8 +152,12 @@ class ChatAgent:
 
         # 尝试初始化LLM
         self.llm_client = _get_openai_client()
+        self.async_llm_client = _get_async_openai_client()
         self.llm_model = os.getenv("LLM_MODEL") or self._get_default_model()
 
+        # 上下文打包：知识检索 + token 预算 + 会话级前缀缓存
+        self.context_packer = ChatContextPacker(retriever=self._search_knowledge)
+
     def _get_default_model(self) -> str:
         """根据配置的API Key自动选择默认模型"""
         if os.getenv("GLM_API_KEY"):
@@ -184,6 +217,9 @@ class ChatAgent:
         self.sessions[session_id] = {
             "memory": ConversationBufferMemory(return_messages=True),
             "history": [],
+            "context": ContextState(),
+            # 同一会话的并发请求按轮次串行，保证历史成对、打包状态一致
+            "lock": threading.Lock(),
             "created_at": None
         }
         return session_id
@@ -196,63 +232,159 @@ class ChatAgent:
 
     def get_or_create_session(self, session_id: Optional[str] = None) -> str:
         """获取或创建会话"""
-        if session_id and session_id in self.sessions:
-            return session_id
-        if session_id:
-            self._create_session(session_id)
-            return session_id
-        return self.default_session_id
+        if not session_id:
+            return self.default_session_id
+        with self._sessions_lock:
+            if session_id not in self.sessions:
+                self._create_session(session_id)
+        return session_id
 
     def chat(self, user_input: str, session_id: Optional[str] = None) -> Dict[str, str]:
         """处理用户输入并返回回复"""
         actual_session_id = self.get_or_create_session(session_id)
         session = self.sessions[actual_session_id]
 
-        # 存储用户消息
-        session["history"].append(HumanMessage(content=user_input))
+        with session["lock"]:
+            # 存储用户消息
+            session["history"].append(HumanMessage(content=user_input))
 
-        # 尝试使用LLM生成回复
-        response = self._generate_llm_response(user_input, session["history"])
+            # 尝试使用LLM生成回复
+            sources: List[Dict[str, Any]] = []
+            response = self._generate_llm_response(user_input, session["history"], session["context"], sources)
 
-        # 如果LLM失败，降级到关键词匹配
-        if not response:
-            response = self._generate_response(user_input, session["history"])
+            # 如果LLM失败，降级到关键词匹配
+            if not response:
+                sources.clear()
+                response = self._generate_response(user_input, session["history"])
 
-        # 存储AI回复
-        session["history"].append(AIMessage(content=response))
+            # 存储AI回复
+            session["history"].append(AIMessage(content=response))
 
         return {
             "response": response,
-            "session_id": actual_session_id
+            "session_id": actual_session_id,
+            "sources": sources
+        }
+
+    async def chat_stream(self, user_input: str, session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式处理用户输入，逐段产出事件
+
+        事件依次为 {"event": "start", "session_id"}、若干 {"event": "delta", "content"}，
+        最后 {"event": "done", "response", "session_id", "sources", "fallback"}。
+        LLM 不可用或在首个分片前失败时，流式输出关键词匹配的回复。
+        """
+        actual_session_id = self.get_or_create_session(session_id)
+        session = self.sessions[actual_session_id]
+        yield {"event": "start", "session_id": actual_session_id}
+
+        user_message = HumanMessage(content=user_input)
+        parts: List[str] = []
+        sources: List[Dict[str, Any]] = []
+        try:
+            # 记录用户消息并打包上下文；知识检索可能涉及模型编码，放到线程池中执行，避免阻塞事件循环
+            messages = await asyncio.to_thread(self._begin_stream_turn, session, user_message, sources)
+            if messages is not None:
+                try:
+                    async for content in self._stream_llm_response(messages):
+                        parts.append(content)
+                        yield {"event": "delta", "content": content}
+                except Exception as e:
+                    # 已输出部分内容时保留已生成的回复
+                    print(f"LLM流式调用失败: {e}")
+
+            fallback = not parts
+            if fallback:
+                sources.clear()
+                for content in self._split_for_stream(self._generate_response(user_input, session["history"])):
+                    parts.append(content)
+                    yield {"event": "delta", "content": content}
+
+            yield {
+                "event": "done",
+                "response": "".join(parts),
+                "session_id": actual_session_id,
+                "sources": sources,
+                "fallback": fallback
+            }
+        finally:
+            # 客户端中途断开时也保持历史成对：有输出则记录已生成部分，否则撤回用户消息
+            if parts:
+                session["history"].append(AIMessage(content="".join(parts)))
+            elif session["history"] and session["history"][-1] is user_message:
+                session["history"].pop()
+                session["context"].truncate(len(session["history"]))
+
+    def _begin_stream_turn(self, session: Dict[str, Any], user_message: HumanMessage,
+                           sources: List[Dict[str, Any]]) -> Optional[List[Dict[str, str]]]:
+        """在会话锁内记录用户消息并打包上下文（LLM 不可用时返回 None）"""
+        with session["lock"]:
+            session["history"].append(user_message)
+            if not self.async_llm_client:
+                return None
+            try:
+                return self._build_messages(user_message.content, session["history"], session["context"], sources)
+            except Exception as e:
+                print(f"上下文打包失败: {e}")
+                return None
+
+    async def _stream_llm_response(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """调用LLM流式接口，按到达顺序产出文本分片"""
+        stream = await self.async_llm_client.chat.completions.create(
+            **self._completion_params(messages), stream=True
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                yield content
+
+    @staticmethod
+    def _split_for_stream(text: str) -> List[str]:
+        """将降级回复按行切分，模拟流式输出"""
+        return text.splitlines(keepends=True) or [text]
+
+    def _completion_params(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        return {
+            "model": self.llm_model,
+            "messages": messages,
+            "max_tokens": 1024,
+            "temperature": 0.7,
+            "top_p": 0.9
         }
 
-    def _generate_llm_response(self, user_input: str, history: List[BaseMessage]) -> Optional[str]:
+    def _search_knowledge(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """检索知识库（知识库不可用时返回空列表）"""
+        from app.agents.registry import agent_registry
+
+        knowledge_base = agent_registry.get("knowledge_base")
+        if knowledge_base is None:
+            return []
+        return knowledge_base.search(query, top_k=top_k)
+
+    def _build_messages(self, user_input: str, history: List[BaseMessage],
+                        context: Optional[ContextState] = None,
+                        sources: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, str]]:
+        """组装发送给LLM的消息：系统提示词 + 早期对话摘要 + 最近对话 + 知识片段 + 当前消息"""
+        knowledge = self.context_packer.retrieve(user_input)
+        if sources is not None:
+            sources.extend(knowledge["sources"])
+        return self.context_packer.pack(context or ContextState(), self.SYSTEM_PROMPT, history, knowledge)
+
+    def _generate_llm_response(self, user_input: str, history: List[BaseMessage],
+                               context: Optional[ContextState] = None,
+                               sources: Optional[List[Dict[str, Any]]] = None) -> Optional[str]:
         """使用LLM生成回复"""
         if not self.llm_client:
             return None
 
         try:
-            # 构建消息列表
-            messages = [
-                {"role": "system", "content": self.SYSTEM_PROMPT}
-            ]
-
-            # 添加历史消息（最近10轮对话）
-            recent_history = history[-20:] if len(history) > 20 else history
-            for msg in recent_history:
-                if isinstance(msg, HumanMessage):
-                    messages.append({"role": "user", "content": msg.content})
-                elif isinstance(msg, AIMessage):
-                    messages.append({"role": "assistant", "content": msg.content})
+            # 构建消息列表（按 token 预算打包）
+            messages = self._build_messages(user_input, history, context, sources)
 
             # 调用LLM API
-            response = self.llm_client.chat.completions.create(
-                model=self.llm_model,
-                messages=messages,
-                max_tokens=1024,
-                temperature=0.7,
-                top_p=0.9
-            )
+            response = self.llm_client.chat.completions.create(**self._completion_params(messages))
 
             return response.choices[0].message.content
 
@@ -317,8 +449,11 @@ class ChatAgent:
         """清空指定会话的历史"""
         target_session = session_id or self.default_session_id
         if target_session in self.sessions:
-            self.sessions[target_session]["history"] = []
-            self.sessions[target_session]["memory"].clear()
+            session = self.sessions[target_session]
+            with session["lock"]:
+                session["history"] = []
+                session["context"].reset()
+                session["memory"].clear()
 
     def clear_all_sessions(self):
         """清空所有会话"""
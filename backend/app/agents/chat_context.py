@@ -0,0 +1,215 @@
+"""
+对话上下文打包 - 知识检索 + token 预算 + 会话级前缀缓存
+
+发送给 LLM 的消息按以下顺序组织：
+    系统提示词
+    早期对话摘要（超出预算被移出窗口的轮次，逐条截取要点）
+    最近对话原文（窗口）
+    本轮检索到的知识库片段
+    当前用户消息
+
+- 每条历史消息的 token 数只计算一次，缓存在会话状态中
+- 窗口超出预算时一次移出较多早期消息（降到预算的 EVICT_RATIO），之后若干轮的前缀
+  （系统提示词 + 摘要 + 窗口）保持不变，既不必重新打包，也便于 LLM 服务端的前缀缓存命中
+- 检索结果每轮不同，放在前缀之后、当前消息之前
+
+通过环境变量配置:
+    CHAT_CONTEXT_TOKENS     输入上下文预算，默认 3000
+    CHAT_KNOWLEDGE_TOKENS   知识片段预算，默认 800（0 关闭检索）
+    CHAT_SUMMARY_TOKENS     早期对话摘要预算，默认 300
+    CHAT_KNOWLEDGE_TOP_K    检索片段数，默认 3
+"""
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain.schema import BaseMessage, HumanMessage
+
+from app.knowledge.chunking import count_tokens
+
+DEFAULT_CONTEXT_TOKENS = 3000
+DEFAULT_KNOWLEDGE_TOKENS = 800
+DEFAULT_SUMMARY_TOKENS = 300
+DEFAULT_KNOWLEDGE_TOP_K = 3
+
+# 窗口超出预算时移出早期消息，直到占用降到可用预算的该比例
+EVICT_RATIO = 0.6
+# 每条消息在摘要中保留的 token 数
+SUMMARY_LINE_TOKENS = 60
+# 每条消息的固定开销（角色标记等）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+Retriever = Callable[[str, int], List[Dict[str, Any]]]
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """按近似 token 数截断，保留开头"""
+    text = " ".join(text.split())
+    if count_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low] + "…"
+
+
+def _role(message: BaseMessage) -> str:
+    return "user" if isinstance(message, HumanMessage) else "assistant"
+
+
+class ContextState:
+    """会话的打包状态"""
+
+    def __init__(self):
+        # 窗口起点：history[start:] 原文发送，之前的消息已并入摘要
+        self.start = 0
+        self.token_counts: List[int] = []
+        self.summary_lines: List[str] = []
+        self.summary_tokens = 0
+        # 缓存的前缀消息（系统提示词 + 摘要 + 窗口内已打包的历史），及其覆盖到的历史位置
+        self.prefix: List[Dict[str, str]] = []
+        self.prefix_end = 0
+        self.prefix_start = -1
+        self.rebuilds = 0
+
+    def reset(self):
+        self.__init__()
+
+    def truncate(self, length: int):
+        """历史被截短（如撤回未得到回复的用户消息）后丢弃多出的 token 计数"""
+        if self.start > length or self.prefix_end > length:
+            self.reset()
+        else:
+            del self.token_counts[length:]
+
+
+class ChatContextPacker:
+    """按 token 预算组装对话上下文"""
+
+    def __init__(self, retriever: Optional[Retriever] = None, context_tokens: Optional[int] = None,
+                 knowledge_tokens: Optional[int] = None, summary_tokens: Optional[int] = None,
+                 knowledge_top_k: Optional[int] = None):
+        """
+        Args:
+            retriever: 检索函数 (查询, top_k) -> 文档列表（含 content，可含 section / id）
+            context_tokens: 输入上下文总预算
+            knowledge_tokens: 知识片段预算
+            summary_tokens: 早期对话摘要预算
+            knowledge_top_k: 检索片段数
+        """
+        self.retriever = retriever
+        self.context_tokens = context_tokens or int(os.getenv("CHAT_CONTEXT_TOKENS", str(DEFAULT_CONTEXT_TOKENS)))
+        self.knowledge_tokens = (knowledge_tokens if knowledge_tokens is not None
+                                 else int(os.getenv("CHAT_KNOWLEDGE_TOKENS", str(DEFAULT_KNOWLEDGE_TOKENS))))
+        self.summary_tokens = (summary_tokens if summary_tokens is not None
+                               else int(os.getenv("CHAT_SUMMARY_TOKENS", str(DEFAULT_SUMMARY_TOKENS))))
+        self.knowledge_top_k = knowledge_top_k or int(os.getenv("CHAT_KNOWLEDGE_TOP_K", str(DEFAULT_KNOWLEDGE_TOP_K)))
+
+    # ------------------------------------------------------------------ 知识检索
+
+    def retrieve(self, query: str) -> Dict[str, Any]:
+        """
+        检索知识片段并按预算拼接
+
+        Returns:
+            {"content": 拼接后的参考资料（无结果为空串）, "tokens": token 数, "sources": [...]}
+        """
+        empty = {"content": "", "tokens": 0, "sources": []}
+        if self.retriever is None or self.knowledge_tokens <= 0:
+            return empty
+        try:
+            documents = self.retriever(query, self.knowledge_top_k) or []
+        except Exception as e:
+            print(f"知识检索失败: {e}")
+            return empty
+
+        parts, sources, used = [], [], 0
+        for doc in documents:
+            title = doc.get("section") or doc.get("category") or ""
+            text = f"[{len(parts) + 1}]{f' {title}' if title else ''}\n{doc['content']}"
+            tokens = count_tokens(text)
+            if used + tokens > self.knowledge_tokens:
+                remaining = self.knowledge_tokens - used
+                if parts or remaining < SUMMARY_LINE_TOKENS:
+                    break
+                # 首个片段超出预算时截断
+                text = _truncate(text, remaining)
+                tokens = count_tokens(text)
+            parts.append(text)
+            sources.append({"id": doc.get("id"), "section": title, "score": doc.get("score")})
+            used += tokens
+        if not parts:
+            return empty
+        content = "以下是知识库中与用户问题相关的参考资料，请优先依据这些资料回答：\n\n" + "\n\n".join(parts)
+        return {"content": content, "tokens": count_tokens(content), "sources": sources}
+
+    # ------------------------------------------------------------------ 打包
+
+    def _evict(self, state: ContextState, history: List[BaseMessage], target: int):
+        """将窗口最早的消息移入摘要，直到窗口占用不超过 target（至少保留当前消息）"""
+        window = sum(state.token_counts[state.start:])
+        while state.start < len(history) - 1 and window > target:
+            message = history[state.start]
+            prefix = "用户" if isinstance(message, HumanMessage) else "助手"
+            line = f"{prefix}: {_truncate(message.content, SUMMARY_LINE_TOKENS)}"
+            state.summary_lines.append(line)
+            state.summary_tokens += count_tokens(line)
+            window -= state.token_counts[state.start]
+            state.start += 1
+        # 摘要超出预算时丢弃最早的要点
+        while state.summary_lines and state.summary_tokens > self.summary_tokens:
+            state.summary_tokens -= count_tokens(state.summary_lines.pop(0))
+
+    def pack(self, state: ContextState, system_prompt: str, history: List[BaseMessage],
+             knowledge: Optional[Dict[str, Any]] = None) -> List[Dict[str, str]]:
+        """
+        组装本轮消息
+
+        Args:
+            state: 会话打包状态（跨轮复用）
+            system_prompt: 系统提示词
+            history: 完整会话历史，最后一条为当前用户消息
+            knowledge: retrieve() 的结果
+
+        Returns:
+            OpenAI 格式的消息列表
+        """
+        if not history:
+            return [{"role": "system", "content": system_prompt}]
+        if len(state.token_counts) > len(history):
+            state.reset()
+        for message in history[len(state.token_counts):]:
+            state.token_counts.append(count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS)
+
+        knowledge_tokens = (knowledge or {}).get("tokens", 0)
+        # 摘要按预算上限预留，摘要增长时窗口预算不变
+        available = max(0, self.context_tokens - count_tokens(system_prompt) - self.summary_tokens - knowledge_tokens)
+        if sum(state.token_counts[state.start:]) > available:
+            self._evict(state, history, int(available * EVICT_RATIO))
+
+        if state.prefix_start != state.start:
+            # 窗口起点变化：重建前缀（系统提示词 + 摘要）
+            state.prefix = [{"role": "system", "content": system_prompt}]
+            if state.summary_lines:
+                state.prefix.append({"role": "system",
+                                     "content": "此前对话要点（较早轮次已省略原文）：\n" + "\n".join(state.summary_lines)})
+            state.prefix_start = state.prefix_end = state.start
+            state.rebuilds += 1
+
+        # 前缀只追加上一轮之后新增的历史消息（不含当前消息）
+        for message in history[state.prefix_end:len(history) - 1]:
+            state.prefix.append({"role": _role(message), "content": message.content})
+        state.prefix_end = len(history) - 1
+
+        messages = list(state.prefix)
+        if knowledge and knowledge.get("content"):
+            messages.append({"role": "system", "content": knowledge["content"]})
+        messages.append({"role": _role(history[-1]), "content": history[-1].content})
+        return messages
+
+    def estimate_tokens(self, messages: List[Dict[str, str]]) -> int:
+        return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
@@ -1,14 +1,10 @@
 import re
 from typing import List, Dict, Any, Optional
-import jieba
 
 class ContractAnalyzer:
     """合同要素识别与风险提示智能体"""
 
     def __init__(self):
-        # 初始化jieba分词
-        jieba.initialize()
-
         # 合同要素关键词
         self.contract_elements = {
             "合同金额": [
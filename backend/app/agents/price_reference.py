@@ -1,138 +1,221 @@
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from datetime import datetime, timedelta
+import copy
+import os
 import random
-import math
+import threading
+
+import numpy as np
+
+from app.core.cache import LRUCache
+from app.pricing.aggregates import CategoryAggregates
+from app.pricing.export import export_chunks, resolve_format
+from app.pricing.forecast import ForecastTable
+from app.pricing.index import PriceIndex
+from app.pricing.quotes import analyze_quote_lines, assess_deviation
+from app.pricing.specs import FEATURES, parse_specs
+from app.pricing.store import PriceStore, create_price_store
+from app.pricing.trend import TrendRollups
+
+# 模拟数据随机种子：各进程生成相同的价格历史
+PRICE_SEED = 20240101
+
+# 名称子串无匹配时，模糊匹配结果被采纳的最低相似度
+FUZZY_MIN_SCORE = 0.5
+
+
+# 产品目录（按实际产品分类组织），用于生成模拟价格数据与分词词典
+PRODUCT_CATALOG: Dict[str, List[Dict[str, Any]]] = {
+    "服务器": [
+        {"name": "Dell PowerEdge R750", "specs": "2U机架式, 2×Intel Xeon Gold 6348, 256GB RAM, 4×2.4TB SAS", "base_price": 68000},
+        {"name": "HP ProLiant DL380 Gen10 Plus", "specs": "2U机架式, 2×Intel Xeon Silver 4314, 128GB RAM, 8×1.2TB SAS", "base_price": 52000},
+        {"name": "浪潮英信 NF5280M6", "specs": "2U机架式, 2×Intel Xeon Gold 5318Y, 192GB RAM, 10×2.4TB SAS", "base_price": 58000},
+        {"name": "华为 FusionServer 2288H V6", "specs": "2U机架式, 2×Intel Xeon Gold 6348, 384GB RAM, 12×3.84TB SSD", "base_price": 125000},
+        {"name": "联想 ThinkSystem SR650 V2", "specs": "2U机架式, 2×Intel Xeon Silver 4310, 96GB RAM, 6×1.8TB SAS", "base_price": 42000},
+        {"name": "曙光 I620-G40", "specs": "2U机架式, 2×Intel Xeon Platinum 8358, 512GB RAM, 8×7.68TB NVMe", "base_price": 185000},
+        {"name": "Dell PowerEdge T350", "specs": "塔式服务器, Intel Xeon E-2378, 32GB ECC, 4×2TB SATA", "base_price": 18500},
+        {"name": "超聚变 FusionServer 2488H V6", "specs": "2U高密度, 4×Intel Xeon Gold 6338, 1TB RAM, 24×2.4TB SAS", "base_price": 285000},
+    ],
+    "工作站": [
+        {"name": "Dell Precision 3660 Tower", "specs": "Intel i9-13900K, 64GB DDR5, RTX A4500 20GB, 2TB NVMe", "base_price": 28000},
+        {"name": "HP Z4 G4", "specs": "Intel Xeon W-3345, 128GB DDR4, RTX A5000 24GB, 4TB NVMe + 8TB HDD", "base_price": 45000},
+        {"name": "联想 ThinkStation P620", "specs": "AMD Threadripper Pro 5955WX, 256GB DDR4, 2×RTX A6000, 8TB NVMe", "base_price": 98000},
+        {"name": "曙光 W330", "specs": "Intel Xeon W-3275, 192GB DDR4, RTX A4000 16GB, 3TB NVMe SSD", "base_price": 62000},
+        {"name": "仰联图形工作站", "specs": "Intel i7-13700K, 32GB DDR5, RTX 4060Ti, 1TB NVMe + 2TB HDD", "base_price": 15800},
+        {"name": "HP Z6 G5 A", "specs": "AMD Threadripper Pro 5965WX, 192GB DDR5, 2×RTX A4000, 6TB NVMe", "base_price": 76000},
+        {"name": "Dell Precision 3470", "specs": "Intel i7-12700H, 32GB DDR5, RTX A1000, 1TB SSD", "base_price": 18500},
+    ],
+    "终端": [
+        {"name": "联想 ThinkPad X1 Carbon Gen11", "specs": "Intel i7-1365U, 32GB LPDDR5, 1TB PCIe 4.0 SSD, 14英寸 2.8K OLED", "base_price": 18500},
+        {"name": "Dell Latitude 5440", "specs": "Intel i7-1355U, 16GB DDR5, 512GB PCIe 4.0 SSD, 14英寸 FHD", "base_price": 8500},
+        {"name": "华为 MateBook 14s", "specs": "Intel i7-13700H, 32GB LPDDR5, 1TB SSD, 14.2英寸 2.5K触控", "base_price": 9800},
+        {"name": "联想 ThinkCentre M950t", "specs": "Intel i7-13700, 32GB DDR5, 1TB NVMe + 2TB HDD, RTX 3050", "base_price": 12800},
+        {"name": "HP EliteBook 840 G9", "specs": "Intel i5-1245U, 16GB LPDDR5, 512GB SSD, 14英寸 FHD", "base_price": 7500},
+        {"name": "同方超锐 T550", "specs": "Intel i5-1240P, 16GB DDR4, 512GB SSD, 14英寸 FHD", "base_price": 6200},
+        {"name": "升腾 C92", "specs": "Intel Celeron J6412, 8GB RAM, 64GB SSD, 瘦客户机", "base_price": 2300},
+        {"name": "深信服桌面云瘦终端", "specs": "ARM处理器, 2GB RAM, 16GB存储, 零维护终端", "base_price": 1800},
+    ],
+    "无人平台": [
+        {"name": "大疆 Matrice 300 RTK", "specs": "工业级无人机, 55分钟续航, 15公里图传, IP45防护", "base_price": 45000},
+        {"name": "大疆 DJI FlyCart 30", "specs": "运载无人机, 30kg载重, 28分钟续航, 16公里图传", "base_price": 185000},
+        {"name": "云洲 ME70", "specs": "测量无人船, 50kg载荷, 20节航速, 100km续航", "base_price": 280000},
+        {"name": "FINEBOT X20无人车", "specs": "地面无人平台, 100kg载重, 8小时续航, 10km遥控距离", "base_price": 95000},
+        {"name": "云洲安防无人艇", "specs": "智能巡逻艇, AI识别, 50km/h航速, 12小时续航", "base_price": 380000},
+        {"name": "普宙 S400", "specs": "行业无人机, 61分钟续航, 1.2km升限, 15km图传", "base_price": 62000},
+    ],
+    "通信": [
+        {"name": "海能达 PD980", "specs": "数字集群对讲机, 5W功率, IP68防护, GPS定位", "base_price": 3800},
+        {"name": "海格通信 B-1000背负站", "specs": "车载/背负双用, 30W功率, 512-2M自适应, 单兵通信", "base_price": 85000},
+        {"name": "华为 AirEngine 6761S-21", "specs": "企业级AP, Wi-Fi 6, 10Gbps速率, 256用户并发", "base_price": 6800},
+        {"name": "中兴 iMacro 5G基站", "specs": "5G小基站, 2.6GHz频段, 4T4R, 10Gbps回传", "base_price": 350000},
+        {"name": "量子加密通信终端", "specs": "量子密钥分发, 百公里传输, BB84协议, 军工级", "base_price": 580000},
+        {"name": "海能达 SmartOne DCS", "specs": "调度控制系统, 支持3000用户, GIS地图, 录音回放", "base_price": 125000},
+        {"name": "华为 S5731S-H48T4X", "specs": "企业级交换机, 48口千兆电口, 4口万兆光口, 三层交换", "base_price": 8500},
+        {"name": "星状组网数传电台", "specs": "800MHz频段, 10W功率, 100km通信距离, 自组网", "base_price": 12000},
+    ],
+    "显示": [
+        {"name": "BenQ RP6502", "specs": "65英寸交互平板, 4K分辨率, 20点触控, 内置Android", "base_price": 18500},
+        {"name": "海信 98U7H-PRO", "specs": "98英寸4K电视, 256分区背光, 120Hz刷新, HDMI 2.1", "base_price": 45000},
+        {"name": "利亚德 TXP系列", "specs": "P1.25小间距LED屏, 3840Hz刷新, 14bit灰度, 640x480mm", "base_price": 38000},
+        {"name": "TCL会议平板 98Y20", "specs": "98英寸会议平板, 4K触控, 内置摄像头麦克风", "base_price": 58000},
+        {"name": "飞利浦 275E1S", "specs": "27英寸2K显示器, IPS面板, 75Hz, HDMI+DP", "base_price": 1500},
+        {"name": "AOC U34P2C", "specs": "34英寸曲面显示器, 3440x1440, 100Hz, Type-C 65W供电", "base_price": 3800},
+        {"name": "爱普生 CB-L730U", "specs": "激光工程投影, 7000流明, WUXGA分辨率, 激光光源", "base_price": 85000},
+        {"name": "NEC P525UL", "specs": "激光投影机, 5200流明, WUXGA, 20000小时寿命", "base_price": 68000},
+        {"name": "巴可 F80-4K12", "specs": "4K投影机, 12000流明, 激光光源, 影院级", "base_price": 380000},
+    ],
+    "仪器仪表": [
+        {"name": "Fluke DSX-8000", "specs": "线缆分析仪, CAT8测试, 30秒自动测试, 云存储", "base_price": 85000},
+        {"name": "是德科技 DSOX4022A", "specs": "示波器, 200MHz带宽, 5GSa/s采样, 4通道", "base_price": 58000},
+        {"name": "R&S FPC1000频谱仪", "specs": "频谱分析仪, 5kHz-1GHz, 分辨率1Hz, 跟踪源", "base_price": 38000},
+        {"name": "福禄克 TiX580", "specs": "红外热像仪, 640x480分辨率, -20°C至800°C, 5.7英寸屏", "base_price": 128000},
+        {"name": "创远仪器 T5260A", "specs": "矢量网络分析仪, 100kHz-20GHz, 动态范围125dB", "base_price": 185000},
+        {"name": "固纬 GPP-3323", "specs": "可编程直流电源, 3通道, 195W总功率, USB/LAN", "base_price": 8500},
+        {"name": "泰克 MSO2024B", "specs": "混合信号示波器, 200MHz, 1GS/s, 4+16通道", "base_price": 45000},
+        {"name": "普源精电 DSA815-TG", "specs": "频谱分析仪, 9kHz-1.5GHz, 分辨率1Hz, 跟踪源", "base_price": 15800},
+        {"name": "安东帕 MCP5000", "specs": "智能微波消解仪, 40位转子, 温度压力控制", "base_price": 380000},
+    ]
+}
+
+
+def generate_price_history(catalog: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                           months: int = 6, seed: int = PRICE_SEED) -> List[Dict[str, Any]]:
+    """生成模拟价格历史（固定随机种子，结果可复现）"""
+    rng = random.Random(seed)
+    categories = catalog or PRODUCT_CATALOG
+
+    # 生成历史价格数据
+    price_records = []
+    base_date = datetime(2024, 1, 1)
+
+    for category, items in categories.items():
+        for item in items:
+            # 为每个商品生成若干个月的历史价格
+            for month in range(months):
+                # 模拟价格波动（5%-15%的波动）
+                fluctuation = rng.uniform(0.95, 1.15)
+                month_price = round(item["base_price"] * fluctuation, 2)
+
+                record = {
+                    "id": f"{category}-{item['name']}-{month}",
+                    "category": category,
+                    "name": item["name"],
+                    "specs": item["specs"],
+                    "price": month_price,
+                    "date": base_date.replace(month=(base_date.month + month - 1) % 12 + 1,
+                                             year=base_date.year + (base_date.month + month - 1) // 12).strftime("%Y-%m"),
+                    "source": rng.choice(["采购平台", "政府采购网", "供应商报价"])
+                }
+                price_records.append(record)
+
+    return price_records
+
 
 class PriceReference:
     """价格参考与审价支持智能体 - 增强版（含价格预测）"""
 
-    def __init__(self):
-        # 初始化模拟价格数据
-        self.price_database = self._init_price_database()
-        # 缓存预测结果
-        self._prediction_cache: Dict[str, Dict] = {}
-
-    def _init_price_database(self) -> List[Dict[str, Any]]:
-        """初始化模拟价格数据"""
-        # 根据实际产品分类重新组织的价格数据
-        categories = {
-            "服务器": [
-                {"name": "Dell PowerEdge R750", "specs": "2U机架式, 2×Intel Xeon Gold 6348, 256GB RAM, 4×2.4TB SAS", "base_price": 68000},
-                {"name": "HP ProLiant DL380 Gen10 Plus", "specs": "2U机架式, 2×Intel Xeon Silver 4314, 128GB RAM, 8×1.2TB SAS", "base_price": 52000},
-                {"name": "浪潮英信 NF5280M6", "specs": "2U机架式, 2×Intel Xeon Gold 5318Y, 192GB RAM, 10×2.4TB SAS", "base_price": 58000},
-                {"name": "华为 FusionServer 2288H V6", "specs": "2U机架式, 2×Intel Xeon Gold 6348, 384GB RAM, 12×3.84TB SSD", "base_price": 125000},
-                {"name": "联想 ThinkSystem SR650 V2", "specs": "2U机架式, 2×Intel Xeon Silver 4310, 96GB RAM, 6×1.8TB SAS", "base_price": 42000},
-                {"name": "曙光 I620-G40", "specs": "2U机架式, 2×Intel Xeon Platinum 8358, 512GB RAM, 8×7.68TB NVMe", "base_price": 185000},
-                {"name": "Dell PowerEdge T350", "specs": "塔式服务器, Intel Xeon E-2378, 32GB ECC, 4×2TB SATA", "base_price": 18500},
-                {"name": "超聚变 FusionServer 2488H V6", "specs": "2U高密度, 4×Intel Xeon Gold 6338, 1TB RAM, 24×2.4TB SAS", "base_price": 285000},
-            ],
-            "工作站": [
-                {"name": "Dell Precision 3660 Tower", "specs": "Intel i9-13900K, 64GB DDR5, RTX A4500 20GB, 2TB NVMe", "base_price": 28000},
-                {"name": "HP Z4 G4", "specs": "Intel Xeon W-3345, 128GB DDR4, RTX A5000 24GB, 4TB NVMe + 8TB HDD", "base_price": 45000},
-                {"name": "联想 ThinkStation P620", "specs": "AMD Threadripper Pro 5955WX, 256GB DDR4, 2×RTX A6000, 8TB NVMe", "base_price": 98000},
-                {"name": "曙光 W330", "specs": "Intel Xeon W-3275, 192GB DDR4, RTX A4000 16GB, 3TB NVMe SSD", "base_price": 62000},
-                {"name": "仰联图形工作站", "specs": "Intel i7-13700K, 32GB DDR5, RTX 4060Ti, 1TB NVMe + 2TB HDD", "base_price": 15800},
-                {"name": "HP Z6 G5 A", "specs": "AMD Threadripper Pro 5965WX, 192GB DDR5, 2×RTX A4000, 6TB NVMe", "base_price": 76000},
-                {"name": "Dell Precision 3470", "specs": "Intel i7-12700H, 32GB DDR5, RTX A1000, 1TB SSD", "base_price": 18500},
-            ],
-            "终端": [
-                {"name": "联想 ThinkPad X1 Carbon Gen11", "specs": "Intel i7-1365U, 32GB LPDDR5, 1TB PCIe 4.0 SSD, 14英寸 2.8K OLED", "base_price": 18500},
-                {"name": "Dell Latitude 5440", "specs": "Intel i7-1355U, 16GB DDR5, 512GB PCIe 4.0 SSD, 14英寸 FHD", "base_price": 8500},
-                {"name": "华为 MateBook 14s", "specs": "Intel i7-13700H, 32GB LPDDR5, 1TB SSD, 14.2英寸 2.5K触控", "base_price": 9800},
-                {"name": "联想 ThinkCentre M950t", "specs": "Intel i7-13700, 32GB DDR5, 1TB NVMe + 2TB HDD, RTX 3050", "base_price": 12800},
-                {"name": "HP EliteBook 840 G9", "specs": "Intel i5-1245U, 16GB LPDDR5, 512GB SSD, 14英寸 FHD", "base_price": 7500},
-                {"name": "同方超锐 T550", "specs": "Intel i5-1240P, 16GB DDR4, 512GB SSD, 14英寸 FHD", "base_price": 6200},
-                {"name": "升腾 C92", "specs": "Intel Celeron J6412, 8GB RAM, 64GB SSD, 瘦客户机", "base_price": 2300},
-                {"name": "深信服桌面云瘦终端", "specs": "ARM处理器, 2GB RAM, 16GB存储, 零维护终端", "base_price": 1800},
-            ],
-            "无人平台": [
-                {"name": "大疆 Matrice 300 RTK", "specs": "工业级无人机, 55分钟续航, 15公里图传, IP45防护", "base_price": 45000},
-                {"name": "大疆 DJI FlyCart 30", "specs": "运载无人机, 30kg载重, 28分钟续航, 16公里图传", "base_price": 185000},
-                {"name": "云洲 ME70", "specs": "测量无人船, 50kg载荷, 20节航速, 100km续航", "base_price": 280000},
-                {"name": "FINEBOT X20无人车", "specs": "地面无人平台, 100kg载重, 8小时续航, 10km遥控距离", "base_price": 95000},
-                {"name": "云洲安防无人艇", "specs": "智能巡逻艇, AI识别, 50km/h航速, 12小时续航", "base_price": 380000},
-                {"name": "普宙 S400", "specs": "行业无人机, 61分钟续航, 1.2km升限, 15km图传", "base_price": 62000},
-            ],
-            "通信": [
-                {"name": "海能达 PD980", "specs": "数字集群对讲机, 5W功率, IP68防护, GPS定位", "base_price": 3800},
-                {"name": "海格通信 B-1000背负站", "specs": "车载/背负双用, 30W功率, 512-2M自适应, 单兵通信", "base_price": 85000},
-                {"name": "华为 AirEngine 6761S-21", "specs": "企业级AP, Wi-Fi 6, 10Gbps速率, 256用户并发", "base_price": 6800},
-                {"name": "中兴 iMacro 5G基站", "specs": "5G小基站, 2.6GHz频段, 4T4R, 10Gbps回传", "base_price": 350000},
-                {"name": "量子加密通信终端", "specs": "量子密钥分发, 百公里传输, BB84协议, 军工级", "base_price": 580000},
-                {"name": "海能达 SmartOne DCS", "specs": "调度控制系统, 支持3000用户, GIS地图, 录音回放", "base_price": 125000},
-                {"name": "华为 S5731S-H48T4X", "specs": "企业级交换机, 48口千兆电口, 4口万兆光口, 三层交换", "base_price": 8500},
-                {"name": "星状组网数传电台", "specs": "800MHz频段, 10W功率, 100km通信距离, 自组网", "base_price": 12000},
-            ],
-            "显示": [
-                {"name": "BenQ RP6502", "specs": "65英寸交互平板, 4K分辨率, 20点触控, 内置Android", "base_price": 18500},
-                {"name": "海信 98U7H-PRO", "specs": "98英寸4K电视, 256分区背光, 120Hz刷新, HDMI 2.1", "base_price": 45000},
-                {"name": "利亚德 TXP系列", "specs": "P1.25小间距LED屏, 3840Hz刷新, 14bit灰度, 640x480mm", "base_price": 38000},
-                {"name": "TCL会议平板 98Y20", "specs": "98英寸会议平板, 4K触控, 内置摄像头麦克风", "base_price": 58000},
-                {"name": "飞利浦 275E1S", "specs": "27英寸2K显示器, IPS面板, 75Hz, HDMI+DP", "base_price": 1500},
-                {"name": "AOC U34P2C", "specs": "34英寸曲面显示器, 3440x1440, 100Hz, Type-C 65W供电", "base_price": 3800},
-                {"name": "爱普生 CB-L730U", "specs": "激光工程投影, 7000流明, WUXGA分辨率, 激光光源", "base_price": 85000},
-                {"name": "NEC P525UL", "specs": "激光投影机, 5200流明, WUXGA, 20000小时寿命", "base_price": 68000},
-                {"name": "巴可 F80-4K12", "specs": "4K投影机, 12000流明, 激光光源, 影院级", "base_price": 380000},
-            ],
-            "仪器仪表": [
-                {"name": "Fluke DSX-8000", "specs": "线缆分析仪, CAT8测试, 30秒自动测试, 云存储", "base_price": 85000},
-                {"name": "是德科技 DSOX4022A", "specs": "示波器, 200MHz带宽, 5GSa/s采样, 4通道", "base_price": 58000},
-                {"name": "R&S FPC1000频谱仪", "specs": "频谱分析仪, 5kHz-1GHz, 分辨率1Hz, 跟踪源", "base_price": 38000},
-                {"name": "福禄克 TiX580", "specs": "红外热像仪, 640x480分辨率, -20°C至800°C, 5.7英寸屏", "base_price": 128000},
-                {"name": "创远仪器 T5260A", "specs": "矢量网络分析仪, 100kHz-20GHz, 动态范围125dB", "base_price": 185000},
-                {"name": "固纬 GPP-3323", "specs": "可编程直流电源, 3通道, 195W总功率, USB/LAN", "base_price": 8500},
-                {"name": "泰克 MSO2024B", "specs": "混合信号示波器, 200MHz, 1GS/s, 4+16通道", "base_price": 45000},
-                {"name": "普源精电 DSA815-TG", "specs": "频谱分析仪, 9kHz-1.5GHz, 分辨率1Hz, 跟踪源", "base_price": 15800},
-                {"name": "安东帕 MCP5000", "specs": "智能微波消解仪, 40位转子, 温度压力控制", "base_price": 380000},
-            ]
-        }
+    def __init__(self, store: Optional[PriceStore] = None):
+        # 价格数据源：默认按 PRICE_STORE_URL 创建，未配置时使用内存中的模拟数据
+        self.store = store or create_price_store(seed=generate_price_history)
+        self.data_version = -1
+        self.columns = None
+        self.index = PriceIndex([])
+        self._forecasts: Optional[ForecastTable] = None
+        self._trends: Optional[TrendRollups] = None
+        # 分类聚合：追加数据时增量更新，其余数据变化时按列式数据重建
+        self.aggregates = CategoryAggregates()
+        # 缓存预测结果：键为 (相关产品ID集合, 预测月数, 数据版本)
+        self._prediction_cache = LRUCache(int(os.getenv("PRICE_PREDICTION_CACHE_SIZE", "256")))
+        self._refresh_lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """
+        数据源版本变化时重新加载价格历史
+
+        产品表只追加不删除，索引增量补充新产品；先替换列式数据再扩展索引，
+        并发查询拿到的产品ID始终能在列式数据中找到。
 
-        # 生成历史价格数据
-        price_records = []
-        base_date = datetime(2024, 1, 1)
-
-        for category, items in categories.items():
-            for item in items:
-                # 为每个商品生成6个月的历史价格
-                for month in range(6):
-                    # 模拟价格波动（5%-15%的波动）
-                    fluctuation = random.uniform(0.95, 1.15)
-                    month_price = round(item["base_price"] * fluctuation, 2)
-
-                    record = {
-                        "id": f"{category}-{item['name']}-{month}",
-                        "category": category,
-                        "name": item["name"],
-                        "specs": item["specs"],
-                        "price": month_price,
-                        "date": base_date.replace(month=(base_date.month + month - 1) % 12 + 1,
-                                                 year=base_date.year + (base_date.month + month - 1) // 12).strftime("%Y-%m"),
-                        "source": random.choice(["采购平台", "政府采购网", "供应商报价"])
-                    }
-                    price_records.append(record)
-
-        return price_records
+        Returns:
+            是否重新加载
+        """
+        version = self.store.version
+        if version == self.data_version:
+            return False
+
+        with self._refresh_lock:
+            if version == self.data_version:
+                return False
+            # 版本与数据在同一次读取中获得，期间的追加留到下次刷新
+            version, columns = self.store.load_snapshot()
+            self.columns = columns
+            for product in columns.products[len(self.index.products):]:
+                self.index.add_product(product)
+            if self.aggregates.version != version:
+                self.aggregates = CategoryAggregates.from_columns(columns, version)
+            self.data_version = version
+            # 旧版本的预测结果不会再被命中，直接释放
+            self._prediction_cache.clear()
+        return True
+
+    def append_prices(self, records: List[Dict[str, Any]]) -> int:
+        """追加价格记录并刷新"""
+        records = list(records)
+        previous = self.aggregates.version
+        count = self.store.append(records)
+        version = self.store.version
+
+        # 期间没有其他写入时，分类聚合只需累加本批记录；在副本上累加后整体替换，
+        # 并发的洞察查询仍读取旧快照，不会遍历到正在修改的字典
+        with self._refresh_lock:
+            if previous == self.data_version == self.aggregates.version and version == previous + 1:
+                self.aggregates = self.aggregates.with_records(records, version)
+
+        self.refresh()
+        return count
+
+    def close(self):
+        self.store.close()
 
     def query_price(self, category: Optional[str] = None, keyword: Optional[str] = None,
                     min_price: Optional[float] = None, max_price: Optional[float] = None) -> Dict[str, Any]:
         """查询价格信息"""
-        # 筛选价格数据
-        filtered = self.price_database.copy()
-
-        if category:
-            filtered = [p for p in filtered if p["category"] == category]
-
+        self.refresh()
+        # 通过索引定位候选产品，再在其历史切片上按价格过滤
         if keyword:
-            filtered = [p for p in filtered if keyword.lower() in p["name"].lower() or keyword.lower() in p["specs"].lower()]
+            product_ids = self.index.search(keyword, category=category or None)
+        else:
+            product_ids = self.index.product_ids(category or None)
+        rows = self.columns.rows(product_ids)
 
         if min_price:
-            filtered = [p for p in filtered if p["price"] >= min_price]
+            rows = rows[self.columns.price[rows] >= min_price]
 
         if max_price:
-            filtered = [p for p in filtered if p["price"] <= max_price]
+            rows = rows[self.columns.price[rows] <= max_price]
 
         # 如果没有筛选结果，返回空
-        if not filtered:
+        if len(rows) == 0:
             return {
                 "records": [],
                 "categories": self._get_categories(),
@@ -141,18 +224,19 @@ class PriceReference:
                 "price_range": {"min": 0, "max": 0}
             }
 
-        # 获取最新价格记录（按日期去重）
-        latest_records = self._get_latest_records(filtered)
+        # 获取最新价格记录（每个商品一条）
+        latest_rows = self._get_latest_records(rows)
+        latest_records = self.columns.records(latest_rows)
 
         # 生成价格趋势数据
-        trend_data = self._generate_trend_data(latest_records)
+        trend_data = self._generate_trend_data(latest_rows)
 
         # 计算价格范围
-        prices = [r["price"] for r in latest_records]
+        prices = self.columns.price[latest_rows]
         price_range = {
-            "min": min(prices),
-            "max": max(prices),
-            "avg": round(sum(prices) / len(prices), 2)
+            "min": float(prices.min()),
+            "max": float(prices.max()),
+            "avg": round(float(prices.sum()) / len(prices), 2)
         }
 
         return {
@@ -163,18 +247,41 @@ class PriceReference:
             "price_range": price_range
         }
 
+    def _resolve_name(self, name: str) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
+        """
+        按名称定位参考价格所在行
+
+        Returns:
+            (最新记录行号, 模糊匹配信息)，名称子串命中时模糊匹配信息为 None；未找到时行号为 None
+        """
+        product_ids = self.index.search(name, fields=("name",))
+        match = None
+        if not product_ids:
+            # 子串无匹配时退回模糊匹配（如 "R750服务器" -> "Dell PowerEdge R750"）
+            candidates = self.index.fuzzy_search(name, top_k=1, min_score=FUZZY_MIN_SCORE)
+            if candidates:
+                product_id, score = candidates[0]
+                product_ids = [product_id]
+                match = {"query": name, "matched_name": self.index.products[product_id]["name"],
+                         "score": score, "fuzzy": True}
+        # 最新记录（日期相同时取最先出现的产品）
+        latest_rows = self._get_latest_records(self.columns.rows(product_ids))
+        if len(latest_rows) == 0:
+            return None, None
+        return int(latest_rows[np.argmax(self.columns.day[latest_rows])]), match
+
     def get_price_by_name(self, name: str) -> Optional[Dict[str, Any]]:
         """根据名称获取价格信息"""
-        records = [p for p in self.price_database if name.lower() in p["name"].lower()]
-        if records:
-            # 返回最新记录
-            latest = sorted(records, key=lambda x: x["date"], reverse=True)[0]
+        self.refresh()
+        latest_row, match = self._resolve_name(name)
+        if latest_row is not None:
+            latest = self.columns.record(latest_row)
 
-            # 获取历史价格
-            history = [r for r in records if r["name"] == latest["name"]]
-            history = sorted(history, key=lambda x: x["date"])
+            # 获取历史价格（同名产品合并）
+            rows = self.columns.rows(self.index.ids_by_name(latest["name"]))
+            history = self.columns.records(self.columns.sort_by_date(rows))
 
-            return {
+            result = {
                 "product": latest,
                 "history": history,
                 "price_change": {
@@ -182,48 +289,164 @@ class PriceReference:
                     "percent": round(((history[-1]["price"] - history[0]["price"]) / history[0]["price"]) * 100, 2)
                 }
             }
+            if match:
+                result["match"] = match
+            return result
         return None
 
+    def match_products(self, query: str, top_k: int = 5, min_score: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        模糊匹配产品
+
+        Returns:
+            候选产品列表（含相似度与最新价格），按相似度降序
+        """
+        self.refresh()
+        candidates = []
+        for product_id, score in self.index.fuzzy_search(query, top_k, min_score):
+            product = self.index.products[product_id]
+            latest = self._get_latest_records(self.columns.rows([product_id]))
+            candidates.append({
+                "name": product["name"],
+                "category": product["category"],
+                "specs": product["specs"],
+                "score": score,
+                "latest_price": float(self.columns.price[latest[0]]) if len(latest) else None,
+            })
+        return candidates
+
+    def find_similar(self, text: Optional[str] = None, features: Optional[Dict[str, float]] = None,
+                     category: Optional[str] = None, top_k: int = 5) -> Dict[str, Any]:
+        """
+        按规格检索相似配置
+
+        Args:
+            text: 需求或规格描述，解析出的特征与 features 合并（features 优先）
+            features: 显式给出的特征（cpu_count / cpu_cores / memory_gb / storage_tb /
+                      gpu_count / gpu_memory_gb）
+            category: 限定分类
+            top_k: 返回数量
+
+        Returns:
+            查询特征、相似产品（含相似度与最新价格）及按相似度加权的参考价格
+        """
+        self.refresh()
+        query = parse_specs(text) if text else {}
+        query.update({k: float(v) for k, v in (features or {}).items() if k in FEATURES and v is not None})
+
+        candidates = self.index.product_ids(category) if category else None
+        matches = []
+        for product_id, similarity in self.index.specs.search(query, top_k, candidates):
+            product = self.index.products[product_id]
+            latest = self._get_latest_records(self.columns.rows([product_id]))
+            if len(latest) == 0:
+                continue
+            matches.append({
+                "name": product["name"],
+                "category": product["category"],
+                "specs": product["specs"],
+                "features": self.index.specs.features(product_id),
+                "similarity": similarity,
+                "latest_price": float(self.columns.price[latest[0]]),
+            })
+
+        price_reference = None
+        if matches:
+            prices = [m["latest_price"] for m in matches]
+            weights = [m["similarity"] for m in matches]
+            price_reference = {
+                "min": min(prices),
+                "max": max(prices),
+                "avg": round(sum(prices) / len(prices), 2),
+                "weighted_avg": round(sum(p * w for p, w in zip(prices, weights)) / sum(weights), 2),
+            }
+
+        return {
+            "query_features": query,
+            "matches": matches,
+            "price_reference": price_reference,
+        }
+
+    def export_prices(self, fmt: Optional[str] = None,
+                      category: Optional[str] = None) -> Tuple[str, int, Iterator[bytes]]:
+        """
+        导出价格数据快照
+
+        Args:
+            fmt: arrow / parquet / npz，未指定时按可用依赖选择
+            category: 限定分类
+
+        Returns:
+            (导出格式, 数据版本, 字节块迭代器)；迭代期间数据更新不影响本次导出
+
+        Raises:
+            ValueError: 格式不支持或缺少依赖
+        """
+        fmt = resolve_format(fmt)
+        self.refresh()
+        columns, version = self.columns, self.data_version
+        if category:
+            rows = columns.rows(self.index.product_ids(category))
+        else:
+            rows = np.arange(len(columns), dtype=np.int64)
+        return fmt, version, export_chunks(columns, rows, fmt)
+
     def _get_categories(self) -> List[str]:
         """获取所有分类"""
-        return sorted(set(p["category"] for p in self.price_database))
-
-    def _get_latest_records(self, records: List[Dict]) -> List[Dict]:
-        """获取每个商品的最新记录"""
-        latest = {}
-        for record in records:
-            key = f"{record['category']}-{record['name']}"
-            if key not in latest or record["date"] > latest[key]["date"]:
-                latest[key] = record
-
-        return list(latest.values())
-
-    def _generate_trend_data(self, records: List[Dict]) -> List[Dict]:
-        """生成价格趋势数据"""
-        # 按分类聚合价格数据
-        category_data = {}
-        for record in records:
-            category = record["category"]
-            if category not in category_data:
-                category_data[category] = {}
-            if record["date"] not in category_data[category]:
-                category_data[category][record["date"]] = []
-            category_data[category][record["date"]].append(record["price"])
-
-        # 计算每个分类每月的平均价格
-        trend_data = []
-        months = sorted(set(r["date"] for r in records))
+        return self.index.category_names()
 
+    def _get_latest_records(self, rows: np.ndarray) -> np.ndarray:
+        """获取每个商品的最新记录（行号）"""
+        return self.columns.latest_rows(rows)
+
+    def _generate_trend_data(self, rows: np.ndarray) -> List[Dict]:
+        """生成价格趋势数据：各分类每月的平均价格"""
+        months, category_data = self.columns.monthly_means(rows)
+
+        trend_data = []
         for month in months:
             data_point = {"date": month}
             for category, monthly_data in category_data.items():
                 if month in monthly_data:
-                    avg_price = round(sum(monthly_data[month]) / len(monthly_data[month]), 2)
-                    data_point[category] = avg_price
+                    data_point[category] = monthly_data[month]
             trend_data.append(data_point)
 
         return trend_data
 
+    def get_trend(self, category: Optional[str] = None, keyword: Optional[str] = None,
+                  start: Optional[str] = None, end: Optional[str] = None, bucket: str = "month",
+                  group_by: str = "category", max_points: int = 200) -> Dict[str, Any]:
+        """
+        分桶价格趋势
+
+        Args:
+            category: 限定分类
+            keyword: 产品关键词
+            start, end: 时间范围（'YYYY-MM' 或 'YYYY-MM-DD'）
+            bucket: 时间粒度 week / month / quarter
+            group_by: 按分类（category）或产品名（product）分序列
+            max_points: 每条序列最多返回的点数（LTTB 降采样）
+
+        Returns:
+            各序列的分桶均价 / 最低价 / 最高价 / 条数
+        """
+        self.refresh()
+        if keyword:
+            product_ids = self.index.search(keyword, category=category or None)
+        else:
+            product_ids = self.index.product_ids(category or None)
+
+        series = self._get_trends().series(product_ids, bucket, group_by, start, end, max_points)
+        return {
+            "bucket": bucket,
+            "group_by": group_by,
+            "start": start,
+            "end": end,
+            "max_points": max_points,
+            "downsampled": any(len(s["points"]) < s["total_points"] for s in series),
+            "series": series,
+        }
+
     def analyze_price(self, product_name: str, quoted_price: float) -> Dict[str, Any]:
         """分析报价合理性"""
         reference = self.get_price_by_name(product_name)
@@ -233,24 +456,17 @@ class PriceReference:
                 "product_name": product_name,
                 "quoted_price": quoted_price,
                 "analysis": "未找到参考价格数据",
-                "recommendation": "建议收集更多价格信息后再做判断"
+                "recommendation": "建议收集更多价格信息后再做判断",
+                "candidates": self.match_products(product_name, top_k=3)
             }
 
         latest_price = reference["product"]["price"]
         price_diff = quoted_price - latest_price
         price_diff_percent = (price_diff / latest_price) * 100
 
-        if price_diff_percent <= -10:
-            assessment = "报价偏低"
-            recommendation = "建议核实产品质量和服务条款，警惕低价陷阱"
-        elif price_diff_percent >= 20:
-            assessment = "报价偏高"
-            recommendation = "建议与供应商协商降价，或提供额外增值服务"
-        else:
-            assessment = "报价合理"
-            recommendation = "报价处于合理区间，可以接受"
+        assessment, recommendation = assess_deviation(price_diff_percent)
 
-        return {
+        result = {
             "product_name": product_name,
             "quoted_price": quoted_price,
             "reference_price": latest_price,
@@ -260,6 +476,35 @@ class PriceReference:
             "recommendation": recommendation,
             "market_trend": reference["price_change"]
         }
+        if "match" in reference:
+            result["matched_product"] = reference["match"]["matched_name"]
+            result["match_score"] = reference["match"]["score"]
+        return result
+
+    def analyze_quotes(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        批量分析报价（整包投标评审）
+
+        Args:
+            items: 报价明细（product_name / quoted_price / quantity / supplier / line_id）
+
+        Returns:
+            逐行偏差、整包偏差、各供应商偏差及未找到参考价格的产品名
+        """
+        self.refresh()
+        columns = self.columns
+
+        def resolve(name: str) -> Optional[Dict[str, Any]]:
+            latest_row, match = self._resolve_name(name)
+            if latest_row is None:
+                return None
+            return {
+                "reference_price": float(columns.price[latest_row]),
+                "matched_product": columns.products[int(columns.product_id[latest_row])]["name"],
+                "match_score": match["score"] if match else None,
+            }
+
+        return analyze_quote_lines(items, resolve)
 
     def predict_price(self, keyword: str, months_ahead: int = 3) -> Dict[str, Any]:
         """
@@ -272,36 +517,50 @@ class PriceReference:
         Returns:
             预测结果，包含预测价格、趋势、建议等
         """
+        self.refresh()
         # 获取相关产品的历史数据
-        records = [p for p in self.price_database if
-                   keyword.lower() in p["name"].lower() or keyword.lower() in p["category"].lower()]
+        product_ids = set(self.index.search(keyword, fields=("name",)))
+        product_ids.update(self.index.search_categories(keyword))
+        product_ids = sorted(product_ids)
 
-        if not records:
+        if len(self.columns.rows(product_ids)) == 0:
             return {
                 "success": False,
                 "message": f"未找到与 '{keyword}' 相关的价格数据",
                 "predictions": []
             }
 
-        # 按产品分组进行预测
-        product_groups = self._group_by_product(records)
-        predictions = []
-
-        for product_name, product_records in product_groups.items():
-            prediction = self._predict_single_product(product_name, product_records, months_ahead)
-            if prediction:
-                predictions.append(prediction)
+        # 不同关键词命中相同产品集合时共享缓存结果；缓存与调用方各持一份副本，
+        # 调用方修改返回值不会影响缓存。generated_at 为本次返回的时间
+        cache_key = (tuple(product_ids), months_ahead, self.data_version)
+        cached = self._prediction_cache.get(cache_key)
+        if cached is not None:
+            return {**copy.deepcopy(cached), "keyword": keyword,
+                    "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+        result = self._predict_products(product_ids, keyword, months_ahead)
+        # 预测失败不缓存
+        if result.get("success"):
+            self._prediction_cache.put(cache_key, copy.deepcopy(result))
+        return result
+
+    def _predict_products(self, product_ids: List[int], keyword: str, months_ahead: int) -> Dict[str, Any]:
+        """对产品集合生成预测结果"""
+        # 从预测表中取出相关产品（同名产品合并）的拟合结果
+        forecasts = self._get_forecasts()
+        groups = forecasts.groups_for(product_ids)
 
         # 汇总预测结果
-        if predictions:
-            avg_trend = self._calculate_average_trend(predictions)
-            best_buy_timing = self._analyze_best_buy_timing(predictions)
+        if groups:
+            directions = [forecasts.directions[g][0] for g in groups]
+            avg_trend = self._calculate_average_trend(directions)
+            best_buy_timing = self._analyze_best_buy_timing(directions)
 
             return {
                 "success": True,
                 "keyword": keyword,
-                "products_analyzed": len(predictions),
-                "predictions": predictions[:5],  # 最多返回5个产品预测
+                "products_analyzed": len(groups),
+                "predictions": forecasts.predict(groups[:5], months_ahead),  # 最多返回5个产品预测
                 "overall_trend": avg_trend,
                 "buying_advice": best_buy_timing,
                 "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -313,164 +572,36 @@ class PriceReference:
             "predictions": []
         }
 
-    def _group_by_product(self, records: List[Dict]) -> Dict[str, List[Dict]]:
-        """按产品名分组"""
-        groups = {}
-        for record in records:
-            name = record["name"]
-            if name not in groups:
-                groups[name] = []
-            groups[name].append(record)
-
-        # 按日期排序
-        for name in groups:
-            groups[name] = sorted(groups[name], key=lambda x: x["date"])
-
-        return groups
-
-    def _predict_single_product(self, product_name: str, records: List[Dict],
-                                 months_ahead: int) -> Optional[Dict[str, Any]]:
-        """对单个产品进行价格预测"""
-        if len(records) < 3:
-            return None
-
-        # 提取价格序列
-        prices = [r["price"] for r in records]
-        dates = [r["date"] for r in records]
-
-        # 计算趋势（使用线性回归）
-        trend_slope, trend_intercept = self._linear_regression(prices)
-
-        # 计算季节性因素
-        seasonality = self._calculate_seasonality(prices)
-
-        # 计算置信区间
-        std_dev = self._calculate_std_dev(prices, trend_slope, trend_intercept)
-        confidence_margin = std_dev * 1.96  # 95% 置信区间
-
-        # 生成预测
-        last_price = prices[-1]
-        predictions = []
-        current_date = datetime.strptime(dates[-1], "%Y-%m")
-
-        for i in range(1, months_ahead + 1):
-            future_date = self._add_months(current_date, i)
-            trend_value = trend_intercept + trend_slope * (len(prices) + i - 1)
-            seasonal_factor = seasonality[(len(prices) + i - 1) % len(seasonality)] if seasonality else 1.0
-
-            predicted_price = trend_value * seasonal_factor
-            lower_bound = predicted_price - confidence_margin
-            upper_bound = predicted_price + confidence_margin
-
-            predictions.append({
-                "date": future_date.strftime("%Y-%m"),
-                "predicted_price": round(max(predicted_price, 0), 2),
-                "lower_bound": round(max(lower_bound, 0), 2),
-                "upper_bound": round(max(upper_bound, 0), 2),
-                "confidence": "95%"
-            })
-
-        # 判断趋势方向
-        if trend_slope < -0.01 * last_price:
-            trend_direction = "下降"
-            trend_strength = "强" if abs(trend_slope) > 0.03 * last_price else "弱"
-        elif trend_slope > 0.01 * last_price:
-            trend_direction = "上升"
-            trend_strength = "强" if trend_slope > 0.03 * last_price else "弱"
-        else:
-            trend_direction = "稳定"
-            trend_strength = "中等"
-
-        return {
-            "product_name": product_name,
-            "category": records[0]["category"],
-            "current_price": last_price,
-            "trend_direction": trend_direction,
-            "trend_strength": trend_strength,
-            "trend_slope": round(trend_slope, 4),
-            "predictions": predictions
-        }
-
-    def _linear_regression(self, values: List[float]) -> Tuple[float, float]:
-        """简单线性回归"""
-        n = len(values)
-        x = list(range(n))
-
-        x_mean = sum(x) / n
-        y_mean = sum(values) / n
-
-        numerator = sum((x[i] - x_mean) * (values[i] - y_mean) for i in range(n))
-        denominator = sum((x[i] - x_mean) ** 2 for i in range(n))
-
-        if denominator == 0:
-            return 0, y_mean
-
-        slope = numerator / denominator
-        intercept = y_mean - slope * x_mean
-
-        return slope, intercept
-
-    def _calculate_seasonality(self, values: List[float]) -> List[float]:
-        """计算季节性因子"""
-        if len(values) < 4:
-            return [1.0]
-
-        # 使用4期移动平均计算季节性
-        n = len(values)
-        period = min(4, n // 2)
-
-        # 计算移动平均
-        moving_avg = []
-        for i in range(period - 1, n):
-            avg = sum(values[i - period + 1:i + 1]) / period
-            moving_avg.append(avg)
-
-        # 计算季节性比率
-        ratios = []
-        for i in range(len(moving_avg)):
-            if moving_avg[i] != 0:
-                ratios.append(values[i + period - 1] / moving_avg[i])
-
-        if not ratios:
-            return [1.0]
-
-        # 归一化
-        avg_ratio = sum(ratios) / len(ratios)
-        seasonality = [r / avg_ratio for r in ratios]
-
-        return seasonality
-
-    def _calculate_std_dev(self, values: List[float], slope: float, intercept: float) -> float:
-        """计算残差标准差"""
-        n = len(values)
-        if n < 2:
-            return 0
-
-        residuals = []
-        for i, v in enumerate(values):
-            predicted = intercept + slope * i
-            residuals.append((v - predicted) ** 2)
-
-        variance = sum(residuals) / (n - 2)
-        return math.sqrt(variance)
-
-    def _add_months(self, date: datetime, months: int) -> datetime:
-        """添加月份"""
-        month = date.month - 1 + months
-        year = date.year + month // 12
-        month = month % 12 + 1
-        return date.replace(year=year, month=month)
-
-    def _calculate_average_trend(self, predictions: List[Dict]) -> Dict[str, Any]:
+    def cache_stats(self) -> Dict[str, Any]:
+        """预测缓存统计"""
+        return {**self._prediction_cache.stats(), "data_version": self.data_version}
+
+    def _get_forecasts(self) -> ForecastTable:
+        """当前数据版本的预测表（数据更新后首次预测时重建）"""
+        forecasts = self._forecasts
+        if forecasts is None or forecasts.version != self.data_version:
+            forecasts = ForecastTable(self.columns, self.data_version)
+            self._forecasts = forecasts
+        return forecasts
+
+    def _get_trends(self) -> TrendRollups:
+        """当前数据版本的分桶预聚合（数据更新后首次查询时重建）"""
+        trends = self._trends
+        if trends is None or trends.version != self.data_version:
+            trends = TrendRollups(self.columns, self.data_version)
+            self._trends = trends
+        return trends
+
+    def _calculate_average_trend(self, directions: List[str]) -> Dict[str, Any]:
         """计算平均趋势"""
-        if not predictions:
+        if not directions:
             return {"direction": "未知", "confidence": 0}
 
-        up_count = sum(1 for p in predictions if p["trend_direction"] == "上升")
-        down_count = sum(1 for p in predictions if p["trend_direction"] == "下降")
-        stable_count = sum(1 for p in predictions if p["trend_direction"] == "稳定")
+        up_count = directions.count("上升")
+        down_count = directions.count("下降")
+        stable_count = directions.count("稳定")
 
-        total = len(predictions)
+        total = len(directions)
         if up_count > down_count and up_count > stable_count:
             return {"direction": "上升", "confidence": round(up_count / total * 100, 1)}
         elif down_count > up_count and down_count > stable_count:
@@ -478,23 +609,22 @@ class PriceReference:
         else:
             return {"direction": "稳定", "confidence": round(stable_count / total * 100, 1)}
 
-    def _analyze_best_buy_timing(self, predictions: List[Dict]) -> Dict[str, Any]:
+    def _analyze_best_buy_timing(self, directions: List[str]) -> Dict[str, Any]:
         """分析最佳购买时机"""
-        if not predictions:
+        if not directions:
             return {"recommendation": "数据不足，无法提供建议"}
 
         # 分析价格走势
-        downward_products = [p for p in predictions if p["trend_direction"] == "下降"]
-        stable_products = [p for p in predictions if p["trend_direction"] == "稳定"]
-        upward_products = [p for p in predictions if p["trend_direction"] == "上升"]
+        downward_count = directions.count("下降")
+        upward_count = directions.count("上升")
 
-        if len(downward_products) > len(upward_products):
+        if downward_count > upward_count:
             return {
                 "recommendation": "建议延后购买",
                 "reason": "多数产品价格呈下降趋势，预计未来1-3个月价格可能更低",
                 "suggested_delay": "1-3个月"
             }
-        elif len(upward_products) > len(downward_products):
+        elif upward_count > downward_count:
             return {
                 "recommendation": "建议尽快购买",
                 "reason": "多数产品价格呈上升趋势，延迟采购可能导致成本增加",
@@ -514,44 +644,32 @@ class PriceReference:
         Returns:
             市场分析报告，包含热门产品、价格变化、采购建议等
         """
-        records = self.price_database
-        if category:
-            records = [r for r in records if r["category"] == category]
+        self.refresh()
+        aggregates = self.aggregates.select(category or None)
 
-        if not records:
+        if not aggregates:
             return {"success": False, "message": "无数据"}
 
-        # 获取最新记录
-        latest_records = self._get_latest_records(records)
-
-        # 计算市场统计
+        # 计算市场统计（基于各产品最新价格）
         categories = {}
-        for r in latest_records:
-            cat = r["category"]
-            if cat not in categories:
-                categories[cat] = {"count": 0, "total_price": 0, "products": []}
-            categories[cat]["count"] += 1
-            categories[cat]["total_price"] += r["price"]
-            categories[cat]["products"].append(r["name"])
-
-        # 计算各分类平均价格
-        for cat in categories:
-            categories[cat]["avg_price"] = round(
-                categories[cat]["total_price"] / categories[cat]["count"], 2
-            )
-
-        # 生成采购建议
+        for cat, agg in aggregates.items():
+            categories[cat] = {
+                "count": len(agg.latest),
+                "total_price": agg.latest_total,
+                "products": list(agg.latest),
+                "avg_price": round(agg.latest_avg, 2),
+            }
+
+        # 生成采购建议：分类内全部价格对月份回归，斜率为每月价格变化
         insights = []
-        for cat, data in categories.items():
-            # 预测该分类的趋势
-            cat_records = [r for r in records if r["category"] == cat]
-            if len(cat_records) >= 3:
-                prices = [r["price"] for r in sorted(cat_records, key=lambda x: x["date"])]
-                slope, _ = self._linear_regression(prices)
-
-                if slope < -0.02 * (sum(prices) / len(prices)):
+        for cat, agg in aggregates.items():
+            if agg.count >= 3:
+                slope = agg.slope()
+                mean_price = agg.mean_price
+
+                if slope < -0.02 * mean_price:
                     insight = f"{cat}类产品价格呈下降趋势，建议关注"
-                elif slope > 0.02 * (sum(prices) / len(prices)):
+                elif slope > 0.02 * mean_price:
                     insight = f"{cat}类产品价格呈上升趋势，建议尽早采购"
                 else:
                     insight = f"{cat}类产品价格稳定"
@@ -560,14 +678,14 @@ class PriceReference:
                     "category": cat,
                     "insight": insight,
                     "trend_slope": round(slope, 4),
-                    "product_count": data["count"],
-                    "avg_price": data["avg_price"]
+                    "product_count": categories[cat]["count"],
+                    "avg_price": categories[cat]["avg_price"]
                 })
 
         return {
             "success": True,
             "categories": categories,
             "insights": sorted(insights, key=lambda x: abs(x["trend_slope"]), reverse=True),
-            "total_products": len(latest_records),
+            "total_products": sum(data["count"] for data in categories.values()),
             "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
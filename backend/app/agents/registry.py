@@ -0,0 +1,258 @@
+"""
+智能体注册表 - 进程级单例管理
+
+各路由、协调器与工作流服务原先各自构造 RequirementReviewer / PriceReference /
+ContractAnalyzer，导致规则缓存和价格数据在同一进程内存在多份且互不一致。
+注册表按名称登记工厂函数，首次使用时才构造实例，此后在整个进程内共享。
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class AgentProxy:
+    """延迟代理：首次访问属性时才从注册表取出（必要时构造）真实实例"""
+
+    def __init__(self, registry: "AgentRegistry", name: str):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+
+    def _resolve(self) -> Any:
+        return self._registry.get(self._name)
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._resolve(), item)
+
+    def __setattr__(self, item: str, value: Any):
+        setattr(self._resolve(), item, value)
+
+    def __delattr__(self, item: str):
+        delattr(self._resolve(), item)
+
+    def __bool__(self) -> bool:
+        return bool(self._resolve())
+
+    def __repr__(self) -> str:
+        return f"<AgentProxy {self._name}>"
+
+
+class AgentRegistry:
+    """进程级智能体注册表：延迟构造、共享实例、显式生命周期"""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._optional: Dict[str, bool] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._warmup_names: List[str] = []
+        # 后台预热失败的组件 -> 错误信息（之后首次使用时仍会重试构造）；
+        # 由预热线程写入、请求线程读取，读写都持有 _registry_lock
+        self._warmup_errors: Dict[str, str] = {}
+        self.started = False
+
+    def register(self, name: str, factory: Callable[[], Any], optional: bool = False):
+        """
+        登记智能体工厂
+
+        Args:
+            name: 智能体名称
+            factory: 无参工厂函数
+            optional: 为 True 时构造失败返回 None 而不抛出异常（如知识库）
+        """
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._optional[name] = optional
+            self._locks.setdefault(name, threading.Lock())
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """获取共享实例，首次调用时构造"""
+        if name in self._instances:
+            return self._instances[name]
+
+        if name not in self._factories:
+            raise KeyError(f"未注册的智能体: {name}")
+
+        with self._locks[name]:
+            # 双重检查，避免并发请求重复构造
+            if name in self._instances:
+                return self._instances[name]
+            try:
+                instance = self._factories[name]()
+            except Exception as e:
+                if not self._optional[name]:
+                    raise
+                print(f"{name} 初始化失败: {e}")
+                print("将继续使用基础功能")
+                instance = None
+            self._instances[name] = instance
+            return instance
+
+    def proxy(self, name: str) -> AgentProxy:
+        """返回延迟代理，适合在模块级别持有而不触发构造"""
+        return AgentProxy(self, name)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def names(self) -> List[str]:
+        return list(self._factories.keys())
+
+    def status(self) -> Dict[str, bool]:
+        """各智能体是否已构造"""
+        return {name: self.is_loaded(name) for name in self._factories}
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        就绪状态：启动钩子已执行、后台预热的智能体均已构造，
+        且提供 is_ready() 的实例（如知识库的模型预热）均已就绪
+
+        预热失败的组件不计入 pending，而是列在 errors 中：否则就绪探针永远返回 503，
+        负载均衡不再转发流量，首次使用时的重试构造也就永远不会发生。
+        """
+        with self._registry_lock:
+            warmup_errors = dict(self._warmup_errors)
+        errors = {name: error for name, error in warmup_errors.items() if not self.is_loaded(name)}
+        pending = [name for name in self._warmup_names if not self.is_loaded(name) and name not in errors]
+        components = {}
+        for name, instance in list(self._instances.items()):
+            is_ready = getattr(instance, "is_ready", None)
+            if instance is not None and callable(is_ready):
+                components[name] = bool(is_ready())
+        return {
+            "ready": self.started and not pending and all(components.values()),
+            "pending": pending,
+            "components": components,
+            "errors": errors,
+        }
+
+    def startup(self, preload: Optional[Iterable[str]] = None,
+                warmup: Optional[Iterable[str]] = None):
+        """
+        应用启动钩子
+
+        Args:
+            preload: 需要在启动时同步构造的智能体；默认读取环境变量
+                AGENT_PRELOAD（逗号分隔，"all" 表示全部）
+            warmup: 需要在后台线程预热的智能体；默认读取环境变量
+                AGENT_WARMUP（默认预热需求审查、合同分析与价格参考，"none" 关闭）
+        """
+        if preload is None:
+            preload = _parse_name_list(os.getenv("AGENT_PRELOAD", ""), self.names())
+        for name in preload:
+            self.get(name)
+
+        if warmup is None:
+            warmup = _parse_name_list(
+                os.getenv("AGENT_WARMUP", ",".join(DEFAULT_WARMUP_AGENTS)), self.names()
+            )
+        self.warm_up(warmup)
+        self.started = True
+
+    def warm_up(self, names: Iterable[str]) -> Optional[threading.Thread]:
+        """在后台守护线程中构造智能体，不阻塞应用启动"""
+        pending = [name for name in names if not self.is_loaded(name)]
+        self._warmup_names = list(pending)
+        with self._registry_lock:
+            self._warmup_errors.clear()
+        if not pending:
+            return None
+
+        def _run():
+            for name in pending:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"预热 {name} 失败: {e}")
+                    with self._registry_lock:
+                        self._warmup_errors[name] = str(e)
+
+        self._warmup_thread = threading.Thread(target=_run, name="agent-warmup", daemon=True)
+        self._warmup_thread.start()
+        return self._warmup_thread
+
+    def shutdown(self):
+        """应用关闭钩子：调用实例的 close()（若有）并释放所有实例"""
+        with self._registry_lock:
+            instances = list(self._instances.items())
+            self._instances.clear()
+
+        for name, instance in instances:
+            close = getattr(instance, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception as e:
+                    print(f"关闭 {name} 失败: {e}")
+        self.started = False
+        self._warmup_names = []
+        with self._registry_lock:
+            self._warmup_errors.clear()
+
+
+# 默认在后台预热的组件（知识库构造后在自己的线程中加载模型；对话不预热）
+DEFAULT_WARMUP_AGENTS = ["segmenter", "requirement_reviewer", "contract_analyzer", "price_reference",
+                         "knowledge_base"]
+
+
+def _parse_name_list(value: str, all_names: List[str]) -> List[str]:
+    names = [item.strip() for item in value.split(",") if item.strip()]
+    if "all" in names:
+        return list(all_names)
+    return [name for name in names if name in all_names]
+
+
+def _build_segmenter():
+    from app.core.segmenter import ensure_jieba
+    return ensure_jieba()
+
+
+def _build_requirement_reviewer():
+    from app.agents.requirement_reviewer import RequirementReviewer
+    return RequirementReviewer()
+
+
+def _build_price_reference():
+    from app.agents.price_reference import PriceReference
+    return PriceReference()
+
+
+def _build_contract_analyzer():
+    from app.agents.contract_analyzer import ContractAnalyzer
+    return ContractAnalyzer()
+
+
+def _build_knowledge_base():
+    from app.knowledge.knowledge_base import KnowledgeBase
+    knowledge_base = KnowledgeBase()
+    print("知识库初始化成功")
+    if knowledge_base.warmup_enabled:
+        knowledge_base.start_warmup()
+    return knowledge_base
+
+
+def _build_chat_agent():
+    from app.agents.chat_agent import ChatAgent
+    return ChatAgent()
+
+
+def _build_agent_coordinator():
+    from app.agents.agent_coordinator import AgentCoordinator
+    return AgentCoordinator(agent_registry)
+
+
+agent_registry = AgentRegistry()
+agent_registry.register("segmenter", _build_segmenter)
+agent_registry.register("requirement_reviewer", _build_requirement_reviewer)
+agent_registry.register("price_reference", _build_price_reference)
+agent_registry.register("contract_analyzer", _build_contract_analyzer)
+agent_registry.register("knowledge_base", _build_knowledge_base, optional=True)
+agent_registry.register("chat_agent", _build_chat_agent)
+agent_registry.register("agent_coordinator", _build_agent_coordinator)
+
+
+def get_agent(name: str) -> Any:
+    """获取共享智能体实例"""
+    return agent_registry.get(name)
@@ -4,7 +4,6 @@
 """
 import re
 from typing import List, Dict, Any, Optional
-import jieba
 import sys
 from pathlib import Path
 
@@ -16,6 +15,7 @@ if str(backend_dir) not in sys.path:
 from app.core.rule_engine import RuleEngine
 from app.core.field_extractor import FieldExtractor
 from app.core.risk_detector import RiskDetector
+from app.core.segmenter import cut
 
 
 class RequirementReviewer:
@@ -28,8 +28,7 @@ class RequirementReviewer:
         Args:
             rules_dir: 规则文件目录路径（可选）
         """
-        # 初始化jieba分词
-        jieba.initialize()
+        # jieba 分词器在首次分词时初始化（含采购领域词典），见 app.core.segmenter
 
         # 初始化核心模块
         self.rule_engine = RuleEngine(rules_dir)
@@ -251,7 +250,7 @@ class RequirementReviewer:
         suggestions = []
 
         # 分词
-        words = list(jieba.cut(content))
+        words = cut(content)
 
         # 检查必备要素
         missing_elements = self._check_required_elements(content, words)
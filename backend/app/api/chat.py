@@ -1,14 +1,15 @@
+import json
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Dict, Any, Optional
-from app.agents.chat_agent import ChatAgent
-from app.agents.agent_coordinator import AgentCoordinator
+from app.agents.registry import agent_registry
 
 router = APIRouter()
 
-# 创建聊天智能体实例
-chat_agent = ChatAgent()
-agent_coordinator = AgentCoordinator()
+# 共享的聊天智能体与协调器（首次使用时构造）
+chat_agent = agent_registry.proxy("chat_agent")
+agent_coordinator = agent_registry.proxy("agent_coordinator")
 
 
 @router.post("/chat/conversation")
@@ -28,6 +29,7 @@ async def chat_conversation(request: Dict[str, Any]):
         "data": {
             "response": "AI回复",
             "session_id": "会话ID",
+            "sources": [],
             "suggested_actions": []
         }
     }
@@ -39,8 +41,8 @@ async def chat_conversation(request: Dict[str, Any]):
         if not message:
             raise HTTPException(status_code=400, detail="消息不能为空")
 
-        # 处理聊天消息，支持多会话
-        result = chat_agent.chat(message, session_id)
+        # 处理聊天消息，支持多会话（同步调用LLM，放到线程池中避免阻塞事件循环）
+        result = await run_in_threadpool(chat_agent.chat, message, session_id)
 
         # 生成建议操作
         suggested_actions = _generate_suggested_actions(message, result["response"])
@@ -52,6 +54,7 @@ async def chat_conversation(request: Dict[str, Any]):
                 "data": {
                     "response": result["response"],
                     "session_id": result["session_id"],
+                    "sources": result.get("sources", []),
                     "suggested_actions": suggested_actions
                 }
             }
@@ -69,6 +72,62 @@ async def chat_conversation(request: Dict[str, Any]):
         )
 
 
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """编码一条 server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/conversation/stream")
+async def chat_conversation_stream(request: Dict[str, Any]):
+    """
+    AI聊天对话接口（流式，server-sent events）
+
+    Request body 同 /chat/conversation。
+
+    响应为 text/event-stream，事件依次为:
+        start   {"session_id": "会话ID"}
+        delta   {"content": "回复分片"}（多次）
+        done    {"response": "完整回复", "session_id", "sources", "fallback", "suggested_actions"}
+        error   {"error": "错误信息"}（流式过程中出错时代替 done）
+    """
+    try:
+        message = request.get("message", "")
+        session_id = request.get("session_id")
+
+        if not message:
+            raise HTTPException(status_code=400, detail="消息不能为空")
+
+        async def events():
+            try:
+                async for event in chat_agent.chat_stream(message, session_id):
+                    name = event.pop("event")
+                    if name == "done":
+                        event["suggested_actions"] = _generate_suggested_actions(message, event["response"])
+                    yield _sse(name, event)
+            except Exception as e:
+                yield _sse("error", {"error": str(e)})
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                # 关闭 nginx 等反向代理的响应缓冲，分片到达即转发
+                "X-Accel-Buffering": "no",
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e)
+            }
+        )
+
+
 @router.post("/chat/new-session")
 async def create_new_session():
     """
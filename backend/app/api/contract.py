@@ -1,11 +1,10 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
 from io import BytesIO
-import docx
-from app.agents.contract_analyzer import ContractAnalyzer
+from app.agents.registry import agent_registry
 
 router = APIRouter()
-analyzer = ContractAnalyzer()
+analyzer = agent_registry.proxy("contract_analyzer")
 
 
 @router.post("/contract-analysis")
@@ -49,6 +48,9 @@ async def analyze_contract(file: UploadFile = File(...)):
 
 def _parse_docx(content: bytes) -> str:
     """解析DOCX文件内容"""
+    # python-docx 依赖 lxml，仅在解析上传文档时导入
+    import docx
+
     try:
         doc = docx.Document(BytesIO(content))
         text = []
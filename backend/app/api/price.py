@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional
-from app.agents.price_reference import PriceReference
+from app.agents.registry import agent_registry
+from app.schemas.price import MAX_QUOTE_LINES, BulkQuoteRequest, SimilarConfigRequest
 
 router = APIRouter()
-price_ref = PriceReference()
+price_ref = agent_registry.proxy("price_reference")
 
 
 @router.get("/price-reference")
@@ -109,6 +110,86 @@ async def analyze_price(product_name: str, quoted_price: float):
         )
 
 
+@router.post("/price-reference/analyze/bulk")
+async def analyze_quotes(request: BulkQuoteRequest):
+    """
+    批量分析报价（整包投标评审）
+
+    Request body:
+    {
+        "items": [
+            {"product_name": "Dell PowerEdge R750", "quoted_price": 70000, "quantity": 2, "supplier": "供应商A"}
+        ]
+    }
+
+    Returns:
+        - lines: 逐行参考价格与偏差
+        - package: 整包报价合计、参考合计与偏差
+        - suppliers: 各供应商的整包偏差
+        - unmatched: 未找到参考价格的产品名
+    """
+    try:
+        result = price_ref.analyze_quotes([item.model_dump() for item in request.items])
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": result
+            }
+        )
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e)
+            }
+        )
+
+
+@router.post("/price-reference/analyze/bulk/upload")
+async def analyze_quotes_upload(file: UploadFile = File(...)):
+    """
+    上传 CSV 批量分析报价
+
+    表头需包含 product_name（或 产品名称）与 quoted_price（或 报价），
+    可选 quantity（数量）、supplier（供应商）、line_id（序号）。
+    """
+    try:
+        if not file.filename.lower().endswith('.csv'):
+            raise HTTPException(status_code=400, detail="不支持的文件格式，请上传.csv文件")
+
+        from app.pricing.quotes import parse_quote_csv
+
+        content = await file.read()
+        try:
+            items = parse_quote_csv(content, MAX_QUOTE_LINES)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not items:
+            raise HTTPException(status_code=400, detail="CSV 中没有报价明细")
+
+        result = price_ref.analyze_quotes(items)
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": result,
+                "filename": file.filename
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e)
+            }
+        )
+
+
 @router.get("/price-reference/predict")
 async def predict_price(
     keyword: str = Query(..., description="产品关键词"),
@@ -143,6 +224,50 @@ async def predict_price(
         )
 
 
+@router.get("/price-reference/trend")
+async def get_price_trend(
+    category: Optional[str] = Query(None, description="商品分类"),
+    keyword: Optional[str] = Query(None, description="产品关键词"),
+    start: Optional[str] = Query(None, description="开始日期（YYYY-MM 或 YYYY-MM-DD）"),
+    end: Optional[str] = Query(None, description="结束日期（YYYY-MM 或 YYYY-MM-DD）"),
+    bucket: str = Query("month", description="时间粒度", pattern="^(week|month|quarter)$"),
+    group_by: str = Query("category", description="序列分组", pattern="^(category|product)$"),
+    max_points: int = Query(200, description="每条序列最大点数", ge=3, le=2000)
+):
+    """
+    分桶价格趋势（用于图表）
+
+    按周 / 月 / 季度聚合价格历史，每条序列超过 max_points 个点时降采样，
+    返回体量与历史长度无关。
+
+    Returns:
+        - series: 各分类（或产品）的趋势点（date / avg / min / max / count）
+        - downsampled: 是否发生降采样
+    """
+    try:
+        try:
+            result = price_ref.get_trend(category, keyword, start, end, bucket, group_by, max_points)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"参数无效: {e}")
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": result
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e)
+            }
+        )
+
+
 @router.get("/price-reference/market-insights")
 async def get_market_insights(category: Optional[str] = Query(None, description="商品分类")):
     """
@@ -171,3 +296,144 @@ async def get_market_insights(category: Optional[str] = Query(None, description=
                 "error": str(e)
             }
         )
+
+
+@router.get("/price-reference/export")
+async def export_prices(
+    format: Optional[str] = Query(None, description="导出格式 arrow / parquet / npz，默认 arrow（未安装 pyarrow 时为 npz）"),
+    category: Optional[str] = Query(None, description="商品分类")
+):
+    """
+    导出价格数据快照（流式二进制）
+
+    按块编码当前数据版本的全部价格记录，响应头 X-Data-Version 为导出的数据版本。
+    """
+    try:
+        from app.pricing.export import EXTENSIONS, MEDIA_TYPES
+
+        try:
+            fmt, version, chunks = price_ref.export_prices(format, category)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return StreamingResponse(
+            chunks,
+            media_type=MEDIA_TYPES[fmt],
+            headers={
+                "Content-Disposition": f'attachment; filename="prices-v{version}.{EXTENSIONS[fmt]}"',
+                "X-Data-Version": str(version),
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e)
+            }
+        )
+
+
+@router.get("/price-reference/cache-stats")
+async def get_cache_stats():
+    """
+    获取价格预测缓存统计
+
+    Returns:
+        - size / maxsize: 当前条目数与容量
+        - hits / misses / hit_rate: 命中统计
+        - evictions / invalidations: 淘汰次数与因数据更新而清空的次数
+        - data_version: 当前价格数据版本
+    """
+    try:
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": price_ref.cache_stats()
+            }
+        )
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e)
+            }
+        )
+
+
+@router.get("/price-reference/match")
+async def match_products(
+    q: str = Query(..., description="产品名称或描述"),
+    top_k: int = Query(5, description="返回候选数", ge=1, le=50)
+):
+    """
+    模糊匹配产品
+
+    基于名称、分类、规格的字符三元组索引，返回相似度最高的候选产品。
+
+    Returns:
+        - candidates: 候选产品（name / category / specs / score / latest_price）
+    """
+    try:
+        candidates = price_ref.match_products(q, top_k)
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": {"query": q, "candidates": candidates}
+            }
+        )
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e)
+            }
+        )
+
+
+@router.post("/price-reference/similar")
+async def find_similar_configs(request: SimilarConfigRequest):
+    """
+    检索规格相似的产品配置
+
+    Request body:
+    {
+        "text": "需求或规格描述（如 内存不少于256GB，4块2.4TB SAS硬盘）",
+        "features": {"memory_gb": 256, "storage_tb": 9.6},
+        "category": "服务器",
+        "top_k": 5
+    }
+
+    Returns:
+        - query_features: 解析得到的查询特征
+        - matches: 相似产品（含相似度与最新价格）
+        - price_reference: 相似产品的价格区间与加权均价
+    """
+    try:
+        if not request.text and not request.features:
+            raise HTTPException(status_code=400, detail="规格描述和特征不能同时为空")
+
+        result = price_ref.find_similar(request.text, request.features, request.category, request.top_k)
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": result
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e)
+            }
+        )
@@ -2,11 +2,10 @@ from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Query
 from fastapi.responses import JSONResponse
 from io import BytesIO
 from typing import Optional
-import docx
-from app.agents.requirement_reviewer import RequirementReviewer
+from app.agents.registry import agent_registry
 
 router = APIRouter()
-reviewer = RequirementReviewer()
+reviewer = agent_registry.proxy("requirement_reviewer")
 
 
 @router.get("/categories")
@@ -153,6 +152,9 @@ async def review_requirements_text(request: dict):
 
 def _parse_docx(content: bytes) -> str:
     """解析DOCX文件内容"""
+    # python-docx 依赖 lxml，仅在解析上传文档时导入
+    import docx
+
     try:
         doc = docx.Document(BytesIO(content))
         text = []
@@ -1,6 +1,18 @@
 # 核心模块
-from .rule_engine import RuleEngine
-from .field_extractor import FieldExtractor
-from .risk_detector import RiskDetector
+# 延迟导入：引用 app.core.database 等子模块时不会连带加载 jieba / yaml
+import importlib
+
+_LAZY_EXPORTS = {
+    'RuleEngine': '.rule_engine',
+    'FieldExtractor': '.field_extractor',
+    'RiskDetector': '.risk_detector',
+}
 
 __all__ = ['RuleEngine', 'FieldExtractor', 'RiskDetector']
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module = importlib.import_module(_LAZY_EXPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,7 +2,6 @@
 字段提取器模块 - 基于jieba分词提取字段
 """
 import re
-import jieba
 from typing import Dict, List, Any, Optional, Tuple
 
 
@@ -11,8 +10,6 @@ class FieldExtractor:
 
     def __init__(self):
         """初始化字段提取器"""
-        jieba.initialize()
-
         # 比较符映射
         self.comparator_map = {
             "≥": "gte", ">=": "gte", "不少于": "gte", "不低于": "gte",
@@ -248,7 +245,7 @@ class FieldExtractor:
                     return {
                         "comparator": "gte" if "不" in text[:match.start()] else "eq",
                         "value": int(groups[0]),
-                        "unit": self._normalize_unit(groups[1]) if groups[1] else unit
+                        "unit": self.normalize_unit(groups[1]) if groups[1] else unit
                     }
                 # 如果是第二个模式（核心）
                 elif len(groups) == 1 and groups[0] and groups[0].isdigit():
@@ -266,7 +263,7 @@ class FieldExtractor:
                         return {
                             "comparator": self.comparator_map.get(comparator_str, "eq"),
                             "value": int(value_str),
-                            "unit": self._normalize_unit(unit_str)
+                            "unit": self.normalize_unit(unit_str)
                         }
 
         return None
@@ -353,7 +350,7 @@ class FieldExtractor:
                 return {
                     "comparator": comparator,
                     "value": float(value_str),
-                    "unit": self._normalize_unit(unit_str)
+                    "unit": self.normalize_unit(unit_str)
                 }
             except ValueError:
                 pass
@@ -474,8 +471,8 @@ class FieldExtractor:
 
         return text[:300].strip()  # 限制长度
 
-    def _normalize_unit(self, unit: str) -> str:
-        """归一化单位"""
+    def normalize_unit(self, unit: str) -> str:
+        """归一化单位（如 "ghz" -> "GHz"、"核" -> "cores"），未知单位原样返回"""
         if not unit:
             return ""
         unit_lower = unit.lower().strip()
@@ -534,7 +531,7 @@ class FieldExtractor:
 
             numbers.append({
                 "value": value,
-                "unit": self._normalize_unit(unit),
+                "unit": self.normalize_unit(unit),
                 "context": context,
                 "position": match.start()
             })
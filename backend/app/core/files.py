@@ -0,0 +1,24 @@
+"""
+文件工具
+"""
+import os
+import tempfile
+from pathlib import Path
+
+
+def atomic_write(path: Path, data: bytes):
+    """
+    原子写入：先写同目录临时文件再替换，读取方不会看到写了一半的文件
+
+    生成的文件由多个 worker（可能以不同用户运行）只读共享，权限设为 0644。
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
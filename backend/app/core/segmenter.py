@@ -0,0 +1,256 @@
+"""
+分词器模块 - 采购领域词典与 jieba 预构建缓存
+
+- 从 data/rules/**/*.yaml（字段关键词、标签、枚举、单位别名）和价格目录
+  （品牌、型号、规格术语）生成采购领域用户词典
+- 将 jieba 主词典与领域词典合并后的前缀词典序列化为缓存文件，
+  各 worker 进程直接加载，跳过词典构建和逐词 add_word
+
+构建命令（部署时执行一次，产物位于 data/jieba/，可通过 JIEBA_CACHE_DIR 修改）:
+    python -m app.core.segmenter build
+"""
+import argparse
+import hashlib
+import json
+import marshal
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import yaml
+
+from app.core.files import atomic_write
+
+BACKEND_DIR = Path(__file__).parent.parent.parent
+DEFAULT_RULES_DIR = BACKEND_DIR / "data" / "rules"
+DEFAULT_CACHE_DIR = BACKEND_DIR / "data" / "jieba"
+
+USER_DICT_FILE = "procurement_userdict.txt"
+CACHE_FILE = "procurement.cache"
+MANIFEST_FILE = "procurement.manifest.json"
+
+# 规则文件中作为领域词汇来源的键
+VOCABULARY_KEYS = ("keywords_cn", "keywords_en", "label_cn", "name_cn", "enums",
+                   "aliases", "cn_keywords", "cn_phrases")
+
+# 规则文件之外的常用领域术语
+BUILTIN_TERMS = [
+    "机架式", "塔式", "刀片式", "高密度", "NVMe", "SSD", "HDD", "SAS", "SATA",
+    "ECC", "DDR4", "DDR5", "LPDDR5", "PCIe", "RAID", "GPU", "CPU", "Wi-Fi 6",
+    "瘦客户机", "交互平板", "会议平板", "小间距", "示波器", "频谱分析仪",
+]
+
+# 用户词典词频：足够高以保证领域词被完整切出
+USER_WORD_FREQ = 2000
+
+_lock = threading.Lock()
+_ready = False
+
+
+def get_cache_dir() -> Path:
+    return Path(os.getenv("JIEBA_CACHE_DIR") or DEFAULT_CACHE_DIR)
+
+
+def _is_valid_term(term: str) -> bool:
+    term = term.strip()
+    if len(term) < 2 or len(term) > 30:
+        return False
+    # 跳过正则片段和纯数字
+    if re.search(r"[\\()\[\]{}|^$*+?]", term):
+        return False
+    return not re.fullmatch(r"[\d\.\s%]+", term)
+
+
+def _walk_terms(node: Any, collect: bool = False) -> Iterable[str]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from _walk_terms(value, collect or key in VOCABULARY_KEYS)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _walk_terms(item, collect)
+    elif collect and isinstance(node, str):
+        # "用途/任务背景" 这类标签拆成多个词
+        for part in re.split(r"[/、]", node):
+            yield part.strip()
+
+
+def collect_rule_terms(rules_dir: Optional[Path] = None) -> List[str]:
+    """从 YAML 规则文件收集领域词汇"""
+    rules_dir = Path(rules_dir or DEFAULT_RULES_DIR)
+    terms = []
+    for path in sorted(rules_dir.rglob("*.yaml")):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                terms.extend(_walk_terms(yaml.safe_load(f) or {}))
+        except Exception as e:
+            print(f"Warning: Failed to load {path}: {e}")
+    return terms
+
+
+def collect_catalog_terms(catalog: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+    """从价格目录收集分类、品牌、型号与规格术语"""
+    terms = []
+    for category, items in catalog.items():
+        terms.append(category)
+        for item in items:
+            name = item.get("name", "")
+            terms.append(name)
+            # 品牌（名称首个片段，如 "浪潮英信"、"Dell"）与型号片段
+            terms.extend(name.split())
+            for spec in re.split(r"[,，]", item.get("specs", "")):
+                spec = spec.strip()
+                # 去掉数量前缀 "2×"、"4×2.4TB" 中的数字部分
+                spec = re.sub(r"^\d+\s*[×x]\s*", "", spec)
+                terms.append(spec)
+                terms.extend(re.findall(r"[A-Za-z][A-Za-z0-9\-\.]+|[一-龥]{2,}", spec))
+    return terms
+
+
+def build_vocabulary(rules_dir: Optional[Path] = None,
+                     catalog: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> List[str]:
+    """生成去重、排序后的领域词汇表"""
+    if catalog is None:
+        from app.agents.price_reference import PRODUCT_CATALOG
+        catalog = PRODUCT_CATALOG
+
+    terms = BUILTIN_TERMS + collect_rule_terms(rules_dir) + collect_catalog_terms(catalog)
+    # jieba 词典以空格分隔词、词频、词性，词内不能含空格
+    return sorted({t.strip() for t in terms if _is_valid_term(t) and " " not in t.strip()})
+
+
+def write_user_dict(path: Path, vocabulary: List[str]) -> Path:
+    """写出 jieba 用户词典（每行: 词 词频 词性）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = "".join(f"{word} {USER_WORD_FREQ} nz\n" for word in vocabulary)
+    atomic_write(path, content.encode("utf-8"))
+    return path
+
+
+def _fingerprint(user_dict_path: Path) -> Dict[str, str]:
+    import jieba
+    with open(user_dict_path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    return {"jieba_version": jieba.__version__, "user_dict_sha1": digest}
+
+
+def build_cache(cache_dir: Optional[Path] = None, rules_dir: Optional[Path] = None,
+                catalog: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+    """
+    构建领域词典与预构建前缀词典缓存
+
+    Returns:
+        manifest 字典（含词汇数量与指纹）
+    """
+    import jieba
+
+    cache_dir = Path(cache_dir or get_cache_dir())
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    vocabulary = build_vocabulary(rules_dir, catalog)
+    user_dict_path = write_user_dict(cache_dir / USER_DICT_FILE, vocabulary)
+
+    tokenizer = jieba.Tokenizer()
+    tokenizer.tmp_dir = str(cache_dir)
+    tokenizer.initialize()
+    tokenizer.load_userdict(str(user_dict_path))
+
+    payload = marshal.dumps((tokenizer.FREQ, tokenizer.total, tokenizer.user_word_tag_tab))
+    atomic_write(cache_dir / CACHE_FILE, payload)
+
+    manifest = {**_fingerprint(user_dict_path), "vocabulary_size": len(vocabulary)}
+    atomic_write(cache_dir / MANIFEST_FILE,
+                  json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    return manifest
+
+
+def _load_prebuilt(tokenizer, cache_dir: Path) -> bool:
+    manifest_path = cache_dir / MANIFEST_FILE
+    cache_path = cache_dir / CACHE_FILE
+    user_dict_path = cache_dir / USER_DICT_FILE
+    if not (manifest_path.exists() and cache_path.exists() and user_dict_path.exists()):
+        return False
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        fingerprint = _fingerprint(user_dict_path)
+        if any(manifest.get(k) != v for k, v in fingerprint.items()):
+            return False
+        with open(cache_path, "rb") as f:
+            freq, total, tags = marshal.load(f)
+    except Exception as e:
+        print(f"加载 jieba 预构建缓存失败: {e}")
+        return False
+
+    with tokenizer.lock:
+        tokenizer.FREQ, tokenizer.total = freq, total
+        tokenizer.user_word_tag_tab.update(tags)
+        tokenizer.initialized = True
+    return True
+
+
+def ensure_jieba():
+    """
+    初始化全局 jieba 分词器（进程内只执行一次）
+
+    优先加载预构建缓存；缓存缺失或过期时退回 jieba 默认初始化
+    （主词典缓存写入缓存目录而非系统临时目录）并加载领域词典。
+    """
+    global _ready
+    import jieba
+
+    if _ready:
+        return jieba.dt
+
+    with _lock:
+        if _ready:
+            return jieba.dt
+
+        cache_dir = get_cache_dir()
+        if not _load_prebuilt(jieba.dt, cache_dir):
+            try:
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                jieba.dt.tmp_dir = str(cache_dir)
+            except OSError:
+                pass
+            jieba.initialize()
+
+            user_dict_path = cache_dir / USER_DICT_FILE
+            try:
+                if not user_dict_path.exists():
+                    write_user_dict(user_dict_path, build_vocabulary())
+                jieba.load_userdict(str(user_dict_path))
+            except Exception as e:
+                print(f"加载采购领域词典失败: {e}")
+
+        _ready = True
+        return jieba.dt
+
+
+def cut(text: str) -> List[str]:
+    """使用领域词典分词"""
+    return list(ensure_jieba().cut(text))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="构建采购领域 jieba 词典与缓存")
+    parser.add_argument("command", choices=["build"], help="build: 生成词典与预构建缓存")
+    parser.add_argument("--cache-dir", default=None, help="输出目录，默认 data/jieba")
+    parser.add_argument("--rules-dir", default=None, help="规则目录，默认 data/rules")
+    args = parser.parse_args(argv)
+
+    manifest = build_cache(
+        Path(args.cache_dir) if args.cache_dir else None,
+        Path(args.rules_dir) if args.rules_dir else None,
+    )
+    print(f"领域词典: {manifest['vocabulary_size']} 个词条")
+    print(f"缓存目录: {args.cache_dir or get_cache_dir()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
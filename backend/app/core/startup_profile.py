@@ -0,0 +1,138 @@
+"""
+启动耗时分析
+
+- StartupProfiler: 记录应用工厂各阶段（导入路由、注册中间件、启动钩子等）的耗时
+- importtime_report: 以子进程运行 `python -X importtime`，汇总最耗时的模块导入
+
+命令行用法（在 backend 目录下）:
+    python -m app.core.startup_profile --module app.main --top 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+
+class StartupProfiler:
+    """按阶段记录启动耗时"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        """记录一个阶段的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({
+                "phase": name,
+                "ms": round((time.perf_counter() - start) * 1000, 2)
+            })
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "phases": list(self.phases),
+            "total_ms": round(sum(p["ms"] for p in self.phases), 2),
+        }
+
+    def format(self) -> str:
+        lines = [f"{p['phase']:<32}{p['ms']:>10.2f} ms" for p in self.phases]
+        lines.append(f"{'total':<32}{self.report()['total_ms']:>10.2f} ms")
+        return "\n".join(lines)
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    解析 `-X importtime` 输出
+
+    每行格式: "import time: self [us] | cumulative | imported package"
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        try:
+            entries.append({
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            })
+        except ValueError:
+            # 表头行 "self [us] | cumulative | imported package"
+            continue
+    return entries
+
+
+def importtime_report(module: str = "app.main", top: int = 20,
+                      cwd: Optional[str] = None) -> Dict[str, Any]:
+    """
+    在干净的子进程中导入模块并统计导入耗时
+
+    Args:
+        module: 要导入的模块
+        top: 返回累计耗时最高的模块数
+        cwd: 子进程工作目录，默认为 backend 目录
+
+    Returns:
+        包含总耗时、累计耗时 Top N 与自身耗时 Top N 的报告
+    """
+    if cwd is None:
+        cwd = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    entries = parse_importtime(proc.stderr)
+    target = next((e for e in entries if e["module"] == module), None)
+
+    return {
+        "module": module,
+        "returncode": proc.returncode,
+        "wall_ms": wall_ms,
+        "import_ms": target["cumulative_ms"] if target else None,
+        "top_cumulative": sorted(entries, key=lambda e: e["cumulative_ms"], reverse=True)[:top],
+        "top_self": sorted(entries, key=lambda e: e["self_ms"], reverse=True)[:top],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="统计后端启动导入耗时")
+    parser.add_argument("--module", default="app.main", help="要导入的模块")
+    parser.add_argument("--top", type=int, default=20, help="显示前 N 个模块")
+    args = parser.parse_args(argv)
+
+    report = importtime_report(args.module, args.top)
+    if report["returncode"] != 0:
+        print(f"导入 {args.module} 失败（返回码 {report['returncode']}）")
+        return report["returncode"]
+
+    print(f"模块: {report['module']}")
+    print(f"导入耗时: {report['import_ms']} ms（进程总耗时 {report['wall_ms']} ms）")
+    print("\n累计耗时 Top:")
+    for entry in report["top_cumulative"]:
+        print(f"  {entry['cumulative_ms']:>10.2f} ms  {entry['module']}")
+    print("\n自身耗时 Top:")
+    for entry in report["top_self"]:
+        print(f"  {entry['self_ms']:>10.2f} ms  {entry['module']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
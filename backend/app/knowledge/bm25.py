@@ -0,0 +1,135 @@
+"""
+BM25 倒排索引与排名融合
+
+- 文本经采购领域 jieba 分词（app.core.segmenter）后建立 词项 -> (文档ID, 词频) 倒排表
+- 查询只遍历查询词项的倒排表，按 BM25 打分：
+      score = Σ idf(t) × tf × (k1 + 1) / (tf + k1 × (1 - b + b × 文档长度 / 平均长度))
+      idf(t) = log(1 + (N - df + 0.5) / (df + 0.5))
+- reciprocal_rank_fusion 按 Σ weight / (k + 排名) 融合多路排序结果（如 BM25 与向量检索）
+"""
+import math
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_K1 = 1.5
+DEFAULT_B = 0.75
+
+# RRF 平滑常数
+DEFAULT_RRF_K = 60
+
+STOPWORDS = frozenset("的 了 和 与 及 或 是 在 等 对 为 将 把 被 从 中 上 下 应 需 可 以 其 之 并 而 也 都 就".split())
+
+_MEANINGFUL = re.compile(r"[0-9a-z一-鿿]")
+
+
+def tokenize(text: str, cut: Optional[Callable[[str], List[str]]] = None) -> List[str]:
+    """分词并去除标点、空白与停用词（英文转小写）"""
+    if cut is None:
+        from app.core import segmenter
+        cut = segmenter.cut
+    tokens = []
+    for token in cut((text or "").lower()):
+        token = token.strip()
+        if token and token not in STOPWORDS and _MEANINGFUL.search(token):
+            tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """BM25 倒排索引（文档ID按 0, 1, 2... 顺序追加）"""
+
+    def __init__(self, k1: float = DEFAULT_K1, b: float = DEFAULT_B,
+                 cut: Optional[Callable[[str], List[str]]] = None):
+        self.k1 = k1
+        self.b = b
+        self._cut = cut
+        # 词项 -> ([文档ID], [词频])
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        # 词项 -> (文档ID数组, 词频数组)，查询时按需从倒排表转换
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lengths: List[int] = []
+        self._total_length = 0
+        self._length_array: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, text: str) -> int:
+        """追加文档，返回文档ID"""
+        doc_id = len(self._lengths)
+        tokens = tokenize(text, self._cut)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = ([], [])
+            posting[0].append(doc_id)
+            posting[1].append(tf)
+            self._arrays.pop(token, None)
+        self._lengths.append(len(tokens))
+        self._total_length += len(tokens)
+        self._length_array = None
+        return doc_id
+
+    def _posting_arrays(self, token: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(token)
+        if arrays is None:
+            ids, tfs = self._postings[token]
+            arrays = self._arrays[token] = (np.array(ids, dtype=np.int64), np.array(tfs, dtype=np.float64))
+        return arrays
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float]]:
+        """
+        BM25 检索
+
+        Returns:
+            [(文档ID, 分数)]，只含至少命中一个词项的文档，按分数降序
+        """
+        n = len(self._lengths)
+        terms = [t for t in dict.fromkeys(tokenize(query, self._cut)) if t in self._postings]
+        if n == 0 or not terms:
+            return []
+
+        if self._length_array is None:
+            self._length_array = np.array(self._lengths, dtype=np.float64)
+        avg_length = self._total_length / n or 1.0
+
+        all_ids, all_scores = [], []
+        for term in terms:
+            ids, tfs = self._posting_arrays(term)
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self._length_array[ids] / avg_length)
+            all_ids.append(ids)
+            all_scores.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+        doc_ids, inverse = np.unique(np.concatenate(all_ids), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(all_scores))
+        k = min(top_k, len(doc_ids))
+        top = np.argpartition(-totals, k - 1)[:k]
+        top = top[np.lexsort((doc_ids[top], -totals[top]))]
+        return list(zip(doc_ids[top].tolist(), totals[top].tolist()))
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = DEFAULT_RRF_K,
+                           weights: Optional[Sequence[float]] = None) -> List[Tuple[int, float]]:
+    """
+    倒数排名融合
+
+    Args:
+        rankings: 多路排序结果（文档ID按相关性降序）
+        k: 平滑常数，越大排名靠后的结果影响越大
+        weights: 各路权重，默认均为 1
+
+    Returns:
+        [(文档ID, 融合分数)]，按分数降序（同分时按首次出现顺序）
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[int, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
@@ -0,0 +1,213 @@
+"""
+知识文件结构化分块
+
+- Markdown 按标题（# ~ ######，忽略代码块内的 #）切分为章节，每个分块携带标题路径，
+  如 ["服务器选型指南", "关键配置"]；纯文本文件视为一个无标题章节
+- 章节正文按段落、句子切分为片段，在 token 预算内贪心装箱；超出预算的章节拆成多块，
+  后一块以前一块末尾不超过 overlap 个 token 的片段开头，避免语义在块边界被截断
+- 超长的单个句子按 token 硬切分
+- 正文不足 min_tokens 的短章节（如只有一句引言的上级标题）并入下一章节的首块，
+  连续的短章节累计达到 min_tokens 时单独成块，文末的短章节并入上一块
+- token 数为近似值：每个汉字、每个英文单词/数字串、每个其他非空白符号各计 1 个，
+  与 BERT 类中文嵌入模型的分词粒度接近
+
+每个分块的正文以所属章节的标题行开头，与原先按 ## 切分的章节格式一致。
+"""
+import re
+from typing import Dict, List, Optional
+
+# 默认每块 token 上限（bge-small-zh 最大输入 512）与相邻块重叠的 token 数
+DEFAULT_MAX_TOKENS = 400
+DEFAULT_OVERLAP_TOKENS = 50
+# 章节正文少于该 token 数时与相邻章节合并，避免只含一两句话的分块
+DEFAULT_MIN_TOKENS = 30
+
+_TOKEN = re.compile(r"[一-鿿]|[0-9A-Za-z_]+|[^\s0-9A-Za-z_一-鿿]")
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)", re.MULTILINE)
+# 句末标点（含其后的空白）或换行处断句，标点保留在前一句
+_SENTENCE_END = re.compile(r"(?<=[。！？；!?;])\s*|(?<=\.)\s+|\n")
+
+
+def count_tokens(text: str) -> int:
+    """近似 token 数"""
+    return len(_TOKEN.findall(text))
+
+
+def split_sections(content: str) -> List[Dict]:
+    """
+    按 Markdown 标题切分章节
+
+    Returns:
+        [{"headings": 标题路径, "heading": 标题行（无标题时为空串）, "body": 正文}]
+    """
+    sections = []
+    path: List[str] = []
+    levels: List[int] = []
+    heading = ""
+    body: List[str] = []
+    in_fence = False
+
+    def flush():
+        sections.append({"headings": list(path), "heading": heading, "body": "\n".join(body).strip()})
+
+    for line in content.splitlines():
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING.match(line)
+        if match is None:
+            body.append(line)
+            continue
+        flush()
+        level = len(match.group(1))
+        # 弹出同级及更深的标题
+        while levels and levels[-1] >= level:
+            levels.pop()
+            path.pop()
+        levels.append(level)
+        path.append(match.group(2))
+        heading = line.strip()
+        body = []
+    flush()
+    return [s for s in sections if s["body"]]
+
+
+def _pieces(body: str) -> List[str]:
+    """切分为段落内的句子片段，片段拼接后还原正文（段落间保留空行）"""
+    pieces = []
+    paragraphs = re.split(r"\n\s*\n", body)
+    for p_index, paragraph in enumerate(paragraphs):
+        sentences = []
+        if _FENCE.search(paragraph):
+            # 含代码块的段落整体作为一个片段
+            sentences.append(paragraph)
+        else:
+            start = 0
+            for match in _SENTENCE_END.finditer(paragraph):
+                if match.end() > start:
+                    sentences.append(paragraph[start:match.end()])
+                    start = match.end()
+            sentences.append(paragraph[start:])
+        sentences = [s for s in sentences if s.strip()]
+        if sentences and p_index < len(paragraphs) - 1:
+            sentences[-1] = sentences[-1].rstrip() + "\n\n"
+        pieces.extend(sentences)
+    return pieces
+
+
+def _hard_split(text: str, max_tokens: int) -> List[str]:
+    """按 token 边界硬切分超长片段"""
+    spans = [m.end() for m in _TOKEN.finditer(text)]
+    parts = []
+    start = 0
+    for i in range(max_tokens - 1, len(spans), max_tokens):
+        parts.append(text[start:spans[i]])
+        start = spans[i]
+    if text[start:].strip():
+        parts.append(text[start:])
+    return parts
+
+
+def _pack(pieces: List[str], max_tokens: int, overlap_tokens: int) -> List[str]:
+    """在 token 预算内贪心装箱，新块以上一块末尾的重叠片段开头"""
+    units = []
+    for piece in pieces:
+        tokens = count_tokens(piece)
+        if tokens > max_tokens:
+            units.extend((part, count_tokens(part)) for part in _hard_split(piece, max_tokens))
+        else:
+            units.append((piece, tokens))
+
+    chunks = []
+    current: List[tuple] = []
+    size = 0
+    for unit in units:
+        if current and size + unit[1] > max_tokens:
+            chunks.append("".join(text for text, _ in current).strip())
+            overlap, overlap_size = [], 0
+            for text, tokens in reversed(current):
+                if overlap_size + tokens > overlap_tokens or overlap_size + tokens + unit[1] > max_tokens:
+                    break
+                overlap.insert(0, (text, tokens))
+                overlap_size += tokens
+            current, size = overlap, overlap_size
+        current.append(unit)
+        size += unit[1]
+    if current:
+        chunks.append("".join(text for text, _ in current).strip())
+    return chunks
+
+
+def _common_headings(paths: List[List[str]]) -> List[str]:
+    common = paths[0]
+    for path in paths[1:]:
+        n = 0
+        while n < min(len(common), len(path)) and common[n] == path[n]:
+            n += 1
+        common = common[:n]
+    return list(common)
+
+
+def chunk_markdown(content: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                   overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+                   min_tokens: int = DEFAULT_MIN_TOKENS) -> List[Dict]:
+    """
+    将 Markdown / 纯文本切分为带标题路径的分块
+
+    Args:
+        content: 文件内容
+        max_tokens: 每块正文的 token 上限（不含标题行；并入的短章节最多再增加 min_tokens）
+        overlap_tokens: 相邻块重叠的 token 上限
+        min_tokens: 章节正文少于该值时与相邻章节合并（0 不合并）
+
+    Returns:
+        [{"content": 标题行 + 正文, "headings": 标题路径, "tokens": 正文 token 数}]
+    """
+    max_tokens = max(1, max_tokens)
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+    chunks = []
+    # 等待并入下一章节的短章节：(标题行 + 正文, token 数, 标题路径)
+    pending: List[tuple] = []
+
+    def flush_pending():
+        chunks.append({
+            "content": "\n\n".join(text for text, _, _ in pending),
+            "headings": _common_headings([headings for _, _, headings in pending]),
+            "tokens": sum(tokens for _, tokens, _ in pending),
+        })
+        pending.clear()
+
+    for section in split_sections(content):
+        body_tokens = count_tokens(section["body"])
+        if body_tokens < min_tokens:
+            text = f"{section['heading']}\n{section['body']}" if section["heading"] else section["body"]
+            pending.append((text, count_tokens(text), section["headings"]))
+            if sum(tokens for _, tokens, _ in pending) >= min_tokens:
+                flush_pending()
+            continue
+
+        for text in _pack(_pieces(section["body"]), max_tokens, overlap_tokens):
+            chunk = {
+                "content": f"{section['heading']}\n{text}" if section["heading"] else text,
+                "headings": section["headings"],
+                "tokens": count_tokens(text),
+            }
+            if pending:
+                chunk["content"] = "\n\n".join([text for text, _, _ in pending] + [chunk["content"]])
+                chunk["tokens"] += sum(tokens for _, tokens, _ in pending)
+                pending.clear()
+            chunks.append(chunk)
+
+    if pending:
+        if chunks:
+            chunks[-1]["content"] = "\n\n".join([chunks[-1]["content"]] + [text for text, _, _ in pending])
+            chunks[-1]["tokens"] += sum(tokens for _, tokens, _ in pending)
+            pending.clear()
+        else:
+            # 整个文件都很短时保留为一块
+            flush_pending()
+    return chunks
+
+
+def heading_label(headings: Optional[List[str]]) -> str:
+    return " > ".join(headings or [])
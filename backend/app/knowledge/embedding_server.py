@@ -0,0 +1,293 @@
+"""
+本地嵌入模型服务（sidecar）
+
+多个 uvicorn worker 各自加载一份 SentenceTransformer 权重会成倍占用内存。嵌入服务作为独立进程
+只加载一次模型，通过 Unix socket 为所有 worker 编码；各 worker 的请求在服务端合并为批次
+（QueryEncoder 微批），worker 越多批量越满。
+
+启动（在 backend 目录下）:
+    python -m app.knowledge.embedding_server --socket /tmp/smart_procurement_embedding.sock
+worker 侧设置 KNOWLEDGE_ENCODER_BACKEND=remote 与相同的 KNOWLEDGE_EMBEDDING_SOCKET。
+
+帧格式（请求与响应相同）:
+    4 字节大端 JSON 头长度 + 4 字节大端负载长度 + UTF-8 JSON 头 + 负载
+    请求  {"op": "encode", "texts": [...]} / {"op": "info"}，无负载
+    响应  {"ok": true, "shape": [n, dim]} + float32 行优先向量；
+          {"ok": false, "error": "..."}；info 返回模型标识、维度与批处理统计
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.knowledge.query_encoder import QueryEncoder
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "smart_procurement_embedding.sock")
+
+_HEADER = struct.Struct(">II")
+# 单帧上限，防止异常请求耗尽内存
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+# 客户端每个请求最多携带的文本数
+CLIENT_CHUNK = 256
+# 单次请求的默认超时（秒），按请求中的文本数成比例放宽
+DEFAULT_TIMEOUT = 30.0
+# 连接级错误（服务重启、连接被关闭、socket 文件不存在）才重连重试；超时不重试，
+# 否则慢请求会被再次提交，服务端负载翻倍后仍然超时
+RETRYABLE_ERRORS = (ConnectionError, FileNotFoundError)
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+
+
+def get_socket_path() -> str:
+    return os.getenv("KNOWLEDGE_EMBEDDING_SOCKET") or DEFAULT_SOCKET
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("连接已关闭")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_frame(sock: socket.socket, header: Dict[str, Any], payload: bytes = b""):
+    data = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data), len(payload)) + data + payload)
+
+
+def recv_frame(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    header_size, payload_size = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if header_size + payload_size > MAX_FRAME_BYTES:
+        raise ValueError(f"帧大小 {header_size + payload_size} 超过上限")
+    header = json.loads(_recv_exact(sock, header_size).decode("utf-8"))
+    payload = _recv_exact(sock, payload_size) if payload_size else b""
+    return header, payload
+
+
+# ---------------------------------------------------------------------- 服务端
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server: "EmbeddingServer" = self.server
+        while True:
+            try:
+                request, _ = recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+            except ValueError as e:
+                send_frame(self.request, {"ok": False, "error": str(e)})
+                return
+            try:
+                header, payload = server.dispatch(request)
+            except Exception as e:
+                header, payload = {"ok": False, "error": str(e)}, b""
+            try:
+                send_frame(self.request, header, payload)
+            except OSError:
+                return
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket 嵌入服务：每个连接一个线程，编码请求汇入共享的微批编码器"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, socket_path: str, model: Any, model_id: str,
+                 max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+                 cache_size: int = 0):
+        """
+        Args:
+            socket_path: Unix socket 路径
+            model: 提供 encode(texts) 的嵌入模型
+            model_id: 嵌入存储使用的模型标识（客户端据此区分向量目录）
+            max_batch: 每批最多合并的文本数
+            max_wait_ms: 收到首条文本后等待更多请求的时间
+            cache_size: 服务端缓存的向量条数（worker 侧已有查询缓存，默认关闭）
+        """
+        _remove_stale_socket(socket_path)
+        self.model_id = model_id
+        self.encoder = QueryEncoder(model, cache_size=cache_size, max_batch=max_batch, max_wait_ms=max_wait_ms)
+        probe = np.asarray(model.encode(["维度探测"], show_progress_bar=False), dtype=np.float32)
+        self.dim = int(probe.shape[1])
+        self.requests = 0
+        self._requests_lock = threading.Lock()
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o660)
+
+    def dispatch(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        op = request.get("op")
+        if op == "info":
+            return {"ok": True, "model": self.model_id, "dim": self.dim,
+                    "requests": self.requests, "stats": self.encoder.stats()}, b""
+        if op == "encode":
+            texts = request.get("texts")
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise ValueError("texts 必须为字符串列表")
+            with self._requests_lock:
+                self.requests += 1
+            if not texts:
+                return {"ok": True, "shape": [0, self.dim]}, b""
+            vectors = np.ascontiguousarray(self.encoder.encode_many(texts), dtype=np.float32)
+            return {"ok": True, "shape": list(vectors.shape)}, vectors.tobytes()
+        raise ValueError(f"未知操作: {op}")
+
+    def server_close(self):
+        super().server_close()
+        self.encoder.close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def _remove_stale_socket(socket_path: str):
+    """删除上次异常退出残留的 socket 文件；已有服务在监听时报错"""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+    else:
+        raise RuntimeError(f"嵌入服务已在 {socket_path} 运行")
+    finally:
+        probe.close()
+
+
+# ---------------------------------------------------------------------- 客户端
+
+
+class RemoteEncoder:
+    """嵌入服务客户端，接口与 SentenceTransformer.encode 兼容；每个线程使用独立连接"""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT,
+                 connect_timeout: float = 0.0):
+        """
+        Args:
+            socket_path: Unix socket 路径，默认 KNOWLEDGE_EMBEDDING_SOCKET
+            timeout: 单次请求超时（秒）；编码请求按文本数每 DEFAULT_MAX_BATCH 条放宽一倍
+            connect_timeout: 首次连接时等待服务启动的时间（秒）
+        """
+        self.socket_path = socket_path or get_socket_path()
+        self.timeout = timeout
+        self._local = threading.local()
+
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            try:
+                info = self.info()
+                break
+            except OSError as e:
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(f"无法连接嵌入服务 {self.socket_path}: {e}")
+                time.sleep(0.5)
+        self.model_id: str = info["model"]
+        self.dim: int = info["dim"]
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        # 已被关闭的连接（fileno 为 -1）同样重新建立
+        if sock is None or sock.fileno() < 0:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _reset(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _call(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        texts = request.get("texts") or []
+        timeout = self.timeout * max(1.0, len(texts) / DEFAULT_MAX_BATCH)
+        # 服务重启后旧连接失效，重连重试一次
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.settimeout(timeout)
+                send_frame(sock, request)
+                header, payload = recv_frame(sock)
+                break
+            except RETRYABLE_ERRORS:
+                self._reset()
+                if attempt:
+                    raise
+            except OSError:
+                # 超时等错误：连接上可能还有未读完的响应，关闭后直接抛出
+                self._reset()
+                raise
+        if not header.get("ok"):
+            raise RuntimeError(f"嵌入服务错误: {header.get('error')}")
+        return header, payload
+
+    def info(self) -> Dict[str, Any]:
+        return self._call({"op": "info"})[0]
+
+    def encode(self, texts, show_progress_bar: bool = False, batch_size: Optional[int] = None,
+               **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts: List[str] = [texts] if single else list(texts)
+        parts = []
+        for start in range(0, len(texts), CLIENT_CHUNK):
+            header, payload = self._call({"op": "encode", "texts": texts[start:start + CLIENT_CHUNK]})
+            parts.append(np.frombuffer(payload, dtype=np.float32).reshape(header["shape"]))
+        vectors = np.concatenate(parts) if parts else np.zeros((0, self.dim), dtype=np.float32)
+        return vectors[0] if single else vectors
+
+    def close(self):
+        self._reset()
+
+
+def main(argv=None) -> int:
+    from app.knowledge.encoders import load_encoder
+    from app.knowledge.knowledge_base import KnowledgeBase
+
+    parser = argparse.ArgumentParser(description="本地嵌入模型服务")
+    parser.add_argument("--socket", default=get_socket_path(), help="Unix socket 路径")
+    parser.add_argument("--model", default=KnowledgeBase.DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--backend", default=None, help="torch / onnx，默认 KNOWLEDGE_ENCODER_BACKEND")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    args = parser.parse_args(argv)
+
+    backend = args.backend or os.getenv("KNOWLEDGE_ENCODER_BACKEND", "torch")
+    if backend == "remote":
+        backend = "torch"
+    start = time.perf_counter()
+    model, model_id = load_encoder(args.model, backend)
+    server = EmbeddingServer(args.socket, model, model_id, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    print(f"嵌入服务已启动: {args.socket}（{model_id}，{backend}，加载耗时 {time.perf_counter() - start:.1f}s）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
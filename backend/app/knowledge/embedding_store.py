@@ -0,0 +1,217 @@
+"""
+知识库嵌入向量持久化存储
+
+文档嵌入只需计算一次，之后在重启和多个 worker 之间复用：
+- vectors.bin      行优先的 float32 / float16 矩阵，只追加，按内存映射读取
+- manifest.json    模型名、维度、精度、有效行数与每行对应的内容哈希
+
+目录按模型名与精度区分（data/embeddings/<模型名>/，float16 为 <模型名>--float16/），
+内容哈希为文本的 SHA-1，
+同一文本在任何进程、任何加载顺序下都命中同一行。追加时持有文件锁：
+先截断到 manifest 记录的行数（丢弃中断写入的残留），写入向量后原子替换 manifest；
+其他进程发现 manifest 变化后重新映射。目录中已有其他模型或精度写入的数据时拒绝写入，
+不会截断其他 worker 正在映射的文件。
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.files import atomic_write
+
+try:
+    import fcntl
+except ImportError:  # Windows 下不做跨进程加锁
+    fcntl = None
+
+BACKEND_DIR = Path(__file__).parent.parent.parent
+DEFAULT_EMBEDDING_DIR = BACKEND_DIR / "data" / "embeddings"
+
+VECTORS_FILE = "vectors.bin"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+
+DTYPES = ("float32", "float16")
+
+
+def get_embedding_dir() -> Path:
+    return Path(os.getenv("KNOWLEDGE_EMBEDDING_DIR") or DEFAULT_EMBEDDING_DIR)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _model_dirname(model_name: str, dtype: str = "float32") -> str:
+    # "BAAI/bge-small-zh-v1.5" -> "BAAI--bge-small-zh-v1.5"；float16 -> "BAAI--bge-small-zh-v1.5--float16"
+    name = re.sub(r"[^0-9A-Za-z._-]+", "--", model_name).strip("-") or "default"
+    # float32 沿用原目录名，已有的存储无需重新计算
+    return name if dtype == "float32" else f"{name}--{dtype}"
+
+
+class EmbeddingStore:
+    """按内容哈希索引的嵌入矩阵（内存映射，只追加）"""
+
+    def __init__(self, model_name: str, directory: Optional[Path] = None, dtype: str = "float32"):
+        """
+        Args:
+            model_name: 嵌入模型名（不同模型的向量分目录存放）
+            directory: 根目录，默认 KNOWLEDGE_EMBEDDING_DIR 或 data/embeddings
+            dtype: 磁盘存储精度 float32 / float16（读取时统一转为 float32）
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"不支持的嵌入精度: {dtype}，可选 {', '.join(DTYPES)}")
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype)
+        self.path = Path(directory or get_embedding_dir()) / _model_dirname(model_name, self.dtype.name)
+        self.dim: Optional[int] = None
+        self._hashes: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._manifest_stat: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._rows
+
+    # ------------------------------------------------------------------ 读取
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = (self.path / MANIFEST_FILE).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_raw_manifest(self) -> Optional[Dict]:
+        try:
+            with open(self.path / MANIFEST_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _compatible(self, manifest: Dict) -> bool:
+        return manifest.get("model") == self.model_name and manifest.get("dtype") == self.dtype.name
+
+    def _read_manifest(self) -> Optional[Dict]:
+        manifest = self._read_raw_manifest()
+        # 模型或精度不一致的目录不复用
+        if manifest is None or not self._compatible(manifest):
+            return None
+        return manifest
+
+    def reload(self) -> bool:
+        """manifest 变化（其他进程追加）时重新映射，返回是否重新加载"""
+        stat = self._stat()
+        if stat is not None and stat == self._manifest_stat:
+            return False
+
+        with self._lock:
+            manifest = self._read_manifest() if stat is not None else None
+            hashes = manifest["hashes"] if manifest else []
+            self.dim = manifest["dim"] if manifest else None
+            self._hashes = list(hashes)
+            self._rows = {digest: row for row, digest in enumerate(hashes)}
+            self._matrix = None
+            if hashes:
+                self._matrix = np.memmap(self.path / VECTORS_FILE, dtype=self.dtype, mode="r",
+                                         shape=(len(hashes), self.dim))
+            self._manifest_stat = stat
+        return True
+
+    def lookup(self, digests: Sequence[str]) -> Tuple[np.ndarray, List[int]]:
+        """
+        按内容哈希查找行号
+
+        Returns:
+            (行号数组，未命中为 -1, 未命中项在 digests 中的位置)
+        """
+        self.reload()
+        rows = np.array([self._rows.get(d, -1) for d in digests], dtype=np.int64)
+        return rows, np.flatnonzero(rows < 0).tolist()
+
+    def vectors(self, rows: Sequence[int]) -> np.ndarray:
+        """按行号取出向量（float32 副本）"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if self._matrix is None or len(rows) == 0:
+            return np.zeros((len(rows), self.dim or 0), dtype=np.float32)
+        return np.asarray(self._matrix[rows], dtype=np.float32)
+
+    # ------------------------------------------------------------------ 写入
+
+    @contextmanager
+    def _file_lock(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / LOCK_FILE, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, digests: Iterable[str], vectors: np.ndarray) -> int:
+        """
+        追加向量（已存在的哈希跳过）
+
+        Returns:
+            实际写入的行数
+        """
+        digests = list(digests)
+        vectors = np.asarray(vectors)
+        if len(digests) != len(vectors):
+            raise ValueError("哈希数量与向量数量不一致")
+        if not digests:
+            return 0
+
+        with self._file_lock():
+            # 加锁后以磁盘上的 manifest 为准，避免覆盖其他进程的追加
+            self._manifest_stat = None
+            self.reload()
+            existing = self._read_raw_manifest()
+            if existing is not None and not self._compatible(existing):
+                # 目录由其他模型或精度写入（如模型名规范化后重名），其他 worker 可能正在映射，不能截断
+                raise RuntimeError(
+                    f"嵌入目录 {self.path} 已存放 {existing.get('model')}（{existing.get('dtype')}）的向量，"
+                    f"与当前 {self.model_name}（{self.dtype.name}）不一致，拒绝覆盖"
+                )
+            if self.dim is not None and vectors.shape[1] != self.dim:
+                raise ValueError(f"向量维度 {vectors.shape[1]} 与已有索引维度 {self.dim} 不一致")
+
+            fresh = []
+            seen = set(self._rows)
+            for i, digest in enumerate(digests):
+                if digest not in seen:
+                    seen.add(digest)
+                    fresh.append(i)
+            if not fresh:
+                return 0
+
+            row_bytes = vectors.shape[1] * self.dtype.itemsize
+            with open(self.path / VECTORS_FILE, "ab") as f:
+                f.truncate(len(self._hashes) * row_bytes)
+                f.write(np.ascontiguousarray(vectors[fresh], dtype=self.dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            manifest = {
+                "model": self.model_name,
+                "dim": int(vectors.shape[1]),
+                "dtype": self.dtype.name,
+                "count": len(self._hashes) + len(fresh),
+                "hashes": self._hashes + [digests[i] for i in fresh],
+            }
+            atomic_write(self.path / MANIFEST_FILE, json.dumps(manifest).encode("utf-8"))
+            self.reload()
+        return len(fresh)
@@ -0,0 +1,192 @@
+"""
+嵌入模型推理后端
+
+- torch  sentence-transformers + PyTorch（默认）
+- onnx   onnxruntime 运行导出的 ONNX 模型（可选 int8 动态量化版本），
+         分词使用 tokenizers，不依赖 PyTorch；CPU 服务器上加载与编码都明显更快
+- remote 通过 Unix socket 调用本地嵌入服务（app.knowledge.embedding_server），
+         多个 worker 共用一份模型权重
+
+ONNX 模型目录（由 scripts/export_onnx_model.py 生成）:
+    model.onnx              float32 模型
+    model_quantized.onnx    int8 动态量化模型（可选）
+    tokenizer.json          分词器
+    pooling.json            {"mode": "cls" | "mean", "normalize": true, "max_length": 512}
+
+通过环境变量配置:
+    KNOWLEDGE_ENCODER_BACKEND  torch（默认）/ onnx / remote
+    KNOWLEDGE_ONNX_DIR         模型根目录，默认 data/models（其下按模型名分目录）
+    KNOWLEDGE_ONNX_QUANTIZED   1 时使用 model_quantized.onnx
+    KNOWLEDGE_ONNX_THREADS     推理线程数，默认 0（onnxruntime 自动选择）
+    KNOWLEDGE_EMBEDDING_SOCKET          嵌入服务的 Unix socket 路径
+    KNOWLEDGE_EMBEDDING_CONNECT_TIMEOUT 等待嵌入服务启动的秒数，默认 30
+    KNOWLEDGE_EMBEDDING_TIMEOUT         单次编码请求超时秒数，默认 30（按文本数放宽）
+"""
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+BACKENDS = ("torch", "onnx", "remote")
+
+BACKEND_DIR = Path(__file__).parent.parent.parent
+DEFAULT_ONNX_DIR = BACKEND_DIR / "data" / "models"
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+POOLING_FILE = "pooling.json"
+
+POOLING_MODES = ("cls", "mean")
+DEFAULT_MAX_LENGTH = 512
+DEFAULT_BATCH_SIZE = 32
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    backend = backend or os.getenv("KNOWLEDGE_ENCODER_BACKEND", "torch")
+    if backend not in BACKENDS:
+        raise ValueError(f"不支持的嵌入推理后端: {backend}，可选 {', '.join(BACKENDS)}")
+    return backend
+
+
+def onnx_model_dir(model_name: str, root: Optional[str] = None) -> Path:
+    """模型名对应的 ONNX 目录，如 BAAI/bge-small-zh-v1.5 -> data/models/BAAI--bge-small-zh-v1.5"""
+    root = Path(root or os.getenv("KNOWLEDGE_ONNX_DIR") or DEFAULT_ONNX_DIR)
+    return root / (re.sub(r"[^0-9A-Za-z._-]+", "--", model_name).strip("-") or "default")
+
+
+def pool(hidden: np.ndarray, attention_mask: np.ndarray, mode: str = "cls", normalize: bool = True) -> np.ndarray:
+    """
+    将 token 级输出池化为句向量
+
+    Args:
+        hidden: (batch, seq, dim) 最后一层隐状态
+        attention_mask: (batch, seq)，padding 位置为 0
+        mode: cls 取首个 token；mean 按 attention_mask 求平均
+        normalize: 是否 L2 归一化
+    """
+    if mode == "cls":
+        vectors = hidden[:, 0]
+    elif mode == "mean":
+        mask = attention_mask[..., None].astype(hidden.dtype)
+        vectors = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+    else:
+        raise ValueError(f"不支持的池化方式: {mode}，可选 {', '.join(POOLING_MODES)}")
+    vectors = vectors.astype(np.float32)
+    if normalize:
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors
+
+
+class OnnxEncoder:
+    """onnxruntime 句向量编码器，接口与 SentenceTransformer.encode 兼容"""
+
+    def __init__(self, model_dir: str, quantized: bool = False, threads: int = 0,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Args:
+            model_dir: 导出目录（含 model.onnx、tokenizer.json、pooling.json）
+            quantized: 使用 int8 量化模型 model_quantized.onnx
+            threads: 算子内并行线程数，0 由 onnxruntime 决定
+            batch_size: 每次推理的最大文本数
+        """
+        try:
+            import onnxruntime
+        except ImportError:
+            raise RuntimeError("ONNX 推理需要安装 onnxruntime")
+        try:
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise RuntimeError("ONNX 推理需要安装 tokenizers")
+
+        self.model_dir = Path(model_dir)
+        model_path = self.model_dir / (QUANTIZED_MODEL_FILE if quantized else MODEL_FILE)
+        if not model_path.exists():
+            raise RuntimeError(f"未找到 ONNX 模型 {model_path}，请先运行 scripts/export_onnx_model.py")
+
+        self.quantized = quantized
+        self.batch_size = max(1, batch_size)
+        self.pooling = self._read_pooling()
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.pooling["max_length"])
+        self.tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _read_pooling(self) -> Dict[str, Any]:
+        pooling = {"mode": "cls", "normalize": True, "max_length": DEFAULT_MAX_LENGTH}
+        try:
+            with open(self.model_dir / POOLING_FILE, "r", encoding="utf-8") as f:
+                pooling.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        return pooling
+
+    def _run(self, texts: Sequence[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {k: v for k, v in inputs.items() if k in self._input_names})[0]
+        return pool(hidden, inputs["attention_mask"], self.pooling["mode"], self.pooling["normalize"])
+
+    def encode(self, texts, show_progress_bar: bool = False, batch_size: Optional[int] = None,
+               **kwargs) -> np.ndarray:
+        """编码文本列表，返回 (n, dim) float32；传入单个字符串时返回一维向量"""
+        single = isinstance(texts, str)
+        texts: List[str] = [texts] if single else list(texts)
+        batch_size = batch_size or self.batch_size
+        # 按长度排序后分批，减少 padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: Optional[np.ndarray] = None
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            encoded = self._run([texts[i] for i in batch])
+            if vectors is None:
+                vectors = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+            vectors[batch] = encoded
+        if vectors is None:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        return vectors[0] if single else vectors
+
+
+def load_encoder(model_name: str, backend: Optional[str] = None):
+    """
+    按后端加载嵌入模型
+
+    Returns:
+        (模型, 嵌入存储使用的模型标识)；int8 量化模型的向量与原模型略有差异，单独存放
+    """
+    backend = resolve_backend(backend)
+    if backend == "remote":
+        from app.knowledge.embedding_server import RemoteEncoder
+
+        # 模型由嵌入服务决定，向量按服务端的模型标识存放
+        encoder = RemoteEncoder(
+            timeout=float(os.getenv("KNOWLEDGE_EMBEDDING_TIMEOUT", "30")),
+            connect_timeout=float(os.getenv("KNOWLEDGE_EMBEDDING_CONNECT_TIMEOUT", "30")),
+        )
+        return encoder, encoder.model_id
+    if backend == "onnx":
+        quantized = os.getenv("KNOWLEDGE_ONNX_QUANTIZED", "0").lower() in ("1", "true", "yes")
+        encoder = OnnxEncoder(
+            str(onnx_model_dir(model_name)),
+            quantized=quantized,
+            threads=int(os.getenv("KNOWLEDGE_ONNX_THREADS", "0")),
+        )
+        return encoder, f"{model_name}@onnx-int8" if quantized else model_name
+
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name), model_name
@@ -1,6 +1,17 @@
 import os
-import glob
-from typing import List, Dict, Any
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from app.knowledge.bm25 import BM25Index, reciprocal_rank_fusion
+from app.knowledge.chunking import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS, heading_label
+from app.knowledge.embedding_store import EmbeddingStore, content_hash
+from app.knowledge.encoders import load_encoder, resolve_backend
+from app.knowledge.query_encoder import QueryEncoder
+from app.knowledge.sources import KnowledgeFiles
+from app.knowledge.vector_index import VectorIndex, create_vector_index, resolve_index_kind
 
 
 class KnowledgeBase:
@@ -8,92 +19,250 @@ class KnowledgeBase:
 
     # 中文嵌入模型 - 专为中文语义优化
     DEFAULT_EMBEDDING_MODEL = "BAAI/bge-small-zh-v1.5"
+    # 主模型加载失败时的备用多语言模型
+    FALLBACK_EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+    # 语义检索结果的相似度阈值
+    SIMILARITY_THRESHOLD = 0.3
 
-    def __init__(self, embedding_model: str = None):
+    # 混合检索时每一路召回的候选数（top_k 的倍数）
+    HYBRID_CANDIDATES = 4
+
+    def __init__(self, embedding_model: str = None, embedding_dir: str = None, index_kind: str = None,
+                 knowledge_dir: str = None):
         """
         初始化知识库
 
         Args:
             embedding_model: 嵌入模型名称，默认使用中文模型 BAAI/bge-small-zh-v1.5
+            embedding_dir: 嵌入向量与知识文件清单的持久化目录，默认 KNOWLEDGE_EMBEDDING_DIR 或 data/embeddings
+            index_kind: 向量索引类型 auto / flat / ivf / hnsw，默认 KNOWLEDGE_VECTOR_INDEX
+            knowledge_dir: 知识文件目录，默认 data/knowledge
         """
         self.documents: List[Dict[str, Any]] = []
-        self.embeddings = None
+        # 向量索引中的第 i 条对应 documents[i]；新增文档只补算增量部分
+        self.vector_index: Optional[VectorIndex] = None
+        # 向量索引第 i 条在嵌入存储中的行号（量化索引据此取回原始向量重排）
+        self._index_rows = np.zeros(0, dtype=np.int64)
+        self._index_kind = index_kind
         self.model = None
         self._model_name = embedding_model or self.DEFAULT_EMBEDDING_MODEL
         self._model_loaded = False
+        self._embedding_dir = embedding_dir
+        # 嵌入向量存储，加载模型后按实际使用的模型名创建
+        self.embedding_store: Optional[EmbeddingStore] = None
+        # 查询向量编码器（缓存 + 微批），绑定当前模型
+        self._query_encoder: Optional[QueryEncoder] = None
+        # BM25 倒排索引，第 i 条对应 documents[i]，查询时补齐新增文档
+        self.bm25 = BM25Index()
+        # 语义检索时是否与 BM25 结果做倒数排名融合
+        self.hybrid = os.getenv("KNOWLEDGE_HYBRID_SEARCH", "1").lower() not in ("0", "false", "no")
+        # 通过 add_document 添加的文档，知识文件变化重建文档列表时保留
+        self._added_documents: List[Dict[str, Any]] = []
+        # 保护 documents 与索引的一致性（检索与文件刷新互斥）
+        self._lock = threading.RLock()
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+        # 后台预热：idle / loading / ready / failed；预热完成前检索使用关键词模式
+        self.warmup_enabled = os.getenv("KNOWLEDGE_WARMUP", "1").lower() not in ("0", "false", "no")
+        self.warmup_status = "idle"
+        self.warmup_error: Optional[str] = None
+        self.warmup_seconds: Optional[float] = None
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._warmup_lock = threading.Lock()
 
         # 设置默认知识库路径
         self.base_path = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-        self.knowledge_dir = os.path.join(self.base_path, "data", "knowledge")
+        self.knowledge_dir = knowledge_dir or os.path.join(self.base_path, "data", "knowledge")
 
         # 确保目录存在
         os.makedirs(self.knowledge_dir, exist_ok=True)
 
+        self.files = KnowledgeFiles(
+            self.knowledge_dir,
+            embedding_dir,
+            max_tokens=int(os.getenv("KNOWLEDGE_CHUNK_TOKENS", str(DEFAULT_MAX_TOKENS))),
+            overlap_tokens=int(os.getenv("KNOWLEDGE_CHUNK_OVERLAP", str(DEFAULT_OVERLAP_TOKENS))),
+        )
+
         # 初始化时自动加载知识文件（但不加载模型）
         self.auto_load_knowledge()
 
+        watch_interval = float(os.getenv("KNOWLEDGE_WATCH_INTERVAL", "0"))
+        if watch_interval > 0:
+            self.start_watching(watch_interval)
+
     def _load_model(self):
-        """延迟加载嵌入模型"""
+        """
+        延迟加载嵌入模型
+
+        推理后端由 KNOWLEDGE_ENCODER_BACKEND 选择（torch / onnx）；ONNX 加载失败时改用 PyTorch，
+        仍失败时使用备用模型。
+        """
         if self._model_loaded:
             return True
 
         try:
-            print(f"正在加载嵌入模型: {self._model_name}")
-            from sentence_transformers import SentenceTransformer
-            self.model = SentenceTransformer(self._model_name)
-            print(f"嵌入模型加载成功: {self._model_name}")
-            self._model_loaded = True
-            return True
-        except Exception as e:
-            print(f"加载模型 {self._model_name} 失败: {e}")
-            print("尝试使用备用模型...")
+            backend = resolve_backend()
+        except ValueError as e:
+            print(f"{e}，使用 torch")
+            backend = "torch"
+        candidates = [(self._model_name, backend)]
+        if backend != "torch":
+            candidates.append((self._model_name, "torch"))
+        candidates.append((self.FALLBACK_EMBEDDING_MODEL, "torch"))
+
+        for i, (model_name, model_backend) in enumerate(candidates):
+            if i > 0:
+                print(f"尝试使用 {model_name}（{model_backend}）...")
             try:
-                from sentence_transformers import SentenceTransformer
-                fallback_model = "paraphrase-multilingual-MiniLM-L12-v2"
-                self.model = SentenceTransformer(fallback_model)
-                print(f"已加载备用模型: {fallback_model}")
+                print(f"正在加载嵌入模型: {model_name}（{model_backend}）")
+                self.model, self._loaded_model_name = load_encoder(model_name, model_backend)
+                print(f"嵌入模型加载成功: {model_name}（{model_backend}）")
                 self._model_loaded = True
                 return True
-            except Exception as e2:
-                print(f"备用模型加载也失败: {e2}")
-                print("知识库将使用基础关键词匹配模式")
-                return False
+            except Exception as e:
+                print(f"加载模型 {model_name}（{model_backend}）失败: {e}")
+
+        print("知识库将使用基础关键词匹配模式")
+        return False
+
+    def start_warmup(self) -> Optional[threading.Thread]:
+        """在后台线程加载模型并建立向量索引（只启动一次）"""
+        with self._warmup_lock:
+            if self.warmup_status != "idle":
+                return self._warmup_thread
+            self.warmup_status = "loading"
+            self._warmup_thread = threading.Thread(target=self.warm_up, name="knowledge-warmup", daemon=True)
+            self._warmup_thread.start()
+            return self._warmup_thread
+
+    def warm_up(self) -> bool:
+        """
+        加载嵌入模型、为全部文档生成嵌入并建立向量索引
 
-    def auto_load_knowledge(self):
-        """自动加载知识文件"""
-        # 支持 .md 和 .txt 文件
-        file_patterns = ["*.md", "*.txt"]
+        编码在锁外进行（期间检索照常使用关键词模式），写入存储后在锁内建立索引。
+
+        Returns:
+            语义检索是否可用
+        """
+        self.warmup_status = "loading"
+        start = time.perf_counter()
+        try:
+            if not self._load_model():
+                raise RuntimeError("嵌入模型加载失败")
+            self._store_embeddings(list(self.documents))
+            with self._lock:
+                self._generate_embeddings()
+                # 同时建立 BM25 倒排索引
+                self._keyword_search("", 1)
+            self._get_query_encoder()
+        except Exception as e:
+            self.warmup_error = str(e)
+            self.warmup_status = "failed"
+            print(f"知识库预热失败，使用关键词检索: {e}")
+            return False
+        finally:
+            self.warmup_seconds = round(time.perf_counter() - start, 3)
+
+        self.warmup_status = "ready"
+        print(f"知识库预热完成: {len(self.documents)} 条文档，耗时 {self.warmup_seconds}s")
+        return True
+
+    def is_ready(self) -> bool:
+        """预热已结束（成功或降级为关键词检索），可以接收流量"""
+        return not self.warmup_enabled or self.warmup_status in ("ready", "failed")
+
+    def warmup_info(self) -> Dict[str, Any]:
+        return {
+            "status": self.warmup_status,
+            "semantic": self.warmup_status == "ready" or (self.warmup_status == "idle" and self._model_loaded),
+            "documents": len(self.documents),
+            "seconds": self.warmup_seconds,
+            "error": self.warmup_error,
+        }
 
-        files_found = False
-        for pattern in file_patterns:
-            file_paths = glob.glob(os.path.join(self.knowledge_dir, pattern))
-            for file_path in file_paths:
-                self._load_file(file_path)
-                files_found = True
+    def close(self):
+        """停止文件监视与查询编码线程"""
+        self.stop_watching()
+        if self._query_encoder is not None:
+            self._query_encoder.close()
 
-        if not files_found:
+    def auto_load_knowledge(self):
+        """自动加载知识文件（按清单增量分块）"""
+        # 支持 .md 和 .txt 文件
+        if not self.files.list_files():
             # 如果目录为空，创建一些基础知识文件
             self._create_default_knowledge()
+        self.refresh()
 
-    def _load_file(self, file_path: str):
-        """加载单个文件"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # 按章节分割（以##或更大的标题为分割点）
-            sections = self._split_into_sections(content)
-
-            for i, section in enumerate(sections):
-                if len(section.strip()) > 50:  # 只保留有意义的文本块
-                    self.documents.append({
-                        "id": f"{os.path.basename(file_path)}-{i}",
-                        "content": section.strip(),
-                        "source": file_path,
-                        "category": self._get_category_from_filename(file_path)
-                    })
-        except Exception as e:
-            print(f"加载文件失败 {file_path}: {e}")
+    def refresh(self) -> Dict[str, List[str]]:
+        """
+        重新扫描知识目录，只对新增或修改的文件重新分块
+
+        只有新增文件时追加文档，已建立的索引继续使用；有文件修改或删除时重建文档列表并清空索引，
+        下次查询时重建（未变化分块的嵌入向量从持久化存储读取，不重新编码）。
+
+        Returns:
+            {"added": [...], "updated": [...], "removed": [...], "unchanged": [...]}（文件名）
+        """
+        with self._lock:
+            changes = self.files.scan()
+            if changes["updated"] or changes["removed"] or not self.documents:
+                documents = []
+                for name in self.files.list_files():
+                    documents.extend(self._file_documents(name))
+                self.documents = documents + self._added_documents
+                self.vector_index = None
+                self._index_rows = np.zeros(0, dtype=np.int64)
+                self.bm25 = BM25Index()
+            else:
+                for name in changes["added"]:
+                    self.documents.extend(self._file_documents(name))
+
+        if any(changes[key] for key in ("added", "updated", "removed")):
+            print(f"知识文件更新: 新增 {len(changes['added'])}，修改 {len(changes['updated'])}，"
+                  f"删除 {len(changes['removed'])}")
+        return changes
+
+    def _file_documents(self, name: str) -> List[Dict[str, Any]]:
+        """知识文件的分块文档"""
+        file_path = self.files.path(name)
+        category = self._get_category_from_filename(file_path)
+        return [
+            {
+                "id": f"{name}-{i}",
+                "content": chunk["content"],
+                "source": file_path,
+                "category": category,
+                "headings": chunk["headings"],
+                "section": heading_label(chunk["headings"]),
+            }
+            for i, chunk in enumerate(self.files.chunks(name))
+        ]
+
+    def start_watching(self, interval: float = 5.0):
+        """启动后台线程，每 interval 秒检查一次知识目录的变化"""
+        if self._watch_thread is not None:
+            return
+        self._watch_stop.clear()
+
+        def _run():
+            while not self._watch_stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"知识文件刷新失败: {e}")
+
+        self._watch_thread = threading.Thread(target=_run, name="knowledge-watch", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        thread = self._watch_thread
+        if thread is not None:
+            self._watch_stop.set()
+            thread.join()
+            self._watch_thread = None
 
     def _create_default_knowledge(self):
         """创建默认知识文件"""
@@ -146,7 +315,6 @@ Dell PowerEdge、HP ProLiant、联想 ThinkSystem、华为 FusionServer"""
             file_path = os.path.join(self.knowledge_dir, filename)
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(content)
-            self._load_file(file_path)
             print(f"创建默认知识文件: {filename}")
 
     def _get_category_from_filename(self, filename: str) -> str:
@@ -160,45 +328,77 @@ Dell PowerEdge、HP ProLiant、联想 ThinkSystem、华为 FusionServer"""
         else:
             return '其他'
 
+    def _get_query_encoder(self) -> QueryEncoder:
+        encoder = self._query_encoder
+        if encoder is None or encoder.model is not self.model:
+            encoder = QueryEncoder(
+                self.model,
+                cache_size=int(os.getenv("KNOWLEDGE_QUERY_CACHE_SIZE", "1024")),
+                max_batch=int(os.getenv("KNOWLEDGE_QUERY_BATCH_SIZE", "32")),
+                max_wait_ms=float(os.getenv("KNOWLEDGE_QUERY_BATCH_WAIT_MS", "5")),
+            )
+            self._query_encoder = encoder
+        return encoder
+
+    def _get_embedding_store(self) -> EmbeddingStore:
+        if self.embedding_store is None:
+            model_name = getattr(self, "_loaded_model_name", self._model_name)
+            dtype = os.getenv("KNOWLEDGE_EMBEDDING_DTYPE", "float32")
+            self.embedding_store = EmbeddingStore(model_name, self._embedding_dir, dtype)
+        return self.embedding_store
+
     def _generate_embeddings(self):
-        """为所有文档生成嵌入向量"""
+        """
+        为尚未嵌入的文档生成嵌入向量
+
+        向量按内容哈希持久化，已计算过的文档（包括其他进程计算的）直接读取，
+        只对新内容调用模型。
+        """
         if not self.documents:
             return
 
         if not self._load_model():
             return
 
+        done = 0 if self.vector_index is None else len(self.vector_index)
+        pending = self.documents[done:]
+        if not pending:
+            return
+
         try:
-            texts = [doc["content"] for doc in self.documents]
-            self.embeddings = self.model.encode(texts, show_progress_bar=False)
+            self._index_vectors(self._get_embedding_store(), self._store_embeddings(pending))
         except Exception as e:
             print(f"生成嵌入向量失败: {e}")
 
-    def _split_into_sections(self, content: str) -> List[str]:
-        """将内容分割成多个部分"""
-        import re
-
-        # 匹配 Markdown 标题
-        sections = re.split(r'\n(?=##+\s)', content)
-
-        if len(sections) <= 1:
-            # 如果没有标题，按段落分割
-            paragraphs = content.split('\n\n')
-            # 合并小段
-            result = []
-            current_chunk = ""
-            for para in paragraphs:
-                if len(current_chunk) + len(para) < 1000:
-                    current_chunk += para + "\n\n"
-                else:
-                    if current_chunk:
-                        result.append(current_chunk)
-                    current_chunk = para + "\n\n"
-            if current_chunk:
-                result.append(current_chunk)
-            return result
-
-        return sections
+    def _store_embeddings(self, documents: List[Dict[str, Any]]) -> np.ndarray:
+        """确保文档的嵌入向量已写入存储，返回各文档在存储中的行号"""
+        store = self._get_embedding_store()
+        digests = [content_hash(doc["content"]) for doc in documents]
+        rows, missing = store.lookup(digests)
+        if missing:
+            encoded = self.model.encode([documents[i]["content"] for i in missing], show_progress_bar=False)
+            store.append([digests[i] for i in missing], encoded)
+            rows, missing = store.lookup(digests)
+            print(f"生成嵌入向量 {len(encoded)} 条，复用 {len(documents) - len(encoded)} 条")
+        return rows
+
+    def _index_vectors(self, store: EmbeddingStore, rows: np.ndarray):
+        """追加到向量索引；auto 模式下语料规模跨过阈值时按新类型重建"""
+        indexed = len(self.vector_index or ())
+        self._index_rows = np.concatenate([self._index_rows[:indexed], rows])
+        total = len(self._index_rows)
+        kind = resolve_index_kind(self._index_kind, total)
+        if self.vector_index is not None and self.vector_index.kind == kind:
+            self.vector_index.add(store.vectors(rows))
+            return
+
+        index = create_vector_index(store.dim, kind, total, reranker=self._stored_vectors)
+        index.add(store.vectors(self._index_rows))
+        self.vector_index = index
+
+    def _stored_vectors(self, ids: np.ndarray) -> np.ndarray:
+        """按向量索引ID从嵌入存储（内存映射）取回原始向量"""
+        return self.embedding_store.vectors(self._index_rows[ids])
 
     def query(self, query_text: str, top_k: int = 3) -> str:
         """
@@ -214,71 +414,84 @@ Dell PowerEdge、HP ProLiant、联想 ThinkSystem、华为 FusionServer"""
         if not self.documents:
             return "当前知识库为空，正在初始化中..."
 
-        # 尝试使用语义搜索
-        if self._load_model():
-            return self._semantic_search(query_text, top_k)
-        else:
-            # 降级到关键词匹配
-            return self._keyword_search(query_text, top_k)
+        results = self.search(query_text, top_k)
+        if not results:
+            return "未找到相关知识，建议尝试其他查询方式。"
 
-    def _semantic_search(self, query_text: str, top_k: int) -> str:
-        """语义搜索"""
-        try:
-            import numpy as np
+        return "\n\n---\n\n".join(doc["content"] for doc in results)
 
-            # 生成查询的嵌入向量
-            query_embedding = self.model.encode([query_text])[0]
+    def search(self, query_text: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        """
+        检索相关文档
 
-            # 确保已有嵌入向量
-            if self.embeddings is None:
-                self._generate_embeddings()
+        模型可用时为向量检索（默认与 BM25 融合），否则为 BM25 关键词检索。
 
-            if self.embeddings is None:
-                return self._keyword_search(query_text, top_k)
+        Returns:
+            文档列表（含 score），按相关性降序
+        """
+        if not self.documents:
+            return []
 
-            # 计算相似度
-            similarities = np.dot(self.embeddings, query_embedding) / (
-                np.linalg.norm(self.embeddings, axis=1) * np.linalg.norm(query_embedding)
-            )
+        query_embedding = None
+        # 尝试使用语义搜索（预热完成前使用关键词检索）
+        if self._semantic_available():
+            try:
+                # 生成查询的嵌入向量（缓存命中或与并发查询合并编码，不持有知识库锁）
+                query_embedding = self._get_query_encoder().encode(query_text)
+            except Exception as e:
+                print(f"语义搜索失败: {e}")
+
+        with self._lock:
+            if query_embedding is not None:
+                hits = self._semantic_search(query_text, query_embedding, top_k)
+            else:
+                # 降级到关键词匹配
+                hits = self._keyword_search(query_text, top_k)
+            return [{**self.documents[idx], "score": round(score, 4)} for idx, score in hits]
+
+    def _semantic_available(self) -> bool:
+        if self.warmup_status == "ready":
+            return True
+        if self.warmup_status != "idle":
+            # 预热中或模型加载失败
+            return False
+        if self._model_loaded:
+            return True
+        if self.warmup_enabled:
+            self.start_warmup()
+            return False
+        return self._load_model()
 
-            # 获取最相关的文档索引
-            top_indices = np.argsort(similarities)[-top_k:][::-1]
+    def _semantic_search(self, query_text: str, query_embedding: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        """语义搜索（混合模式下与 BM25 结果按倒数排名融合）"""
+        try:
+            # 确保所有文档都已有嵌入向量
+            self._generate_embeddings()
 
-            # 拼接相关文档
-            relevant_docs = []
-            for idx in top_indices:
-                if similarities[idx] > 0.3:  # 相似度阈值
-                    relevant_docs.append(self.documents[idx]["content"])
+            if self.vector_index is None or len(self.vector_index) != len(self.documents):
+                return self._keyword_search(query_text, top_k)
 
-            if not relevant_docs:
-                return "未找到相关知识，建议尝试其他查询方式。"
+            candidates = top_k * self.HYBRID_CANDIDATES if self.hybrid else top_k
+            vector_hits = [(idx, similarity) for idx, similarity in self.vector_index.search(query_embedding, candidates)
+                           if similarity > self.SIMILARITY_THRESHOLD]
+            if not self.hybrid:
+                return vector_hits
 
-            return "\n\n---\n\n".join(relevant_docs)
+            keyword_hits = self._keyword_search(query_text, candidates)
+            fused = reciprocal_rank_fusion(
+                [[idx for idx, _ in vector_hits], [idx for idx, _ in keyword_hits]],
+                k=int(os.getenv("KNOWLEDGE_RRF_K", "60")),
+            )
+            return fused[:top_k]
         except Exception as e:
             print(f"语义搜索失败: {e}")
             return self._keyword_search(query_text, top_k)
 
-    def _keyword_search(self, query_text: str, top_k: int) -> str:
-        """关键词搜索（降级方案）"""
-        # 简单的关键词匹配
-        query_keywords = set(query_text.lower())
-        scored_docs = []
-
-        for doc in self.documents:
-            content_lower = doc["content"].lower()
-            score = sum(1 for kw in query_keywords if kw in content_lower)
-            scored_docs.append((score, doc["content"]))
-
-        # 按分数排序
-        scored_docs.sort(key=lambda x: x[0], reverse=True)
-
-        # 返回前top_k个结果
-        results = [doc for score, doc in scored_docs[:top_k] if score > 0]
-
-        if not results:
-            return "未找到相关知识，建议尝试其他查询方式。"
-
-        return "\n\n---\n\n".join(results)
+    def _keyword_search(self, query_text: str, top_k: int) -> List[Tuple[int, float]]:
+        """BM25 关键词搜索（无模型时的降级方案，也是混合检索的一路）"""
+        for doc in self.documents[len(self.bm25):]:
+            self.bm25.add(doc["content"])
+        return self.bm25.search(query_text, top_k)
 
     def add_document(self, content: str, source: str, category: str = "用户添加"):
         """
@@ -289,12 +502,13 @@ Dell PowerEdge、HP ProLiant、联想 ThinkSystem、华为 FusionServer"""
             source: 文档来源
             category: 分类
         """
-        doc_id = f"{source}-{len(self.documents)}"
-        self.documents.append({
-            "id": doc_id,
-            "content": content,
-            "source": source,
-            "category": category
-        })
-        # 重新生成嵌入
-        self.embeddings = None  # 重置，下次查询时重新生成
+        with self._lock:
+            document = {
+                "id": f"{source}-{len(self.documents)}",
+                "content": content,
+                "source": source,
+                "category": category
+            }
+            self.documents.append(document)
+            self._added_documents.append(document)
+        # 下次查询时只为新增文档补算嵌入与倒排索引
@@ -0,0 +1,150 @@
+"""
+查询向量编码：LRU 缓存 + 微批合并
+
+- 相同查询（去除首尾空白、合并连续空白后）直接命中缓存，不再调用模型
+- 未命中的查询交给后台线程，在 max_wait_ms 内到达的并发查询合并为一次 encode 调用，
+  同一批内重复的文本只编码一次；CPU 推理下批量编码的吞吐远高于逐条编码
+- encode_many 一次提交多条文本（如嵌入服务收到的文档批次），与其他请求一起分批编码
+"""
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.cache import LRUCache
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_MAX_BATCH = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+class QueryEncoder:
+    """带缓存的微批查询编码器（线程安全）"""
+
+    def __init__(self, model: Any, cache_size: int = DEFAULT_CACHE_SIZE,
+                 max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        """
+        Args:
+            model: 提供 encode(texts) -> (n, dim) 的嵌入模型
+            cache_size: 缓存的查询向量条数，0 关闭缓存
+            max_batch: 每批最多合并的查询数
+            max_wait_ms: 收到首个查询后等待更多查询的时间
+        """
+        self.model = model
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._cache = LRUCache(cache_size)
+        self._queue: "queue.Queue[Optional[Tuple[str, Future]]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.encoded = 0
+
+    def encode(self, text: str, timeout: Optional[float] = None) -> np.ndarray:
+        """编码单条查询，返回一维向量（调用方不应修改返回的数组）"""
+        key = normalize_query(text)
+        vector = self._cache.get(key)
+        if vector is not None:
+            return vector
+        return self._submit(key).result(timeout)
+
+    def encode_many(self, texts: List[str], timeout: Optional[float] = None) -> np.ndarray:
+        """编码多条文本，返回 (n, dim)"""
+        results: List[Any] = []
+        for text in texts:
+            key = normalize_query(text)
+            vector = self._cache.get(key)
+            results.append(vector if vector is not None else self._submit(key))
+        vectors = [item.result(timeout) if isinstance(item, Future) else item for item in results]
+        if not vectors:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack(vectors)
+
+    def _submit(self, key: str) -> Future:
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((key, future))
+        return future
+
+    def _ensure_worker(self):
+        if self._closed:
+            raise RuntimeError("查询编码器已关闭")
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._closed:
+                raise RuntimeError("查询编码器已关闭")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="query-encoder", daemon=True)
+                self._worker.start()
+
+    def _collect(self, first: Tuple[str, Future]) -> List[Tuple[str, Future]]:
+        """以首个请求为起点，在等待窗口内收集同批请求"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # 关闭信号留给主循环处理
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+
+            texts = list(dict.fromkeys(key for key, _ in batch))
+            try:
+                vectors = np.asarray(self.model.encode(texts, show_progress_bar=False), dtype=np.float32)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.encoded += len(texts)
+            results: Dict[str, np.ndarray] = {}
+            for key, vector in zip(texts, vectors):
+                vector.setflags(write=False)
+                results[key] = vector
+                self._cache.put(key, vector)
+            for key, future in batch:
+                future.set_result(results[key])
+
+    def close(self):
+        """停止后台线程（已入队的请求仍会完成）"""
+        with self._worker_lock:
+            self._closed = True
+            worker = self._worker
+        if worker is not None:
+            self._queue.put(None)
+            worker.join()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        stats.update({
+            "batches": self.batches,
+            "encoded": self.encoded,
+            "avg_batch_size": round(self.encoded / self.batches, 2) if self.batches else 0.0,
+        })
+        return stats
@@ -0,0 +1,120 @@
+"""
+知识文件清单与增量分块
+
+清单（manifest）记录 data/knowledge/ 下每个文件的 mtime、大小、SHA-1 与分块结果：
+- mtime 与大小未变：直接复用清单中的分块，不读取文件
+- mtime 变化但内容哈希未变（如 touch、重新检出）：复用分块，只更新 mtime
+- 内容变化或新增：重新分块；删除的文件从清单移除
+- 分块参数（token 上限、重叠）变化时全部重新分块
+
+分块内容不变时嵌入向量仍由 EmbeddingStore 按内容哈希复用，因此只有真正变化的分块会被重新编码。
+"""
+import glob
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.knowledge.chunking import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS, chunk_markdown
+from app.core.files import atomic_write
+from app.knowledge.embedding_store import get_embedding_dir
+
+MANIFEST_FILE = "knowledge_manifest.json"
+FILE_PATTERNS = ("*.md", "*.txt")
+
+# 分块算法变化时递增，使旧清单失效
+CHUNKER_VERSION = 2
+
+
+class KnowledgeFiles:
+    """知识目录的文件清单（非线程安全，由调用方加锁）"""
+
+    def __init__(self, knowledge_dir: str, manifest_dir: Optional[str] = None,
+                 max_tokens: int = DEFAULT_MAX_TOKENS, overlap_tokens: int = DEFAULT_OVERLAP_TOKENS):
+        """
+        Args:
+            knowledge_dir: 知识文件目录
+            manifest_dir: 清单所在目录，默认 KNOWLEDGE_EMBEDDING_DIR 或 data/embeddings
+            max_tokens: 每块 token 上限
+            overlap_tokens: 相邻块重叠的 token 数
+        """
+        self.knowledge_dir = os.path.abspath(knowledge_dir)
+        self.manifest_path = Path(manifest_dir or get_embedding_dir()) / MANIFEST_FILE
+        self.chunking = {"version": CHUNKER_VERSION, "max_tokens": max_tokens, "overlap_tokens": overlap_tokens}
+        self.files: Dict[str, Dict] = self._read_manifest()
+
+    def _read_manifest(self) -> Dict[str, Dict]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        if manifest.get("directory") != self.knowledge_dir or manifest.get("chunking") != self.chunking:
+            return {}
+        return manifest.get("files", {})
+
+    def _write_manifest(self):
+        manifest = {"directory": self.knowledge_dir, "chunking": self.chunking, "files": self.files}
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.manifest_path, json.dumps(manifest, ensure_ascii=False).encode("utf-8"))
+        except OSError as e:
+            print(f"写入知识文件清单失败: {e}")
+
+    def list_files(self) -> List[str]:
+        """目录下的知识文件名（排序）"""
+        names = set()
+        for pattern in FILE_PATTERNS:
+            names.update(os.path.basename(p) for p in glob.glob(os.path.join(self.knowledge_dir, pattern)))
+        return sorted(names)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.knowledge_dir, name)
+
+    def scan(self) -> Dict[str, List[str]]:
+        """
+        对比目录与清单，只对新增或内容变化的文件重新分块
+
+        Returns:
+            {"added": [...], "updated": [...], "removed": [...], "unchanged": [...]}（文件名）
+        """
+        changes = {"added": [], "updated": [], "removed": [], "unchanged": []}
+        dirty = False
+        names = self.list_files()
+        for name in names:
+            try:
+                stat = os.stat(self.path(name))
+                entry = self.files.get(name)
+                if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    changes["unchanged"].append(name)
+                    continue
+
+                with open(self.path(name), "rb") as f:
+                    data = f.read()
+                digest = hashlib.sha1(data).hexdigest()
+                if entry and entry["sha1"] == digest:
+                    changes["unchanged"].append(name)
+                else:
+                    changes["updated" if entry else "added"].append(name)
+                    chunks = chunk_markdown(data.decode("utf-8"), self.chunking["max_tokens"],
+                                            self.chunking["overlap_tokens"])
+                    entry = {"sha1": digest, "chunks": chunks}
+                entry.update({"mtime_ns": stat.st_mtime_ns, "size": stat.st_size})
+                self.files[name] = entry
+                dirty = True
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"加载文件失败 {name}: {e}")
+
+        for name in sorted(set(self.files) - set(names)):
+            del self.files[name]
+            changes["removed"].append(name)
+            dirty = True
+
+        if dirty:
+            self._write_manifest()
+        return changes
+
+    def chunks(self, name: str) -> List[Dict]:
+        entry = self.files.get(name)
+        return entry["chunks"] if entry else []
@@ -0,0 +1,569 @@
+"""
+知识库向量索引
+
+统一接口：add(vectors) 按顺序追加（ID 即追加顺序），search(query, top_k) 返回 (ID, 余弦相似度)。
+所有向量在写入时归一化，查询只需一次矩阵乘法。
+
+- FlatIndex  精确检索：归一化矩阵 @ 查询向量，argpartition 取 top_k，适合小语料
+- IVFIndex   倒排文件：球面 k-means 将向量划分为 nlist 个簇，查询只扫描与查询最近的
+             nprobe 个簇；nprobe 越大召回越高、耗时越长。数据量不足以训练时退化为精确检索
+- HNSWIndex  分层可导航小世界图（需要安装 hnswlib），ef_search 控制召回与耗时
+- ScalarQuantizedIndex   每维 8 位标量量化，内存为 float32 的 1/4
+- ProductQuantizedIndex  乘积量化：向量切成 m 段，每段用 256 个码字之一表示（1 字节），
+                         默认 m = 维度 / 4，内存为 float32 的 1/16
+  量化索引只在内存中保存编码，近似打分取 top_k × rerank_factor 个候选，
+  再通过 reranker 取回原始向量（如嵌入存储的内存映射）精确重排
+
+通过环境变量选择（见 create_vector_index）:
+    KNOWLEDGE_VECTOR_INDEX   auto（默认，超过 AUTO_IVF_THRESHOLD 条时用 IVF）/ flat / ivf / hnsw / int8 / pq
+    KNOWLEDGE_IVF_NLIST      簇数，默认 2 × sqrt(向量数)
+    KNOWLEDGE_IVF_NPROBE     查询扫描的簇数，默认 16
+    KNOWLEDGE_HNSW_M / KNOWLEDGE_HNSW_EF_SEARCH
+    KNOWLEDGE_PQ_M           乘积量化段数（需整除维度），默认不超过 维度 / 4 的最大约数
+    KNOWLEDGE_RERANK_FACTOR  量化索引重排的候选倍数，默认 4
+"""
+import math
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+INDEX_KINDS = ("auto", "flat", "ivf", "hnsw", "int8", "pq")
+
+# auto 模式下切换到 IVF 的向量数
+AUTO_IVF_THRESHOLD = 50000
+
+DEFAULT_NPROBE = 16
+
+# IVF 每个簇至少需要的训练样本数；不足时不训练
+MIN_POINTS_PER_LIST = 8
+# k-means 每个簇使用的训练样本数上限
+TRAIN_POINTS_PER_LIST = 32
+KMEANS_ITERATIONS = 8
+# 训练后数据量增长到训练时的该倍数则重新训练
+RETRAIN_GROWTH = 4
+
+# 量化索引近似打分后精确重排的候选数（top_k 的倍数）
+DEFAULT_RERANK_FACTOR = 4
+# 乘积量化每段的码字数（编码为 1 字节）
+PQ_CODEBOOK_SIZE = 256
+# 乘积量化训练所需的最少向量数；不足时保留 float32 向量精确检索
+PQ_MIN_TRAIN = 4 * PQ_CODEBOOK_SIZE
+# 标量量化训练所需的最少向量数：样本太少时各维取值范围过窄，后续向量大量截断
+SQ_MIN_TRAIN = 256
+
+# 分批计算的行数，控制 (批大小 × 簇数) 中间矩阵的内存
+_BATCH_ROWS = 8192
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """按行 L2 归一化（零向量保持为零）"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """scores 中最大的 top_k 个位置，按分数降序"""
+    k = min(top_k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class VectorIndex(ABC):
+    """向量索引接口"""
+
+    kind = ""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """已写入的向量数"""
+
+    @abstractmethod
+    def add(self, vectors: np.ndarray):
+        """按顺序追加向量（单个或二维数组）"""
+
+    @abstractmethod
+    def search(self, query: np.ndarray, top_k: int = 5) -> List[Tuple[int, float]]:
+        """返回 (向量ID, 余弦相似度)，按相似度降序"""
+
+
+class FlatIndex(VectorIndex):
+    """精确检索"""
+
+    kind = "flat"
+
+    def __init__(self, dim: int):
+        super().__init__(dim)
+        self._data = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """已归一化的向量（视图）"""
+        return self._data[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes
+
+    def add(self, vectors: np.ndarray):
+        vectors = normalize(np.atleast_2d(vectors))
+        needed = self._size + len(vectors)
+        if needed > len(self._data):
+            # 容量按倍数增长，避免逐次追加时反复复制
+            grown = np.zeros((max(needed, 2 * len(self._data), 64), self.dim), dtype=np.float32)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:needed] = vectors
+        self._size = needed
+
+    def search(self, query: np.ndarray, top_k: int = 5) -> List[Tuple[int, float]]:
+        scores = self.vectors @ normalize(query)
+        top = _top_k(scores, top_k)
+        return list(zip(top.tolist(), scores[top].tolist()))
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, euclidean: bool = False) -> np.ndarray:
+    """每个向量最近的簇（默认按内积；euclidean 时按欧氏距离）"""
+    # argmin |x - c|² = argmax (x·c - |c|² / 2)
+    bias = -0.5 * np.einsum("ij,ij->i", centroids, centroids) if euclidean else 0
+    assign = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), _BATCH_ROWS):
+        batch = vectors[start:start + _BATCH_ROWS]
+        assign[start:start + len(batch)] = np.argmax(batch @ centroids.T + bias, axis=1)
+    return assign
+
+
+def kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = KMEANS_ITERATIONS,
+           seed: int = 0) -> np.ndarray:
+    """欧氏距离 k-means，返回簇中心"""
+    return _lloyd(vectors, n_clusters, iterations, seed, spherical=False)
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = KMEANS_ITERATIONS,
+                     seed: int = 0) -> np.ndarray:
+    """球面 k-means（归一化向量，按内积分配），返回归一化的簇中心"""
+    return _lloyd(vectors, n_clusters, iterations, seed, spherical=True)
+
+
+def _lloyd(vectors: np.ndarray, n_clusters: int, iterations: int, seed: int, spherical: bool) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _assign(vectors, centroids, euclidean=not spherical)
+        counts = np.bincount(assign, minlength=n_clusters)
+        # 按簇排序后分段求和
+        order = np.argsort(assign, kind="stable")
+        present = np.flatnonzero(counts)
+        sums = np.zeros_like(centroids)
+        sums[present] = np.add.reduceat(vectors[order], (np.cumsum(counts) - counts)[present])
+        empty = np.flatnonzero(counts == 0)
+        # 空簇重新随机选取样本点
+        sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        if spherical:
+            centroids = normalize(sums)
+        else:
+            counts[empty] = 1
+            centroids = sums / counts[:, None].astype(sums.dtype)
+    return centroids
+
+
+class IVFIndex(VectorIndex):
+    """倒排文件索引（球面 k-means 粗量化 + 簇内精确打分）"""
+
+    kind = "ivf"
+
+    def __init__(self, dim: int, nlist: Optional[int] = None, nprobe: int = DEFAULT_NPROBE, seed: int = 0):
+        """
+        Args:
+            dim: 向量维度
+            nlist: 簇数，默认训练时取 2 × sqrt(向量数)
+            nprobe: 查询扫描的簇数
+            seed: k-means 随机种子
+        """
+        super().__init__(dim)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+        self._flat = FlatIndex(dim)
+        self.centroids: Optional[np.ndarray] = None
+        self._assign = np.zeros(0, dtype=np.int64)
+        self._trained_size = 0
+        # 按簇排列的向量ID及每簇的起止位置，追加后查询时重建
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._flat)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def nbytes(self) -> int:
+        extra = 0 if self.centroids is None else self.centroids.nbytes + self._assign.nbytes
+        return self._flat.nbytes + extra
+
+    def _target_nlist(self, n: int) -> int:
+        return self.nlist or max(1, int(2 * math.sqrt(n)))
+
+    def train(self):
+        """在当前全部向量上训练簇中心并重新分配"""
+        vectors = self._flat.vectors
+        nlist = self._target_nlist(len(vectors))
+        if len(vectors) < nlist * MIN_POINTS_PER_LIST:
+            return
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), nlist * TRAIN_POINTS_PER_LIST)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = spherical_kmeans(sample, nlist, seed=self.seed)
+        assign = _assign(vectors, centroids)
+        with self._lock:
+            self.centroids = centroids
+            self._assign = assign
+            self._trained_size = len(vectors)
+            self._order = None
+
+    def add(self, vectors: np.ndarray):
+        vectors = np.atleast_2d(vectors)
+        start = len(self._flat)
+        self._flat.add(vectors)
+        n = len(self._flat)
+        if not self.is_trained or n >= self._trained_size * RETRAIN_GROWTH:
+            self.train()
+        elif self.is_trained:
+            new_assign = _assign(self._flat.vectors[start:], self.centroids)
+            with self._lock:
+                self._assign = np.concatenate([self._assign, new_assign])
+                self._order = None
+
+    def _lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            if self._order is None:
+                self._order = np.argsort(self._assign, kind="stable")
+                self._offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+                np.cumsum(np.bincount(self._assign, minlength=len(self.centroids)), out=self._offsets[1:])
+            return self._order, self._offsets
+
+    def search(self, query: np.ndarray, top_k: int = 5, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        if not self.is_trained:
+            return self._flat.search(query, top_k)
+
+        query = normalize(query)
+        order, offsets = self._lists()
+        probes = _top_k(self.centroids @ query, nprobe or self.nprobe)
+        starts, ends = offsets[probes], offsets[probes + 1]
+        candidates = np.concatenate([order[s:e] for s, e in zip(starts.tolist(), ends.tolist())])
+        scores = self._flat.vectors[candidates] @ query
+        top = _top_k(scores, top_k)
+        return list(zip(candidates[top].tolist(), scores[top].tolist()))
+
+
+class HNSWIndex(VectorIndex):
+    """HNSW 图索引（基于 hnswlib）"""
+
+    kind = "hnsw"
+
+    def __init__(self, dim: int, m: int = 16, ef_construction: int = 200, ef_search: int = 64):
+        super().__init__(dim)
+        try:
+            import hnswlib
+        except ImportError:
+            raise RuntimeError("HNSW 索引需要安装 hnswlib")
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._index = hnswlib.Index(space="ip", dim=dim)
+        self._index.init_index(max_elements=1024, M=m, ef_construction=ef_construction)
+        self._index.set_ef(ef_search)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, vectors: np.ndarray):
+        vectors = normalize(np.atleast_2d(vectors))
+        needed = self._size + len(vectors)
+        capacity = self._index.get_max_elements()
+        if needed > capacity:
+            self._index.resize_index(max(needed, 2 * capacity))
+        self._index.add_items(vectors, np.arange(self._size, needed))
+        self._size = needed
+
+    def search(self, query: np.ndarray, top_k: int = 5) -> List[Tuple[int, float]]:
+        k = min(top_k, self._size)
+        if k == 0:
+            return []
+        self._index.set_ef(max(self.ef_search, k))
+        labels, distances = self._index.knn_query(normalize(query), k=k)
+        # 内积空间的距离为 1 - 内积
+        return [(int(label), float(1 - distance)) for label, distance in zip(labels[0], distances[0])]
+
+
+Reranker = Callable[[np.ndarray], np.ndarray]
+
+
+class _QuantizedIndex(VectorIndex):
+    """
+    量化索引基类
+
+    向量数达到 min_train 前暂存 float32 向量精确检索；训练后只保存量化编码。
+    提供 reranker（向量ID数组 -> 原始向量）时，近似打分取 top_k × rerank_factor 个候选精确重排。
+    数据量增长到训练时的 RETRAIN_GROWTH 倍时重新训练：有 reranker 用取回的原始向量，
+    否则用已有编码解码后的近似向量。
+    """
+
+    min_train = SQ_MIN_TRAIN
+
+    def __init__(self, dim: int, reranker: Optional[Reranker] = None,
+                 rerank_factor: int = DEFAULT_RERANK_FACTOR):
+        super().__init__(dim)
+        self.reranker = reranker
+        self.rerank_factor = max(1, rerank_factor)
+        self._pending: Optional[FlatIndex] = FlatIndex(dim)
+        self._codes: Optional[np.ndarray] = None
+        self._size = 0
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def is_trained(self) -> bool:
+        return self._pending is None
+
+    @property
+    def codes(self) -> np.ndarray:
+        return self._codes[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        if self._pending is not None:
+            return self._pending.nbytes
+        return self.codes.nbytes + self._codebook_nbytes()
+
+    @abstractmethod
+    def _train(self, vectors: np.ndarray):
+        """用归一化向量训练量化参数"""
+
+    @abstractmethod
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """向量编码为 uint8 数组"""
+
+    @abstractmethod
+    def _decode(self, codes: np.ndarray) -> np.ndarray:
+        """编码还原为近似向量"""
+
+    @abstractmethod
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        """query 与全部编码的近似内积"""
+
+    @abstractmethod
+    def _codebook_nbytes(self) -> int:
+        """量化参数占用的字节数"""
+
+    def _rebuild(self, vectors: np.ndarray):
+        self._train(vectors)
+        self._codes = self._encode(vectors)
+        self._size = self._trained_size = len(vectors)
+
+    def add(self, vectors: np.ndarray):
+        vectors = normalize(np.atleast_2d(vectors))
+        if self._pending is not None:
+            self._pending.add(vectors)
+            self._size = len(self._pending)
+            if self._size >= self.min_train:
+                self._rebuild(self._pending.vectors)
+                self._pending = None
+            return
+
+        needed = self._size + len(vectors)
+        if needed >= self._trained_size * RETRAIN_GROWTH:
+            if self.reranker is not None:
+                existing = normalize(self.reranker(np.arange(self._size)))
+            else:
+                existing = self._decode(self.codes)
+            self._rebuild(np.concatenate([existing, vectors]))
+            return
+
+        codes = self._encode(vectors)
+        if needed > len(self._codes):
+            grown = np.zeros((max(needed, 2 * len(self._codes)), self._codes.shape[1]), dtype=self._codes.dtype)
+            grown[:self._size] = self._codes[:self._size]
+            self._codes = grown
+        self._codes[self._size:needed] = codes
+        self._size = needed
+
+    def search(self, query: np.ndarray, top_k: int = 5) -> List[Tuple[int, float]]:
+        if self._pending is not None:
+            return self._pending.search(query, top_k)
+
+        query = normalize(query)
+        scores = self._scores(query)
+        if self.reranker is None:
+            top = _top_k(scores, top_k)
+            return list(zip(top.tolist(), scores[top].tolist()))
+
+        candidates = _top_k(scores, top_k * self.rerank_factor)
+        exact = normalize(self.reranker(candidates)) @ query
+        top = _top_k(exact, top_k)
+        return list(zip(candidates[top].tolist(), exact[top].tolist()))
+
+
+class ScalarQuantizedIndex(_QuantizedIndex):
+    """每维 8 位标量量化：x ≈ low + step × code，code ∈ [0, 255]"""
+
+    kind = "int8"
+
+    def __init__(self, dim: int, reranker: Optional[Reranker] = None,
+                 rerank_factor: int = DEFAULT_RERANK_FACTOR):
+        super().__init__(dim, reranker, rerank_factor)
+        self.low: Optional[np.ndarray] = None
+        self.step: Optional[np.ndarray] = None
+
+    def _train(self, vectors: np.ndarray):
+        self.low = vectors.min(axis=0)
+        self.step = np.maximum((vectors.max(axis=0) - self.low) / 255, 1e-12).astype(np.float32)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        # 超出训练范围的分量截断到边界
+        return np.clip(np.rint((vectors - self.low) / self.step), 0, 255).astype(np.uint8)
+
+    def _decode(self, codes: np.ndarray) -> np.ndarray:
+        return self.low + codes.astype(np.float32) * self.step
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        # x·q ≈ code·(step × q) + low·q，分批转换避免整体展开为 float32
+        weights = (self.step * query).astype(np.float32)
+        bias = float(self.low @ query)
+        codes = self.codes
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _BATCH_ROWS):
+            batch = codes[start:start + _BATCH_ROWS]
+            scores[start:start + len(batch)] = batch.astype(np.float32) @ weights
+        return scores + bias
+
+    def _codebook_nbytes(self) -> int:
+        return self.low.nbytes + self.step.nbytes
+
+
+def default_pq_segments(dim: int) -> int:
+    """不超过 dim / 4 的最大约数（编码为 float32 的 1/16）"""
+    for m in range(max(1, dim // 4), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+class ProductQuantizedIndex(_QuantizedIndex):
+    """乘积量化：m 段 × 每段 256 个码字，非对称距离（查询保持 float32）查表打分"""
+
+    kind = "pq"
+    min_train = PQ_MIN_TRAIN
+
+    def __init__(self, dim: int, m: Optional[int] = None, reranker: Optional[Reranker] = None,
+                 rerank_factor: int = DEFAULT_RERANK_FACTOR, seed: int = 0):
+        """
+        Args:
+            dim: 向量维度
+            m: 段数（需整除 dim），默认 default_pq_segments(dim)
+            reranker: 按向量ID取回原始向量，用于精确重排与重新训练
+            rerank_factor: 重排候选数为 top_k 的倍数
+            seed: k-means 随机种子
+        """
+        super().__init__(dim, reranker, rerank_factor)
+        self.m = m or default_pq_segments(dim)
+        if dim % self.m:
+            raise ValueError(f"乘积量化段数 {self.m} 不能整除向量维度 {dim}")
+        self.dsub = dim // self.m
+        self.seed = seed
+        # (m, 码字数, dsub)
+        self.codebooks: Optional[np.ndarray] = None
+
+    def _segments(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.reshape(len(vectors), self.m, self.dsub)
+
+    def _train(self, vectors: np.ndarray):
+        ksub = min(PQ_CODEBOOK_SIZE, len(vectors))
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), ksub * TRAIN_POINTS_PER_LIST)
+        sample = self._segments(vectors[rng.choice(len(vectors), sample_size, replace=False)])
+        self.codebooks = np.stack([
+            kmeans(np.ascontiguousarray(sample[:, j]), ksub, seed=self.seed + j) for j in range(self.m)
+        ]).astype(np.float32)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        segments = self._segments(vectors)
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = _assign(np.ascontiguousarray(segments[:, j]), self.codebooks[j], euclidean=True)
+        return codes
+
+    def _decode(self, codes: np.ndarray) -> np.ndarray:
+        segments = self.codebooks[np.arange(self.m), codes]
+        return segments.reshape(len(codes), self.dim)
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        # 每段查询子向量与各码字的内积表，编码逐段查表求和
+        tables = np.einsum("jkd,jd->jk", self.codebooks, query.reshape(self.m, self.dsub))
+        flat_tables = tables.ravel()
+        offsets = np.arange(self.m, dtype=np.int64) * tables.shape[1]
+        codes = self.codes
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _BATCH_ROWS):
+            batch = codes[start:start + _BATCH_ROWS]
+            scores[start:start + len(batch)] = flat_tables[batch + offsets].sum(axis=1)
+        return scores
+
+    def _codebook_nbytes(self) -> int:
+        return self.codebooks.nbytes
+
+
+def resolve_index_kind(kind: Optional[str] = None, size: int = 0) -> str:
+    kind = kind or os.getenv("KNOWLEDGE_VECTOR_INDEX", "auto")
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"不支持的向量索引类型: {kind}，可选 {', '.join(INDEX_KINDS)}")
+    if kind == "auto":
+        return "ivf" if size >= AUTO_IVF_THRESHOLD else "flat"
+    return kind
+
+
+def create_vector_index(dim: int, kind: Optional[str] = None, size: int = 0,
+                        reranker: Optional[Reranker] = None) -> VectorIndex:
+    """
+    按类型（默认读取 KNOWLEDGE_VECTOR_INDEX）创建向量索引
+
+    Args:
+        dim: 向量维度
+        kind: auto / flat / ivf / hnsw / int8 / pq
+        size: 预计向量数（auto 模式据此选择类型）
+        reranker: 按向量ID取回原始向量（量化索引用于精确重排）
+    """
+    kind = resolve_index_kind(kind, size)
+    if kind in ("int8", "pq"):
+        rerank_factor = int(os.getenv("KNOWLEDGE_RERANK_FACTOR", str(DEFAULT_RERANK_FACTOR)))
+        if kind == "int8":
+            return ScalarQuantizedIndex(dim, reranker=reranker, rerank_factor=rerank_factor)
+        m = os.getenv("KNOWLEDGE_PQ_M")
+        return ProductQuantizedIndex(dim, m=int(m) if m else None, reranker=reranker, rerank_factor=rerank_factor)
+    if kind == "ivf":
+        nlist = os.getenv("KNOWLEDGE_IVF_NLIST")
+        return IVFIndex(dim, nlist=int(nlist) if nlist else None,
+                        nprobe=int(os.getenv("KNOWLEDGE_IVF_NPROBE", str(DEFAULT_NPROBE))))
+    if kind == "hnsw":
+        return HNSWIndex(dim, m=int(os.getenv("KNOWLEDGE_HNSW_M", "16")),
+                         ef_search=int(os.getenv("KNOWLEDGE_HNSW_EF_SEARCH", "64")))
+    return FlatIndex(dim)
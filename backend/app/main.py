@@ -7,84 +7,161 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 
-app = FastAPI(
-    title="Smart Procurement System API",
-    description="智慧采购系统后端API",
-    version="1.0.0"
-)
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # For development - restrict in production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Health check endpoint
-@app.get("/api/health")
-async def health_check():
-    return JSONResponse(
-        status_code=200,
-        content={
-            "status": "ok",
-            "message": "Smart Procurement System is running",
-            "version": "1.0.0"
-        }
-    )
-
-# Database initialization
-from app.core.database import init_db, SessionLocal
-from app.core.security import get_password_hash
-from app.models.user import User, UserRole
-from app.models.analysis_history import AnalysisHistory
-
-@app.on_event("startup")
-async def startup_event():
-    init_db()
-
-    # 创建初始管理员账号
-    db = SessionLocal()
-    try:
-        admin = db.query(User).filter(User.username == "admin").first()
-        if not admin:
-            admin = User(
-                username="admin",
-                email="admin@example.com",
-                hashed_password=get_password_hash("admin123"),
-                role=UserRole.ADMIN.value,
-                is_active=True
-            )
-            db.add(admin)
-            db.commit()
-            print("初始管理员账号已创建: admin / admin123")
-    finally:
-        db.close()
-
-# Import routes
-from app.api import (
-    requirements,
-    price,
-    contract,
-    chat,
-    auth,
-    users,
-    requirements_mgmt,
-    statistics,
-    analysis,
-)
-
-# Register routes
-app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
-app.include_router(users.router, prefix="/api/users", tags=["users"])
-app.include_router(requirements.router, prefix="/api", tags=["requirements"])
-app.include_router(requirements_mgmt.router, prefix="/api/requirements", tags=["requirements_mgmt"])
-app.include_router(statistics.router, prefix="/api/statistics", tags=["statistics"])
-app.include_router(analysis.router, prefix="/api/analysis", tags=["analysis"])
-app.include_router(price.router, prefix="/api", tags=["price"])
-app.include_router(contract.router, prefix="/api", tags=["contract"])
-app.include_router(chat.router, prefix="/api", tags=["chat"])
+from app.core.startup_profile import StartupProfiler
+
+
+def _warmup_details(agent_registry, readiness: dict) -> dict:
+    details = {"pending": readiness["pending"], "components": readiness["components"],
+               "errors": readiness["errors"]}
+    if agent_registry.is_loaded("knowledge_base"):
+        knowledge_base = agent_registry.get("knowledge_base")
+        if knowledge_base is not None:
+            details["knowledge_base"] = knowledge_base.warmup_info()
+    return details
+
+
+def create_app() -> FastAPI:
+    """
+    应用工厂
+
+    路由模块只依赖轻量的智能体注册表，jieba、python-docx、langchain、openai
+    以及各智能体均在首次使用（或后台预热）时才加载，各阶段耗时记录在
+    app.state.startup_profile 中。
+    """
+    profiler = StartupProfiler()
+
+    with profiler.phase("create_app"):
+        app = FastAPI(
+            title="Smart Procurement System API",
+            description="智慧采购系统后端API",
+            version="1.0.0"
+        )
+        app.state.startup_profile = profiler
+
+    # Configure CORS
+    with profiler.phase("middleware"):
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=["*"],  # For development - restrict in production
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+
+    # Health check endpoint
+    @app.get("/api/health")
+    async def health_check():
+        from app.agents.registry import agent_registry
+        readiness = agent_registry.readiness()
+        return JSONResponse(
+            status_code=200,
+            content={
+                "status": "ok",
+                "message": "Smart Procurement System is running",
+                "version": "1.0.0",
+                "ready": readiness["ready"],
+                "warmup": _warmup_details(agent_registry, readiness),
+            }
+        )
+
+    @app.get("/api/health/ready")
+    async def readiness_check():
+        """就绪探针：后台预热（含知识库模型与索引）完成前返回 503，供负载均衡判断是否转发流量"""
+        from app.agents.registry import agent_registry
+        readiness = agent_registry.readiness()
+        return JSONResponse(
+            status_code=200 if readiness["ready"] else 503,
+            content={
+                "ready": readiness["ready"],
+                "warmup": _warmup_details(agent_registry, readiness),
+            }
+        )
+
+    @app.get("/api/health/startup")
+    async def startup_report():
+        from app.agents.registry import agent_registry
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": {
+                    **profiler.report(),
+                    "agents": agent_registry.status(),
+                }
+            }
+        )
+
+    # Database initialization
+    with profiler.phase("import_database"):
+        from app.core.database import init_db, SessionLocal
+        from app.core.security import get_password_hash
+        from app.models.user import User, UserRole
+        from app.models.analysis_history import AnalysisHistory
+        from app.agents.registry import agent_registry
+
+    @app.on_event("startup")
+    async def startup_event():
+        with profiler.phase("init_db"):
+            init_db()
+
+            # 创建初始管理员账号
+            db = SessionLocal()
+            try:
+                admin = db.query(User).filter(User.username == "admin").first()
+                if not admin:
+                    admin = User(
+                        username="admin",
+                        email="admin@example.com",
+                        hashed_password=get_password_hash("admin123"),
+                        role=UserRole.ADMIN.value,
+                        is_active=True
+                    )
+                    db.add(admin)
+                    db.commit()
+                    print("初始管理员账号已创建: admin / admin123")
+            finally:
+                db.close()
+
+        # 智能体注册表：按 AGENT_PRELOAD 同步预加载，按 AGENT_WARMUP 后台预热
+        with profiler.phase("agent_registry"):
+            agent_registry.startup()
+
+        print(f"启动耗时:\n{profiler.format()}")
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        agent_registry.shutdown()
+
+    # Import routes
+    with profiler.phase("import_routers"):
+        from app.api import (
+            requirements,
+            price,
+            contract,
+            chat,
+            auth,
+            users,
+            requirements_mgmt,
+            statistics,
+            analysis,
+        )
+
+    # Register routes
+    with profiler.phase("include_routers"):
+        app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
+        app.include_router(users.router, prefix="/api/users", tags=["users"])
+        app.include_router(requirements.router, prefix="/api", tags=["requirements"])
+        app.include_router(requirements_mgmt.router, prefix="/api/requirements", tags=["requirements_mgmt"])
+        app.include_router(statistics.router, prefix="/api/statistics", tags=["statistics"])
+        app.include_router(analysis.router, prefix="/api/analysis", tags=["analysis"])
+        app.include_router(price.router, prefix="/api", tags=["price"])
+        app.include_router(contract.router, prefix="/api", tags=["contract"])
+        app.include_router(chat.router, prefix="/api", tags=["chat"])
+
+    return app
+
+
+app = create_app()
 
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
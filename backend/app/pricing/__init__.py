@@ -0,0 +1 @@
+# Price data module
@@ -0,0 +1,181 @@
+"""
+分类聚合
+
+按分类物化市场洞察所需的统计量，并随价格记录追加增量更新：
+- 全部记录：条数、总价、最低价、最高价、按月的 (总价, 条数)
+- 线性回归充分统计量 n, Σx, Σy, Σx², Σxy（x 为月份序号），斜率即每月价格变化
+- 每个产品的最新价格（日期相同时保留先写入的一条）及其合计
+
+洞察接口只需遍历分类，耗时与价格记录数无关。
+
+聚合对象发布后不再修改：追加记录时复制受影响的分类并生成新的 CategoryAggregates，
+由调用方整体替换引用，并发读取方始终看到某一版本的完整快照。
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.pricing.columns import PriceColumns, date_to_day, month_to_ordinal, ordinal_to_month
+
+# 回归自变量以 2000-01 为原点，减小平方和的数值误差
+BASE_MONTH = 2000 * 12
+
+
+class CategoryAggregate:
+    """单个分类的聚合"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min_price = float("inf")
+        self.max_price = float("-inf")
+        # 月份序号 -> [总价, 条数]
+        self.monthly: Dict[int, List[float]] = {}
+        self.sx = self.sy = self.sxx = self.sxy = 0.0
+        # 产品名 -> (日期, 价格)，按产品写入顺序
+        self.latest: Dict[str, Tuple[int, float]] = {}
+        self.latest_total = 0.0
+
+    def add(self, name: str, day: int, month: int, price: float):
+        self.count += 1
+        self.total += price
+        self.min_price = min(self.min_price, price)
+        self.max_price = max(self.max_price, price)
+
+        bucket = self.monthly.setdefault(month, [0.0, 0])
+        bucket[0] += price
+        bucket[1] += 1
+
+        x = month - BASE_MONTH
+        self.sx += x
+        self.sy += price
+        self.sxx += x * x
+        self.sxy += x * price
+
+        current = self.latest.get(name)
+        if current is None:
+            self.latest[name] = (day, price)
+            self.latest_total += price
+        elif day > current[0]:
+            self.latest[name] = (day, price)
+            self.latest_total += price - current[1]
+
+    def copy(self) -> "CategoryAggregate":
+        """独立副本（按月桶与最新价格表均复制）"""
+        other = CategoryAggregate()
+        other.__dict__.update(self.__dict__)
+        other.monthly = {month: list(bucket) for month, bucket in self.monthly.items()}
+        other.latest = dict(self.latest)
+        return other
+
+    @property
+    def mean_price(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def latest_avg(self) -> float:
+        return self.latest_total / len(self.latest) if self.latest else 0.0
+
+    def slope(self) -> float:
+        """全部记录对月份的最小二乘斜率（每月价格变化）"""
+        denominator = self.count * self.sxx - self.sx * self.sx
+        if self.count < 2 or denominator <= 0:
+            return 0.0
+        return (self.count * self.sxy - self.sx * self.sy) / denominator
+
+    def monthly_means(self) -> Dict[str, float]:
+        return {
+            ordinal_to_month(month): round(total / count, 2)
+            for month, (total, count) in sorted(self.monthly.items())
+        }
+
+
+class CategoryAggregates:
+    """全部分类的聚合，version 与价格存储的数据版本对应"""
+
+    def __init__(self, version: int = -1):
+        self.version = version
+        self.categories: Dict[str, CategoryAggregate] = {}
+
+    @classmethod
+    def from_columns(cls, columns: PriceColumns, version: int = -1) -> "CategoryAggregates":
+        """从列式价格历史一次性构建（向量化）"""
+        aggregates = cls(version)
+        if len(columns) == 0:
+            return aggregates
+
+        n_categories = len(columns.categories)
+        cat = columns.category_id.astype(np.int64)
+        price = columns.price
+        x = (columns.month - BASE_MONTH).astype(np.float64)
+
+        counts = np.bincount(cat, minlength=n_categories)
+        totals = np.bincount(cat, weights=price, minlength=n_categories)
+        sx = np.bincount(cat, weights=x, minlength=n_categories)
+        sxx = np.bincount(cat, weights=x * x, minlength=n_categories)
+        sxy = np.bincount(cat, weights=x * price, minlength=n_categories)
+        mins = np.full(n_categories, np.inf)
+        maxs = np.full(n_categories, -np.inf)
+        np.minimum.at(mins, cat, price)
+        np.maximum.at(maxs, cat, price)
+
+        months, month_idx = np.unique(columns.month, return_inverse=True)
+        key = cat * len(months) + month_idx
+        month_totals = np.bincount(key, weights=price, minlength=n_categories * len(months))
+        month_counts = np.bincount(key, minlength=n_categories * len(months))
+
+        # 分类按产品表中首次出现的顺序排列
+        first_product = {}
+        for pid, cid in enumerate(columns.product_category.tolist()):
+            first_product.setdefault(cid, pid)
+
+        for cid in sorted(first_product, key=first_product.get):
+            if counts[cid] == 0:
+                continue
+            agg = CategoryAggregate()
+            agg.count = int(counts[cid])
+            agg.total = float(totals[cid])
+            agg.min_price = float(mins[cid])
+            agg.max_price = float(maxs[cid])
+            agg.sx, agg.sy = float(sx[cid]), float(totals[cid])
+            agg.sxx, agg.sxy = float(sxx[cid]), float(sxy[cid])
+            base = cid * len(months)
+            for m in np.flatnonzero(month_counts[base:base + len(months)]):
+                agg.monthly[int(months[m])] = [float(month_totals[base + m]), int(month_counts[base + m])]
+            aggregates.categories[columns.categories[cid]] = agg
+
+        latest_rows = columns.latest_rows(np.arange(len(columns), dtype=np.int64))
+        for pid, day, value in zip(columns.product_id[latest_rows].tolist(),
+                                   columns.day[latest_rows].tolist(),
+                                   columns.price[latest_rows].tolist()):
+            product = columns.products[pid]
+            agg = aggregates.categories[product["category"]]
+            agg.latest[product["name"]] = (day, value)
+            agg.latest_total += value
+        return aggregates
+
+    def with_records(self, records: Iterable[Dict[str, Any]], version: int) -> "CategoryAggregates":
+        """
+        追加价格记录（category / name / date / price）后的新聚合
+
+        只复制受影响的分类，本对象保持不变，可被并发读取。
+        """
+        updated = CategoryAggregates(version)
+        updated.categories = dict(self.categories)
+        copied = set()
+        for record in records:
+            date = str(record["date"])
+            category = record["category"]
+            if category not in copied:
+                current = updated.categories.get(category)
+                updated.categories[category] = current.copy() if current else CategoryAggregate()
+                copied.add(category)
+            updated.categories[category].add(record["name"], date_to_day(date), month_to_ordinal(date),
+                                             float(record["price"]))
+        return updated
+
+    def select(self, category: Optional[str] = None) -> Dict[str, CategoryAggregate]:
+        if category is None:
+            return dict(self.categories)
+        agg = self.categories.get(category)
+        return {category: agg} if agg else {}
@@ -0,0 +1,251 @@
+"""
+列式价格历史
+
+价格记录以列存储（NumPy 数组），并按 (产品ID, 日期) 稳定排序：
+- product_id  int32    产品ID（对应 products 表）
+- category_id int16    分类ID（对应 categories 表）
+- day         int32    日期（1970-01-01 起的天数，仅有月份的记录记为当月 1 日）
+- month       int32    月份序号 year * 12 + (month - 1)，由 day 推出，仅用于按月聚合
+- price       float64  价格
+- source_id   int16    来源（字典编码，对应 sources 表）
+
+offsets[p]:offsets[p + 1] 即产品 p 的全部历史，最新价、区间统计和趋势聚合
+都可以在数组切片上向量化完成，无需反复分组排序。记录（record / records）中的日期
+按 day 输出为 'YYYY-MM-DD'。
+"""
+from datetime import date as Date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_EPOCH_ORDINAL = Date(1970, 1, 1).toordinal()
+
+
+def parse_date(date: str) -> Date:
+    """
+    解析 'YYYY-MM' 或 'YYYY-MM-DD'（允许带时间部分，如 '2024-03-15T08:00:00'），仅有月份时取当月 1 日
+
+    Raises:
+        ValueError: 格式不符或日期无效
+    """
+    # 批量导入时逐条调用，按分段校验而不用 strptime（约快 6 倍）
+    parts = str(date)[:10].split("-")
+    if len(parts) in (2, 3) and len(parts[0]) == 4 and all(p.isdigit() and 0 < len(p) <= 4 for p in parts):
+        try:
+            return Date(int(parts[0]), int(parts[1]), int(parts[2]) if len(parts) == 3 else 1)
+        except ValueError:
+            pass
+    raise ValueError(f"日期格式无效: {date!r}，应为 YYYY-MM 或 YYYY-MM-DD")
+
+
+def date_to_day(date: str) -> int:
+    """'2024-03' 或 '2024-03-15' -> 1970-01-01 起的天数"""
+    return parse_date(date).toordinal() - _EPOCH_ORDINAL
+
+
+def day_to_date(day: int) -> str:
+    """天数 -> 'YYYY-MM-DD'"""
+    return Date.fromordinal(day + _EPOCH_ORDINAL).isoformat()
+
+
+def days_to_months(days: np.ndarray) -> np.ndarray:
+    """天数数组 -> 月份序号数组"""
+    months = np.asarray(days, dtype="datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    return (months + 1970 * 12).astype(np.int32)
+
+
+def month_to_ordinal(date: str) -> int:
+    """'2024-03' 或 '2024-03-15' -> 月份序号"""
+    parsed = parse_date(date)
+    return parsed.year * 12 + parsed.month - 1
+
+
+def ordinal_to_month(ordinal: int) -> str:
+    """月份序号 -> 'YYYY-MM'"""
+    return f"{ordinal // 12:04d}-{ordinal % 12 + 1:02d}"
+
+
+def expand_ranges(offsets: np.ndarray, ids: Sequence[int]) -> np.ndarray:
+    """按 ids 顺序拼接各自的 [offsets[i], offsets[i + 1]) 区间（向量化展开）"""
+    ids = np.asarray(ids, dtype=np.int64)
+    if len(ids) == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = offsets[ids]
+    lengths = offsets[ids + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    group_starts = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return np.arange(total, dtype=np.int64) + group_starts
+
+
+class PriceColumns:
+    """列式价格历史，附带产品 / 分类 / 来源字典表"""
+
+    def __init__(self, products: List[Dict[str, Any]], categories: List[str], sources: List[str],
+                 product_id: np.ndarray, day: np.ndarray, price: np.ndarray,
+                 source_id: np.ndarray):
+        """
+        Args:
+            products: 产品表，每项含 name / category / specs
+            categories: 分类表
+            sources: 来源表
+            product_id, day, price, source_id: 等长的列（无需预先排序）
+        """
+        self.products = products
+        self.categories = categories
+        self.sources = sources
+        self._category_ids = {name: i for i, name in enumerate(categories)}
+        self.product_category = np.array(
+            [self._category_ids[p["category"]] for p in products], dtype=np.int16
+        )
+
+        order = np.lexsort((day, product_id))
+        self.product_id = np.asarray(product_id, dtype=np.int32)[order]
+        self.day = np.asarray(day, dtype=np.int32)[order]
+        self.month = days_to_months(self.day)
+        self.price = np.asarray(price, dtype=np.float64)[order]
+        self.source_id = np.asarray(source_id, dtype=np.int16)[order]
+        self.category_id = self.product_category[self.product_id] if len(order) else np.zeros(0, np.int16)
+
+        counts = np.bincount(self.product_id, minlength=len(products))
+        self.offsets = np.zeros(len(products) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "PriceColumns":
+        """从记录字典（category / name / specs / date / price / source）构建"""
+        products: List[Dict[str, Any]] = []
+        product_ids: Dict[Tuple[str, str], int] = {}
+        categories: Dict[str, int] = {}
+        sources: Dict[str, int] = {}
+        pid_col, day_col, price_col, source_col = [], [], [], []
+
+        for record in records:
+            key = (record["category"], record["name"])
+            pid = product_ids.get(key)
+            if pid is None:
+                pid = product_ids[key] = len(products)
+                products.append({
+                    "category": record["category"],
+                    "name": record["name"],
+                    "specs": record.get("specs", ""),
+                })
+                categories.setdefault(record["category"], len(categories))
+            pid_col.append(pid)
+            day_col.append(date_to_day(record["date"]))
+            price_col.append(float(record["price"]))
+            source_col.append(sources.setdefault(record.get("source", ""), len(sources)))
+
+        return cls(
+            products, list(categories), list(sources),
+            np.array(pid_col, dtype=np.int32), np.array(day_col, dtype=np.int32),
+            np.array(price_col, dtype=np.float64), np.array(source_col, dtype=np.int16),
+        )
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    @property
+    def n_products(self) -> int:
+        return len(self.products)
+
+    def category_of(self, product_id: int) -> str:
+        return self.categories[self.product_category[product_id]]
+
+    def rows(self, product_ids: Sequence[int]) -> np.ndarray:
+        """产品历史行号（按产品顺序拼接，产品内按日期升序）"""
+        if len(product_ids) == 0:
+            return np.zeros(0, dtype=np.int64)
+        if len(product_ids) == 1:
+            pid = int(product_ids[0])
+            return np.arange(self.offsets[pid], self.offsets[pid + 1], dtype=np.int64)
+        return expand_ranges(self.offsets, product_ids)
+
+    def latest_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        每个产品的最新一行
+
+        rows 中同一产品的行需连续且按日期升序（rows() 的输出及其子序列均满足）；
+        同一日期存在多行时取最先出现的一行。
+        """
+        if len(rows) == 0:
+            return rows
+        pids = self.product_id[rows]
+        days = self.day[rows]
+        positions = np.arange(len(rows))
+        # 每一行所在 "同产品同日期" 连续段的起点
+        run_start = np.ones(len(rows), dtype=bool)
+        run_start[1:] = (pids[1:] != pids[:-1]) | (days[1:] != days[:-1])
+        run_first = np.maximum.accumulate(np.where(run_start, positions, 0))
+        is_last = np.append(pids[1:] != pids[:-1], True)
+        return rows[run_first[is_last]]
+
+    def sort_by_date(self, rows: np.ndarray) -> np.ndarray:
+        """按日期稳定排序"""
+        return rows[np.argsort(self.day[rows], kind="stable")]
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """物化一行为记录字典"""
+        pid = int(self.product_id[row])
+        product = self.products[pid]
+        return {
+            "id": f"{product['category']}-{product['name']}-{row - int(self.offsets[pid])}",
+            "category": product["category"],
+            "name": product["name"],
+            "specs": product["specs"],
+            "price": float(self.price[row]),
+            "date": day_to_date(int(self.day[row])),
+            "source": self.sources[self.source_id[row]],
+        }
+
+    def records(self, rows: Sequence[int]) -> List[Dict[str, Any]]:
+        """批量物化（按列一次性转换为 Python 标量）"""
+        rows = np.asarray(rows, dtype=np.int64)
+        pids = self.product_id[rows].tolist()
+        positions = (rows - self.offsets[self.product_id[rows]]).tolist()
+        prices = self.price[rows].tolist()
+        days = self.day[rows].tolist()
+        source_ids = self.source_id[rows].tolist()
+
+        records = []
+        for pid, position, price, day, source_id in zip(pids, positions, prices, days, source_ids):
+            product = self.products[pid]
+            records.append({
+                "id": f"{product['category']}-{product['name']}-{position}",
+                "category": product["category"],
+                "name": product["name"],
+                "specs": product["specs"],
+                "price": price,
+                "date": day_to_date(day),
+                "source": self.sources[source_id],
+            })
+        return records
+
+    def monthly_means(self, rows: np.ndarray) -> Tuple[List[str], Dict[str, Dict[str, float]]]:
+        """
+        按 (分类, 月份) 计算平均价格
+
+        Returns:
+            (升序月份列表, {分类: {月份: 均价}})，分类按在 rows 中首次出现的顺序排列
+        """
+        if len(rows) == 0:
+            return [], {}
+        months, month_idx = np.unique(self.month[rows], return_inverse=True)
+        cats, first_seen, cat_idx = np.unique(self.category_id[rows], return_index=True,
+                                              return_inverse=True)
+        key = cat_idx * len(months) + month_idx
+        size = len(cats) * len(months)
+        sums = np.bincount(key, weights=self.price[rows], minlength=size)
+        counts = np.bincount(key, minlength=size)
+
+        month_labels = [ordinal_to_month(int(m)) for m in months]
+        result: Dict[str, Dict[str, float]] = {}
+        for c in np.argsort(first_seen, kind="stable"):
+            series = {}
+            for m in range(len(months)):
+                k = c * len(months) + m
+                if counts[k]:
+                    series[month_labels[m]] = round(float(sums[k] / counts[k]), 2)
+            result[self.categories[cats[c]]] = series
+        return month_labels, result
@@ -0,0 +1,196 @@
+"""
+价格数据快照导出
+
+将某一数据版本的列式价格历史按块流式编码，不在内存中拼出完整结果：
+- arrow    Arrow IPC 流（需要 pyarrow），字符串列为字典编码，date 为 date32
+- parquet  Parquet（需要 pyarrow），每块写为一个 row group
+- npz      NumPy .npz（无额外依赖），每列一个 .npy，按块写入 zip 流：
+               product_id / category_id / source_id / price / day
+           以及字典表 product_name / product_category / product_specs / categories / sources；
+           day 为 1970-01-01 起的天数
+
+读取示例:
+    pyarrow.ipc.open_stream(f).read_all()
+    numpy.load("prices.npz")
+"""
+import zipfile
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from app.pricing.columns import PriceColumns
+
+FORMATS = ("arrow", "parquet", "npz")
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "npz": "application/octet-stream",
+}
+
+EXTENSIONS = {"arrow": "arrows", "parquet": "parquet", "npz": "npz"}
+
+# 每块导出的行数
+DEFAULT_CHUNK_ROWS = 65536
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def available_formats() -> List[str]:
+    if _has_pyarrow():
+        return list(FORMATS)
+    return ["npz"]
+
+
+def resolve_format(fmt: Optional[str] = None) -> str:
+    """
+    校验导出格式，未指定时优先 Arrow IPC，未安装 pyarrow 时使用 npz
+
+    Raises:
+        ValueError: 格式不支持或缺少依赖
+    """
+    if not fmt:
+        return "arrow" if _has_pyarrow() else "npz"
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}，可选 {', '.join(FORMATS)}")
+    if fmt != "npz" and not _has_pyarrow():
+        raise ValueError(f"导出 {fmt} 需要安装 pyarrow，可改用 npz")
+    return fmt
+
+
+class _ChunkSink:
+    """只追加的字节缓冲：编码器写入，生成器按块取走"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _chunks(rows: np.ndarray, chunk_rows: int) -> Iterator[np.ndarray]:
+    for start in range(0, len(rows), chunk_rows):
+        yield rows[start:start + chunk_rows]
+
+
+def export_chunks(columns: PriceColumns, rows: np.ndarray, fmt: str = "npz",
+                  chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    按块导出价格记录
+
+    Args:
+        columns: 列式价格历史（导出期间不变的快照）
+        rows: 导出的行号（按产品、日期有序）
+        fmt: arrow / parquet / npz
+        chunk_rows: 每块行数
+
+    Yields:
+        编码后的字节块
+    """
+    chunk_rows = max(1, chunk_rows)
+    if fmt == "npz":
+        return _export_npz(columns, rows, chunk_rows)
+    return _export_arrow(columns, rows, fmt, chunk_rows)
+
+
+def _export_npz(columns: PriceColumns, rows: np.ndarray, chunk_rows: int) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    try:
+        # 写入不可 seek 的流时 zipfile 使用数据描述符记录大小
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for name in ("product_id", "category_id", "source_id", "price", "day"):
+                column = getattr(columns, name)
+                header = {"descr": np.lib.format.dtype_to_descr(column.dtype),
+                          "fortran_order": False, "shape": (len(rows),)}
+                with archive.open(f"{name}.npy", mode="w", force_zip64=True) as entry:
+                    np.lib.format.write_array_header_2_0(entry, header)
+                    for chunk in _chunks(rows, chunk_rows):
+                        entry.write(column[chunk].tobytes())
+                        yield sink.drain()
+
+            tables = {
+                "product_name": [p["name"] for p in columns.products],
+                "product_category": columns.product_category,
+                "product_specs": [p.get("specs") or "" for p in columns.products],
+                "categories": columns.categories,
+                "sources": columns.sources,
+            }
+            for name, values in tables.items():
+                with archive.open(f"{name}.npy", mode="w", force_zip64=True) as entry:
+                    np.lib.format.write_array(entry, np.asarray(values) if len(values) else np.zeros(0, dtype="U1"))
+                yield sink.drain()
+        yield sink.drain()
+    finally:
+        # 客户端中途断开（GeneratorExit）时也关闭缓冲，丢弃未取走的数据
+        sink.close()
+        sink.drain()
+
+
+def _export_arrow(columns: PriceColumns, rows: np.ndarray, fmt: str, chunk_rows: int) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    categories = pa.array(columns.categories, type=pa.string())
+    names = pa.array([p["name"] for p in columns.products], type=pa.string())
+    specs = pa.array([p.get("specs") or "" for p in columns.products], type=pa.string())
+    sources = pa.array(columns.sources, type=pa.string())
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    schema = pa.schema([
+        ("category", dictionary),
+        ("name", dictionary),
+        ("specs", dictionary),
+        ("date", pa.date32()),
+        ("price", pa.float64()),
+        ("source", dictionary),
+    ])
+
+    def batch(chunk: np.ndarray):
+        product_id = columns.product_id[chunk].astype(np.int32)
+        return pa.record_batch([
+            pa.DictionaryArray.from_arrays(columns.category_id[chunk].astype(np.int32), categories),
+            pa.DictionaryArray.from_arrays(product_id, names),
+            pa.DictionaryArray.from_arrays(product_id, specs),
+            pa.array(columns.day[chunk], type=pa.int32()).view(pa.date32()),
+            pa.array(columns.price[chunk], type=pa.float64()),
+            pa.DictionaryArray.from_arrays(columns.source_id[chunk].astype(np.int32), sources),
+        ], schema=schema)
+
+    sink = _ChunkSink()
+    # with 保证客户端中途断开（GeneratorExit）时写入器同样被关闭
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd") as writer:
+            for chunk in _chunks(rows, chunk_rows):
+                writer.write_table(pa.Table.from_batches([batch(chunk)], schema=schema))
+                yield sink.drain()
+    else:
+        with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema) as writer:
+            for chunk in _chunks(rows, chunk_rows):
+                writer.write_batch(batch(chunk))
+                yield sink.drain()
+    yield sink.drain()
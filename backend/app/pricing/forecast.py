@@ -0,0 +1,227 @@
+"""
+批量价格预测
+
+将历史长度相同的产品序列堆叠为矩阵，一次性完成：
+- 线性趋势：闭式最小二乘 slope = Σ(x - x̄)(y - ȳ) / Σ(x - x̄)²
+- 季节性因子：period = min(4, n // 2) 期移动平均比率，按均值归一化
+- 残差标准差：sqrt(Σ残差² / (n - 2))，95% 置信区间为 ±1.96σ
+
+ForecastTable 在某一数据版本上为所有产品（同名产品合并为一条序列）预先拟合，
+查询时只需按预测月数向量化外推。
+"""
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.pricing.columns import PriceColumns, ordinal_to_month
+
+# 至少需要的历史点数
+MIN_POINTS = 3
+
+# 95% 置信区间系数
+CONFIDENCE_Z = 1.96
+
+# 趋势判断阈值（相对最新价格的月斜率）
+TREND_THRESHOLD = 0.01
+STRONG_TREND_THRESHOLD = 0.03
+
+
+def fit_series(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    拟合一组等长序列
+
+    Args:
+        values: (k, n) 价格矩阵，n >= 3
+
+    Returns:
+        slope / intercept / std: (k,)
+        seasonality: (k, m) 季节性因子（不足 m 个的行以 1.0 填充）
+        season_len: (k,) 每行有效季节性因子个数
+    """
+    values = np.asarray(values, dtype=np.float64)
+    k, n = values.shape
+    x = np.arange(n, dtype=np.float64)
+    x_mean = (n - 1) / 2
+
+    y_mean = values.mean(axis=1)
+    x_centered = x - x_mean
+    slope = (values - y_mean[:, None]) @ x_centered / (x_centered ** 2).sum()
+    intercept = y_mean - slope * x_mean
+
+    residuals = values - (intercept[:, None] + slope[:, None] * x)
+    std = np.sqrt((residuals ** 2).sum(axis=1) / (n - 2))
+
+    seasonality, season_len = _seasonality(values)
+    return {
+        "slope": slope,
+        "intercept": intercept,
+        "std": std,
+        "seasonality": seasonality,
+        "season_len": season_len,
+    }
+
+
+def _seasonality(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    k, n = values.shape
+    if n < 4:
+        return np.ones((k, 1)), np.ones(k, dtype=np.int64)
+
+    period = min(4, n // 2)
+    moving_avg = sliding_window_view(values, period, axis=1).sum(axis=2) / period
+    valid = moving_avg != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = values[:, period - 1:] / moving_avg
+
+    m = ratios.shape[1]
+    season_len = np.full(k, m, dtype=np.int64)
+    if valid.all():
+        return ratios / ratios.mean(axis=1, keepdims=True), season_len
+
+    # 移动平均为 0 的位置不参与计算，剩余比率前移
+    seasonality = np.ones_like(ratios)
+    for i in range(k):
+        row = ratios[i][valid[i]]
+        if len(row) == 0:
+            season_len[i] = 1
+            continue
+        seasonality[i, :len(row)] = row / row.mean()
+        season_len[i] = len(row)
+    return seasonality, season_len
+
+
+def project(fit: Dict[str, np.ndarray], n: np.ndarray,
+            months_ahead: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    外推未来若干期
+
+    Args:
+        fit: fit_series 的结果（可为多组结果按行拼接）
+        n: (k,) 各行历史长度
+        months_ahead: 预测期数
+
+    Returns:
+        (预测值, 下界, 上界)，均为 (k, months_ahead)，未截断负值
+    """
+    n = np.asarray(n, dtype=np.int64)
+    steps = n[:, None] + np.arange(months_ahead)
+    trend = fit["intercept"][:, None] + fit["slope"][:, None] * steps
+
+    season_idx = steps % fit["season_len"][:, None]
+    factor = np.take_along_axis(fit["seasonality"], season_idx, axis=1)
+
+    predicted = trend * factor
+    margin = (fit["std"] * CONFIDENCE_Z)[:, None]
+    return predicted, predicted - margin, predicted + margin
+
+
+def trend_labels(slope: float, last_price: float) -> Tuple[str, str]:
+    """根据月斜率判断趋势方向与强度"""
+    if slope < -TREND_THRESHOLD * last_price:
+        return "下降", "强" if abs(slope) > STRONG_TREND_THRESHOLD * last_price else "弱"
+    if slope > TREND_THRESHOLD * last_price:
+        return "上升", "强" if slope > STRONG_TREND_THRESHOLD * last_price else "弱"
+    return "稳定", "中等"
+
+
+class ForecastTable:
+    """按产品名预拟合的预测表"""
+
+    def __init__(self, columns: PriceColumns, version: int = 0):
+        self.version = version
+        self.columns = columns
+
+        # 同名产品合并为一个预测组，组按首次出现的产品ID排序
+        group_ids: Dict[str, int] = {}
+        self.group_of = np.array(
+            [group_ids.setdefault(p["name"], len(group_ids)) for p in columns.products],
+            dtype=np.int64
+        )
+        self.names = list(group_ids)
+        n_groups = len(self.names)
+
+        # 组内按日期稳定排序（同日期保持产品ID、写入顺序）
+        groups = self.group_of[columns.product_id] if len(columns) else np.zeros(0, np.int64)
+        order = np.lexsort((columns.day, groups))
+        prices = columns.price[order]
+        self.length = np.bincount(groups, minlength=n_groups)
+        starts = np.concatenate(([0], np.cumsum(self.length)[:-1])).astype(np.int64)
+        ends = starts + self.length
+
+        self.last_price = np.zeros(n_groups)
+        self.last_month = np.zeros(n_groups, dtype=np.int64)
+        self.category = [""] * n_groups
+        has_rows = self.length > 0
+        self.last_price[has_rows] = prices[ends[has_rows] - 1]
+        self.last_month[has_rows] = columns.month[order[ends[has_rows] - 1]]
+        for g in np.flatnonzero(has_rows):
+            self.category[g] = columns.category_of(int(columns.product_id[order[starts[g]]]))
+
+        # 按历史长度分批拟合
+        self.slope = np.zeros(n_groups)
+        self.intercept = np.zeros(n_groups)
+        self.std = np.zeros(n_groups)
+        self.season_len = np.ones(n_groups, dtype=np.int64)
+        fits = []
+        for n in np.unique(self.length[self.length >= MIN_POINTS]):
+            members = np.flatnonzero(self.length == n)
+            fit = fit_series(prices[starts[members][:, None] + np.arange(n)])
+            self.slope[members] = fit["slope"]
+            self.intercept[members] = fit["intercept"]
+            self.std[members] = fit["std"]
+            self.season_len[members] = fit["season_len"]
+            fits.append((members, fit["seasonality"]))
+
+        width = max([s.shape[1] for _, s in fits], default=1)
+        self.seasonality = np.ones((n_groups, width))
+        for members, seasonality in fits:
+            self.seasonality[members, :seasonality.shape[1]] = seasonality
+
+        self.directions = [
+            trend_labels(self.slope[g], self.last_price[g]) if self.length[g] >= MIN_POINTS else ("", "")
+            for g in range(n_groups)
+        ]
+
+    def groups_for(self, product_ids: Sequence[int]) -> List[int]:
+        """产品ID -> 预测组（按首次出现顺序去重，历史不足的组被跳过）"""
+        groups = dict.fromkeys(int(g) for g in self.group_of[np.asarray(product_ids, dtype=np.int64)])
+        return [g for g in groups if self.length[g] >= MIN_POINTS]
+
+    def predict(self, groups: Sequence[int], months_ahead: int) -> List[Dict[str, Any]]:
+        """生成预测组的预测结果"""
+        if not groups:
+            return []
+        groups = np.asarray(groups, dtype=np.int64)
+        fit = {
+            "slope": self.slope[groups],
+            "intercept": self.intercept[groups],
+            "std": self.std[groups],
+            "seasonality": self.seasonality[groups],
+            "season_len": self.season_len[groups],
+        }
+        predicted, lower, upper = project(fit, self.length[groups], months_ahead)
+        predicted, lower, upper = predicted.tolist(), lower.tolist(), upper.tolist()
+
+        results = []
+        for i, g in enumerate(groups.tolist()):
+            last_month = int(self.last_month[g])
+            direction, strength = self.directions[g]
+            results.append({
+                "product_name": self.names[g],
+                "category": self.category[g],
+                "current_price": float(self.last_price[g]),
+                "trend_direction": direction,
+                "trend_strength": strength,
+                "trend_slope": round(float(self.slope[g]), 4),
+                "predictions": [
+                    {
+                        "date": ordinal_to_month(last_month + step + 1),
+                        "predicted_price": round(max(predicted[i][step], 0), 2),
+                        "lower_bound": round(max(lower[i][step], 0), 2),
+                        "upper_bound": round(max(upper[i][step], 0), 2),
+                        "confidence": "95%"
+                    }
+                    for step in range(months_ahead)
+                ]
+            })
+        return results
@@ -0,0 +1,130 @@
+"""
+产品模糊匹配
+
+对产品名称、分类、规格建立字符三元组（trigram）倒排索引：
+- 文本按英文数字串 / 中文串切分为词元，每个词元首尾加 "#" 后取三元组，
+  "R750服务器" 得到 #r7 r75 750 50# #服务 服务器 务器#
+- 同一三元组出现在多个字段时取字段权重最大值（名称 > 分类 > 规格）
+- 三元组按 idf = log(1 + N / df) 加权，常见片段（如 "gb#"）贡献小
+
+评分 = 0.8 × 查询覆盖率 + 0.2 × 名称精确率
+  查询覆盖率: 命中三元组的 idf × 字段权重之和 / 查询三元组 idf 之和
+  名称精确率: 命中的名称三元组 idf 之和 / 产品名称三元组 idf 之和
+查询只遍历查询三元组的倒排表，耗时与候选数相关，与目录规模无关。
+"""
+import heapq
+import math
+import re
+import unicodedata
+from typing import Dict, List, Set, Tuple
+
+# 字段权重
+FIELD_WEIGHTS = {"name": 1.0, "category": 0.6, "specs": 0.5}
+
+COVERAGE_WEIGHT = 0.8
+PRECISION_WEIGHT = 0.2
+
+# 文档频率超过该比例的三元组在有更具区分度的三元组时跳过（只影响召回的遍历开销）
+MAX_DF_RATIO = 0.2
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[一-鿿]+")
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return _TOKEN_RE.findall(text)
+
+
+def trigrams(text: str) -> Set[str]:
+    grams = set()
+    for token in tokenize(text):
+        padded = f"#{token}#"
+        grams.update([padded[i:i + 3] for i in range(len(padded) - 2)])
+    return grams
+
+
+class FuzzyMatcher:
+    """字符三元组模糊匹配"""
+
+    def __init__(self):
+        # 三元组 -> {文档ID: 字段权重}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._name_grams: List[Set[str]] = []
+        # 分类名重复率高，缓存其三元组
+        self._category_grams: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._name_grams)
+
+    def add(self, doc_id: int, name: str, category: str = "", specs: str = ""):
+        """追加文档，doc_id 需按 0, 1, 2... 顺序递增"""
+        name_grams = trigrams(name)
+        category_grams = self._category_grams.get(category)
+        if category_grams is None:
+            category_grams = self._category_grams[category] = trigrams(category)
+
+        # 按权重升序写入，后写入的字段覆盖，即取最大权重
+        weights = dict.fromkeys(trigrams(specs), FIELD_WEIGHTS["specs"])
+        weights.update(dict.fromkeys(category_grams, FIELD_WEIGHTS["category"]))
+        weights.update(dict.fromkeys(name_grams, FIELD_WEIGHTS["name"]))
+
+        postings = self._postings
+        for gram, weight in weights.items():
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = {}
+            posting[doc_id] = weight
+        self._name_grams.append(name_grams)
+
+    def _idf(self, gram: str) -> float:
+        df = len(self._postings.get(gram, ()))
+        return math.log(1 + len(self._name_grams) / df) if df else 0.0
+
+    def search(self, query: str, top_k: int = 5, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        模糊查询
+
+        Returns:
+            [(文档ID, 相似度 0~1)]，按相似度降序
+        """
+        query_grams = trigrams(query)
+        if not query_grams or not self._name_grams:
+            return []
+
+        idf = {gram: self._idf(gram) for gram in query_grams}
+        # 未出现在目录中的三元组同样计入分母：log(1 + N)
+        max_idf = math.log(1 + len(self._name_grams))
+        query_weight = sum(v if v else max_idf for v in idf.values())
+
+        present = sorted((g for g in query_grams if idf[g]), key=lambda g: len(self._postings[g]))
+        max_df = max(1, int(len(self._name_grams) * MAX_DF_RATIO))
+        selective = [g for g in present if len(self._postings[g]) <= max_df]
+
+        scores: Dict[int, float] = {}
+        for gram in selective or present:
+            weight = idf[gram]
+            for doc_id, field_weight in self._postings[gram].items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * field_weight
+        if selective:
+            # 常见三元组只为已召回的候选加分
+            for gram in present[len(selective):]:
+                weight = idf[gram]
+                posting = self._postings[gram]
+                for doc_id in scores:
+                    if doc_id in posting:
+                        scores[doc_id] += weight * posting[doc_id]
+
+        # 先按覆盖率取较大的候选集，再计算名称精确率
+        candidates = heapq.nlargest(max(top_k * 4, 20), scores.items(), key=lambda item: item[1])
+        results = []
+        for doc_id, covered in candidates:
+            name_grams = self._name_grams[doc_id]
+            name_weight = sum(self._idf(g) for g in name_grams)
+            matched_weight = sum(idf[g] for g in name_grams & query_grams)
+            precision = matched_weight / name_weight if name_weight else 0.0
+            score = COVERAGE_WEIGHT * covered / query_weight + PRECISION_WEIGHT * precision
+            if score >= min_score:
+                results.append((doc_id, round(score, 4)))
+
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[:top_k]
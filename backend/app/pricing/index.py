@@ -0,0 +1,144 @@
+"""
+价格目录索引
+
+在产品表（见 app.pricing.columns.PriceColumns.products）上建立：
+- 分类桶：分类 -> 产品ID列表
+- 倒排索引：名称 / 规格文本的字符 1-gram 与 2-gram -> 产品ID集合
+  （中文无空格分词，字符 n-gram 同时覆盖中英文）
+- 模糊匹配：名称 / 分类 / 规格的三元组索引（见 app.pricing.fuzzy）
+- 规格特征：加入时解析规格文本得到的数值特征矩阵（见 app.pricing.specs）
+
+产品历史由列式存储的 offsets 直接切片获得。
+
+关键词查询先求 n-gram 倒排表交集得到候选产品，再对候选做子串校验，
+结果与原先的 `keyword.lower() in text.lower()` 全表扫描完全一致，
+但开销只与候选产品数相关，与历史价格记录数无关。
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.pricing.fuzzy import FuzzyMatcher
+from app.pricing.specs import SpecIndex
+
+# 参与倒排索引的字段
+INDEXED_FIELDS = ("name", "specs")
+
+
+def _grams(text: str, n: int) -> Set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class NGramIndex:
+    """字符 n-gram 倒排索引，支持精确的子串查询"""
+
+    def __init__(self):
+        self._unigrams: Dict[str, Set[int]] = {}
+        self._bigrams: Dict[str, Set[int]] = {}
+        self._texts: Dict[int, str] = {}
+
+    def add(self, doc_id: int, text: str):
+        text = text.lower()
+        self._texts[doc_id] = text
+        for gram in _grams(text, 1):
+            self._unigrams.setdefault(gram, set()).add(doc_id)
+        for gram in _grams(text, 2):
+            self._bigrams.setdefault(gram, set()).add(doc_id)
+
+    def search(self, keyword: str) -> Set[int]:
+        """返回文本中包含 keyword（不区分大小写）的文档ID"""
+        keyword = keyword.lower()
+        if not keyword:
+            return set(self._texts)
+
+        if len(keyword) == 1:
+            return set(self._unigrams.get(keyword, ()))
+
+        # 按倒排表长度升序求交集，尽早收缩候选集
+        postings = []
+        for gram in _grams(keyword, 2):
+            posting = self._bigrams.get(gram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return candidates
+
+        # bigram 全部命中不代表连续出现，需做子串校验
+        return {doc_id for doc_id in candidates if keyword in self._texts[doc_id]}
+
+
+class PriceIndex:
+    """价格目录索引：分类桶 + 倒排索引"""
+
+    def __init__(self, products: Iterable[Dict[str, Any]]):
+        self.products: List[Dict[str, Any]] = []
+        self.categories: Dict[str, List[int]] = {}
+        self._name_ids: Dict[str, List[int]] = {}
+        self._field_indexes = {field: NGramIndex() for field in INDEXED_FIELDS}
+        self.fuzzy = FuzzyMatcher()
+        self.specs = SpecIndex()
+
+        for product in products:
+            self.add_product(product)
+
+    def add_product(self, product: Dict[str, Any]) -> int:
+        """追加产品，产品ID为其在产品表中的位置"""
+        product_id = len(self.products)
+        self.products.append(product)
+        self.categories.setdefault(product["category"], []).append(product_id)
+        self._name_ids.setdefault(product["name"], []).append(product_id)
+        for field in INDEXED_FIELDS:
+            self._field_indexes[field].add(product_id, product.get(field) or "")
+        self.fuzzy.add(product_id, product["name"], product["category"], product.get("specs") or "")
+        self.specs.add(product_id, product.get("specs") or "")
+        return product_id
+
+    def category_names(self) -> List[str]:
+        return sorted(self.categories)
+
+    def product_ids(self, category: Optional[str] = None) -> List[int]:
+        if category is None:
+            return list(range(len(self.products)))
+        return list(self.categories.get(category, []))
+
+    def search(self, keyword: str, fields: Tuple[str, ...] = INDEXED_FIELDS,
+               category: Optional[str] = None) -> List[int]:
+        """
+        关键词查询
+
+        Args:
+            keyword: 关键词（子串匹配，不区分大小写）
+            fields: 参与匹配的字段
+            category: 限定分类
+
+        Returns:
+            升序排列的产品ID列表
+        """
+        matched: Set[int] = set()
+        for field in fields:
+            matched |= self._field_indexes[field].search(keyword)
+
+        if category is not None:
+            matched &= set(self.categories.get(category, []))
+        return sorted(matched)
+
+    def search_categories(self, keyword: str) -> List[int]:
+        """分类名包含关键词的所有产品"""
+        keyword = keyword.lower()
+        matched = []
+        for category, product_ids in self.categories.items():
+            if keyword in category.lower():
+                matched.extend(product_ids)
+        return sorted(matched)
+
+    def ids_by_name(self, name: str) -> List[int]:
+        """名称完全相同的产品（可能分属不同分类）"""
+        return list(self._name_ids.get(name, []))
+
+    def fuzzy_search(self, query: str, top_k: int = 5, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """模糊查询，返回 [(产品ID, 相似度)]"""
+        return self.fuzzy.search(query, top_k, min_score)
@@ -0,0 +1,188 @@
+"""
+批量报价分析
+
+投标评审时一次比对多家供应商的整包报价：
+- 报价明细可来自 JSON 列表或 CSV 上传（表头见 CSV_COLUMNS，支持中文别名）
+- 同名产品只解析一次参考价格，明细行数再多，索引查询次数也只与不同产品名数量相关
+- 偏差按列向量化计算，汇总整包及各供应商的偏差
+"""
+import csv
+import io
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 偏差百分比阈值：不高于 LOW 为偏低，不低于 HIGH 为偏高
+LOW_THRESHOLD = -10
+HIGH_THRESHOLD = 20
+
+ASSESSMENTS = ("报价偏低", "报价合理", "报价偏高")
+
+# CSV 列名 -> 可接受的表头
+CSV_COLUMNS = {
+    "product_name": ("product_name", "name", "产品名称", "产品", "名称"),
+    "quoted_price": ("quoted_price", "price", "报价", "单价"),
+    "quantity": ("quantity", "qty", "数量"),
+    "supplier": ("supplier", "供应商"),
+    "line_id": ("line_id", "序号", "行号"),
+}
+
+
+def assess_deviation(percent: float) -> Tuple[str, str]:
+    """按偏差百分比给出评估与建议"""
+    if percent <= LOW_THRESHOLD:
+        return "报价偏低", "建议核实产品质量和服务条款，警惕低价陷阱"
+    if percent >= HIGH_THRESHOLD:
+        return "报价偏高", "建议与供应商协商降价，或提供额外增值服务"
+    return "报价合理", "报价处于合理区间，可以接受"
+
+
+def parse_quote_csv(content: bytes, max_lines: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    解析报价 CSV
+
+    Args:
+        content: 文件内容（UTF-8，可带 BOM）
+        max_lines: 明细行数上限
+
+    Raises:
+        ValueError: 编码错误、缺少必需列、字段数多于表头、数值无效（非有限值、报价为负、
+                    数量不为正）或超过行数上限；消息中带行号
+    """
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("CSV 文件需为 UTF-8 编码")
+
+    reader = csv.DictReader(io.StringIO(text))
+    headers = {(h or "").strip().lower(): h for h in reader.fieldnames or []}
+    columns = {}
+    for column, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in headers:
+                columns[column] = headers[alias]
+                break
+    missing = [c for c in ("product_name", "quoted_price") if c not in columns]
+    if missing:
+        raise ValueError(f"CSV 缺少必需列: {', '.join(missing)}")
+
+    items = []
+    for line_no, row in enumerate(reader, start=2):
+        # DictReader 将多出表头的字段归入 None 键
+        if row.get(None):
+            raise ValueError(f"第 {line_no} 行字段数多于表头")
+        name = (row.get(columns["product_name"]) or "").strip()
+        if not name:
+            continue
+        if max_lines is not None and len(items) >= max_lines:
+            raise ValueError(f"报价明细超过 {max_lines} 行")
+        try:
+            price = float(row[columns["quoted_price"]])
+            quantity = float(row.get(columns.get("quantity"), "") or 1)
+        except (TypeError, ValueError):
+            raise ValueError(f"第 {line_no} 行报价或数量无效")
+        # 与 JSON 输入（QuoteLine）的校验规则一致
+        if not math.isfinite(price) or price < 0:
+            raise ValueError(f"第 {line_no} 行报价无效，需为非负数")
+        if not math.isfinite(quantity) or quantity <= 0:
+            raise ValueError(f"第 {line_no} 行数量无效，需为正数")
+        items.append({
+            "product_name": name,
+            "quoted_price": price,
+            "quantity": quantity,
+            "supplier": (row.get(columns.get("supplier")) or "").strip() or None,
+            "line_id": (row.get(columns.get("line_id")) or "").strip() or None,
+        })
+    return items
+
+
+def _deviation(quoted: float, reference: float) -> Dict[str, Any]:
+    difference = quoted - reference
+    percent = difference / reference * 100 if reference else 0.0
+    return {
+        "quoted_total": round(quoted, 2),
+        "reference_total": round(reference, 2),
+        "difference": round(difference, 2),
+        "difference_percent": round(percent, 2),
+        "assessment": assess_deviation(percent)[0],
+    }
+
+
+def analyze_quote_lines(items: List[Dict[str, Any]],
+                        resolve: Callable[[str], Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    批量分析报价明细
+
+    Args:
+        items: 明细（product_name / quoted_price / quantity / supplier / line_id）
+        resolve: 产品名 -> 参考信息（reference_price / matched_product / match_score），
+                 未找到时返回 None；每个不同的产品名只调用一次
+
+    Returns:
+        lines: 逐行偏差
+        package: 整包偏差（仅统计找到参考价格的行）
+        suppliers: 各供应商的整包偏差
+        unmatched: 未找到参考价格的产品名
+    """
+    names = [str(item["product_name"]).strip() for item in items]
+    references = {name: resolve(name) for name in dict.fromkeys(names)}
+
+    quoted = np.array([float(item["quoted_price"]) for item in items], dtype=np.float64)
+    quantity = np.array([float(item.get("quantity") or 1) for item in items], dtype=np.float64)
+    reference = np.array([references[name]["reference_price"] if references[name] else np.nan
+                          for name in names], dtype=np.float64)
+    matched = ~np.isnan(reference)
+    safe_reference = np.where(matched & (reference != 0), reference, 1.0)
+    difference = quoted - reference
+    percent = np.where(matched, difference / safe_reference * 100, np.nan)
+
+    lines = []
+    for i, (name, item) in enumerate(zip(names, items)):
+        line = {
+            "line": i + 1,
+            "line_id": item.get("line_id"),
+            "product_name": name,
+            "supplier": item.get("supplier"),
+            "quantity": float(quantity[i]),
+            "quoted_price": float(quoted[i]),
+        }
+        ref = references[name]
+        if ref is None:
+            line.update({"reference_price": None, "assessment": "未找到参考价格"})
+        else:
+            line.update({
+                "reference_price": ref["reference_price"],
+                "matched_product": ref["matched_product"],
+                "match_score": ref.get("match_score"),
+                "price_difference": round(float(difference[i]), 2),
+                "price_difference_percent": round(float(percent[i]), 2),
+                "assessment": assess_deviation(float(percent[i]))[0],
+            })
+        lines.append(line)
+
+    quoted_totals = quoted * quantity
+    reference_totals = np.where(matched, reference, 0.0) * quantity
+
+    package = _deviation(float(quoted_totals[matched].sum()), float(reference_totals[matched].sum()))
+    package.update({
+        "lines": len(items),
+        "matched_lines": int(matched.sum()),
+        "quoted_total_all": round(float(quoted_totals.sum()), 2),
+        "assessment_counts": {a: sum(1 for line in lines if line["assessment"] == a) for a in ASSESSMENTS},
+    })
+
+    suppliers = {}
+    supplier_names = np.array([item.get("supplier") or "" for item in items], dtype=object)
+    for supplier in dict.fromkeys(s for s in supplier_names.tolist() if s):
+        mask = matched & (supplier_names == supplier)
+        summary = _deviation(float(quoted_totals[mask].sum()), float(reference_totals[mask].sum()))
+        summary["matched_lines"] = int(mask.sum())
+        suppliers[supplier] = summary
+
+    return {
+        "lines": lines,
+        "package": package,
+        "suppliers": suppliers,
+        "unmatched": [name for name, ref in references.items() if ref is None],
+    }
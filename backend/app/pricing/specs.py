@@ -0,0 +1,194 @@
+"""
+规格解析与相似配置检索
+
+将规格文本（如 "2×Intel Xeon Gold 6348, 256GB RAM, 4×2.4TB SAS"）解析为数值特征：
+    cpu_count      CPU 数量
+    cpu_cores      CPU 总核数
+    memory_gb      内存容量（GB）
+    storage_tb     存储总容量（TB）
+    gpu_count      GPU 数量
+    gpu_memory_gb  GPU 显存总量（GB）
+单位归一化复用 FieldExtractor。需求文本（"内存不少于256GB，4块2.4TB SAS硬盘"）
+使用同一解析器，因此可直接以需求描述检索相似配置。
+
+SpecIndex 将所有产品特征存为矩阵，相似度在 log1p 空间按查询给出的特征计算：
+    d = sqrt(mean((log1p(x) - log1p(q))²))，产品缺失该特征时差值记为 MISSING_PENALTY
+    similarity = 1 / (1 + d)
+"""
+import math
+import re
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.field_extractor import FieldExtractor
+
+FEATURES = ("cpu_count", "cpu_cores", "memory_gb", "storage_tb", "gpu_count", "gpu_memory_gb")
+
+# 产品缺失查询特征时的 log 空间差值
+MISSING_PENALTY = 1.0
+
+_extractor = FieldExtractor()
+
+_PART_SPLIT = re.compile(r"[,，;；+、\n]")
+_QUANTITY = re.compile(r"(\d+)\s*(?:x|×|\*|颗|块|张|片|卡|台|路)")
+_CAPACITY = re.compile(r"(\d+(?:\.\d+)?)\s*(tb|gb|t|g)(?![a-z])")
+_CORES = re.compile(r"(\d+)\s*(核心|核|cores?)(?![a-z])")
+
+_MEMORY = re.compile(r"ram|lpddr|ddr\d?|ecc|内存")
+_GPU = re.compile(r"rtx|gtx|tesla|quadro|radeon|a100|h100|l40|显卡|gpu")
+_STORAGE = re.compile(r"sas|sata|ssd|nvme|hdd|pcie|硬盘|固态|存储|系统盘|数据盘")
+_CPU = re.compile(r"xeon|至强|epyc|threadripper|i[3579]-|celeron|core|鲲鹏|飞腾|海光|龙芯|cpu|处理器")
+
+
+def _to_gb(value: float, unit: str) -> float:
+    unit = _extractor.normalize_unit(unit).upper()
+    if unit in ("TB", "T"):
+        return value * 1024
+    return value
+
+
+def _quantity(part: str) -> int:
+    match = _QUANTITY.search(part)
+    return int(match.group(1)) if match else 1
+
+
+def _has_component(text: str) -> bool:
+    return bool(_MEMORY.search(text) or _GPU.search(text) or _STORAGE.search(text))
+
+
+def _split_parts(text: str) -> List[str]:
+    """
+    按分隔符切分；一段内有多个容量（"16GB内存 512GB SSD"）时再按空格切开，
+    每个容量与其前后的部件关键词（内存 / 硬盘 / 显卡等）归为一组
+    """
+    parts = []
+    for part in _PART_SPLIT.split(text):
+        part = part.strip()
+        if len(_CAPACITY.findall(part)) < 2:
+            if part:
+                parts.append(part)
+            continue
+
+        groups: List[List[str]] = []
+        pending: List[str] = []
+        for token in part.split():
+            if _CAPACITY.search(token):
+                groups.append(pending + [token])
+                pending = []
+            elif groups and not pending and not _has_component(" ".join(groups[-1])):
+                # "16GB DDR5"：关键词在容量之后
+                groups[-1].append(token)
+            else:
+                # "内存 16GB"、"2x RTX A6000 48GB"：关键词在容量之前
+                pending.append(token)
+        if pending:
+            if groups:
+                groups[-1].extend(pending)
+            else:
+                groups.append(pending)
+        parts.extend(" ".join(group) for group in groups)
+    return parts
+
+
+def parse_specs(text: str) -> Dict[str, float]:
+    """解析规格文本，返回识别到的特征（未识别的特征不出现在结果中）"""
+    text = unicodedata.normalize("NFKC", text or "").lower().replace("×", "x")
+    features: Dict[str, float] = {}
+
+    def add(name: str, value: float):
+        features[name] = features.get(name, 0) + value
+
+    for part in _split_parts(text):
+        quantity = _quantity(part)
+        capacity = _CAPACITY.search(part)
+        capacity_gb = _to_gb(float(capacity.group(1)), capacity.group(2)) if capacity else None
+
+        if _MEMORY.search(part) and capacity_gb and not _GPU.search(part):
+            add("memory_gb", capacity_gb)
+        elif _GPU.search(part):
+            add("gpu_count", quantity)
+            if capacity_gb:
+                add("gpu_memory_gb", quantity * capacity_gb)
+        elif _STORAGE.search(part) and capacity_gb:
+            add("storage_tb", quantity * capacity_gb / 1024)
+        elif _CPU.search(part):
+            add("cpu_count", quantity)
+
+        cores = _CORES.search(part)
+        if cores and _extractor.normalize_unit(cores.group(2)) == "cores":
+            # "2颗 32核"、"每颗 32 核" 按 CPU 数量折算总核数；单独的 "≥64核" 视为总核数
+            if _CPU.search(part) and _QUANTITY.search(part):
+                multiplier = quantity
+            elif "每" in part:
+                multiplier = features.get("cpu_count", 1)
+            else:
+                multiplier = 1
+            add("cpu_cores", int(cores.group(1)) * multiplier)
+
+    return {name: round(value, 4) for name, value in features.items()}
+
+
+def feature_vector(features: Dict[str, float]) -> np.ndarray:
+    return np.array([features.get(name, np.nan) for name in FEATURES], dtype=np.float64)
+
+
+class SpecIndex:
+    """产品规格特征矩阵"""
+
+    def __init__(self):
+        self._rows: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, product_id: int, specs: str) -> Dict[str, float]:
+        """解析并追加产品规格，product_id 需按 0, 1, 2... 顺序递增"""
+        features = parse_specs(specs)
+        self._rows.append(feature_vector(features))
+        self._matrix = None
+        return features
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """(产品数, 特征数) 的 log1p 特征矩阵，缺失为 NaN"""
+        if self._matrix is None:
+            raw = np.vstack(self._rows) if self._rows else np.zeros((0, len(FEATURES)))
+            self._matrix = np.log1p(raw)
+        return self._matrix
+
+    def features(self, product_id: int) -> Dict[str, float]:
+        row = self._rows[product_id]
+        return {name: float(row[i]) for i, name in enumerate(FEATURES) if not math.isnan(row[i])}
+
+    def search(self, query: Dict[str, float], top_k: int = 5,
+               candidates: Optional[Sequence[int]] = None) -> List[Tuple[int, float]]:
+        """
+        检索规格最接近的产品
+
+        Args:
+            query: 查询特征（可只给出部分特征）
+            top_k: 返回数量
+            candidates: 限定候选产品ID（如某一分类）
+
+        Returns:
+            [(产品ID, 相似度 0~1)]，按相似度降序
+        """
+        q = np.log1p(feature_vector(query))
+        used = ~np.isnan(q)
+        if not used.any() or len(self._rows) == 0:
+            return []
+
+        ids = np.arange(len(self._rows)) if candidates is None else np.asarray(candidates, dtype=np.int64)
+        if len(ids) == 0:
+            return []
+        diff = self.matrix[np.ix_(ids, np.flatnonzero(used))] - q[used]
+        diff = np.where(np.isnan(diff), MISSING_PENALTY, diff)
+        distance = np.sqrt((diff ** 2).mean(axis=1))
+
+        k = min(top_k, len(ids))
+        top = np.argpartition(distance, k - 1)[:k]
+        top = top[np.lexsort((ids[top], distance[top]))]
+        return [(int(ids[i]), round(float(1 / (1 + distance[i])), 4)) for i in top]
@@ -0,0 +1,330 @@
+"""
+价格数据存储
+
+PriceStore 定义价格数据源接口，PriceReference 只通过它读取列式价格历史：
+- MemoryPriceStore: 进程内存储（默认使用固定种子生成的模拟数据，各进程一致）
+- SQLitePriceStore: 持久化存储，按 (产品, 日期) 与 (分类, 日期) 建立索引，
+  支持批量导入（单事务 executemany）、增量追加以及 CSV / Parquet 文件导入
+
+通过环境变量 PRICE_STORE_URL 选择后端:
+    memory://                       （默认）
+    sqlite:///./data/prices.db
+
+命令行（在 backend 目录下）:
+    python -m app.pricing.store import prices.csv --url sqlite:///./data/prices.db
+    python -m app.pricing.store seed --url sqlite:///./data/prices.db
+"""
+import argparse
+import csv
+from abc import ABC, abstractmethod
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.pricing.columns import PriceColumns, date_to_day
+
+DEFAULT_STORE_URL = "memory://"
+
+# 批量导入时每个事务写入的记录数
+DEFAULT_BATCH_SIZE = 50000
+
+# 等待其他进程释放写锁的秒数
+BUSY_TIMEOUT_SECONDS = 30
+
+# 导入文件需要的列（specs / source 可缺省）
+REQUIRED_FIELDS = ("category", "name", "date", "price")
+
+
+class PriceStore(ABC):
+    """价格数据源接口（未实现全部抽象方法的后端在构造时即报错）"""
+
+    @property
+    @abstractmethod
+    def version(self) -> int:
+        """数据版本，每次追加数据后递增，用于判断缓存是否过期"""
+
+    @abstractmethod
+    def load_snapshot(self) -> Tuple[int, PriceColumns]:
+        """在同一次读取中获取 (数据版本, 列式价格历史)，版本与数据一一对应"""
+
+    def load_columns(self) -> PriceColumns:
+        """读取全部价格历史为列式结构"""
+        return self.load_snapshot()[1]
+
+    @abstractmethod
+    def append(self, records: Iterable[Dict[str, Any]]) -> int:
+        """追加价格记录（category / name / specs / date / price / source），返回写入条数"""
+
+    def import_csv(self, path, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """从 CSV 文件（表头含 category,name,specs,date,price,source）分批导入"""
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            return self._import_batches(_batched(csv.DictReader(f), batch_size))
+
+    def import_parquet(self, path, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """从 Parquet 文件分批导入（需要安装 pyarrow）"""
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("导入 Parquet 需要安装 pyarrow")
+
+        parquet_file = pq.ParquetFile(str(path))
+        batches = (batch.to_pylist() for batch in parquet_file.iter_batches(batch_size=batch_size))
+        return self._import_batches(batches)
+
+    def _import_batches(self, batches: Iterable[List[Dict[str, Any]]]) -> int:
+        total = 0
+        for batch in batches:
+            total += self.append(batch)
+        return total
+
+    def close(self):
+        pass
+
+
+def _batched(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _normalize(record: Dict[str, Any]) -> Tuple[str, str, str, int, float, str]:
+    missing = [f for f in REQUIRED_FIELDS if record.get(f) in (None, "")]
+    if missing:
+        raise ValueError(f"价格记录缺少字段: {', '.join(missing)}")
+    return (
+        str(record["category"]).strip(),
+        str(record["name"]).strip(),
+        str(record.get("specs") or "").strip(),
+        date_to_day(str(record["date"])),
+        float(record["price"]),
+        str(record.get("source") or "").strip(),
+    )
+
+
+class MemoryPriceStore(PriceStore):
+    """进程内价格存储"""
+
+    def __init__(self, records: Optional[Iterable[Dict[str, Any]]] = None):
+        self._records: List[Dict[str, Any]] = []
+        self._version = 0
+        self._lock = threading.Lock()
+        if records:
+            self.append(records)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def load_snapshot(self) -> Tuple[int, PriceColumns]:
+        with self._lock:
+            return self._version, PriceColumns.from_records(self._records)
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> int:
+        rows = []
+        for record in records:
+            _normalize(record)
+            rows.append(dict(record))
+        with self._lock:
+            self._records.extend(rows)
+            self._version += 1
+        return len(rows)
+
+
+class SQLitePriceStore(PriceStore):
+    """SQLite 价格存储"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS sources (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY,
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            name TEXT NOT NULL,
+            specs TEXT NOT NULL DEFAULT '',
+            UNIQUE (category_id, name)
+        );
+        -- day: 1970-01-01 起的天数
+        CREATE TABLE IF NOT EXISTS prices (
+            product_id INTEGER NOT NULL REFERENCES products(id),
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            day INTEGER NOT NULL,
+            price REAL NOT NULL,
+            source_id INTEGER NOT NULL REFERENCES sources(id)
+        );
+        CREATE INDEX IF NOT EXISTS ix_prices_product_day ON prices (product_id, day);
+        CREATE INDEX IF NOT EXISTS ix_prices_category_day ON prices (category_id, day);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 多个 worker 同时写入时等待写锁，而不是立即报 database is locked
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT_SECONDS)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+    @property
+    def version(self) -> int:
+        # 每次从库中读取，其他进程追加的数据同样可见
+        with self._lock:
+            return self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def _lookup(self, table: str) -> Dict[str, int]:
+        return {name: id_ for id_, name in self._conn.execute(f"SELECT id, name FROM {table}")}
+
+    def _next_id(self, table: str) -> int:
+        return self._conn.execute(f"SELECT COALESCE(MAX(id) + 1, 0) FROM {table}").fetchone()[0]
+
+    def _ensure_ids(self, table: str, ids: Dict[str, int], names: Iterable[str]):
+        new_names = [name for name in dict.fromkeys(names) if name not in ids]
+        if not new_names:
+            return
+        start = self._next_id(table)
+        rows = [(start + i, name) for i, name in enumerate(new_names)]
+        self._conn.executemany(f"INSERT INTO {table} (id, name) VALUES (?, ?)", rows)
+        ids.update({name: id_ for id_, name in rows})
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> int:
+        rows = [_normalize(record) for record in records]
+        if not rows:
+            return 0
+
+        with self._lock, self._conn:
+            # 先取得写锁再读取字典表并分配 ID：多个进程同时追加时串行执行，
+            # 不会分到相同的 ID；ID 保持从 0 连续，load_columns 按下标对应
+            self._conn.execute("BEGIN IMMEDIATE")
+            categories = self._lookup("categories")
+            sources = self._lookup("sources")
+            self._ensure_ids("categories", categories, (r[0] for r in rows))
+            self._ensure_ids("sources", sources, (r[5] for r in rows))
+
+            products = {
+                (category_id, name): id_
+                for id_, category_id, name in self._conn.execute("SELECT id, category_id, name FROM products")
+            }
+            new_products = {}
+            next_product_id = self._next_id("products")
+            for category, name, specs, _, _, _ in rows:
+                key = (categories[category], name)
+                if key not in products and key not in new_products:
+                    new_products[key] = (next_product_id + len(new_products), key[0], name, specs)
+            if new_products:
+                self._conn.executemany(
+                    "INSERT INTO products (id, category_id, name, specs) VALUES (?, ?, ?, ?)",
+                    list(new_products.values())
+                )
+                products.update({key: row[0] for key, row in new_products.items()})
+
+            self._conn.executemany(
+                "INSERT INTO prices (product_id, category_id, day, price, source_id) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (products[(categories[c], n)], categories[c], day, price, sources[s])
+                    for c, n, _, day, price, s in rows
+                ]
+            )
+            self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        return len(rows)
+
+    def load_snapshot(self) -> Tuple[int, PriceColumns]:
+        # 所有查询在同一读事务中执行，其他进程的并发追加不会让版本与各表数据错位
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                version = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+                categories = [name for _, name in self._conn.execute("SELECT id, name FROM categories ORDER BY id")]
+                sources = [name for _, name in self._conn.execute("SELECT id, name FROM sources ORDER BY id")]
+                products = [
+                    {"category": categories[category_id], "name": name, "specs": specs}
+                    for category_id, name, specs in self._conn.execute(
+                        "SELECT category_id, name, specs FROM products ORDER BY id"
+                    )
+                ]
+                rows = self._conn.execute(
+                    "SELECT product_id, day, price, source_id FROM prices ORDER BY product_id, day, rowid"
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+
+        data = np.array(rows, dtype=np.float64).reshape(-1, 4)
+        return version, PriceColumns(
+            products, categories, sources,
+            data[:, 0].astype(np.int32), data[:, 1].astype(np.int32),
+            data[:, 2], data[:, 3].astype(np.int16),
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_price_store(url: Optional[str] = None,
+                       seed: Optional[Callable[[], Iterable[Dict[str, Any]]]] = None) -> PriceStore:
+    """
+    根据 URL 创建价格存储
+
+    Args:
+        url: 存储地址，默认读取 PRICE_STORE_URL
+        seed: 内存存储的初始数据（可调用对象，仅在使用内存存储时调用）
+    """
+    url = url or os.getenv("PRICE_STORE_URL") or DEFAULT_STORE_URL
+
+    if url.startswith("memory:"):
+        return MemoryPriceStore(seed() if seed else None)
+    if url.startswith("sqlite:///"):
+        return SQLitePriceStore(url[len("sqlite:///"):])
+    raise ValueError(f"不支持的价格存储地址: {url}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="价格数据导入")
+    parser.add_argument("command", choices=["import", "seed"],
+                        help="import: 导入 CSV / Parquet 文件; seed: 写入模拟价格数据")
+    parser.add_argument("path", nargs="?", help="导入文件路径（.csv / .parquet）")
+    parser.add_argument("--url", default=None, help="存储地址，默认读取 PRICE_STORE_URL")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="每批写入条数")
+    args = parser.parse_args(argv)
+
+    store = create_price_store(args.url)
+    try:
+        if args.command == "seed":
+            from app.agents.price_reference import generate_price_history
+            count = store.append(generate_price_history())
+        elif not args.path:
+            parser.error("import 需要指定文件路径")
+        elif args.path.endswith(".parquet"):
+            count = store.import_parquet(args.path, args.batch_size)
+        else:
+            count = store.import_csv(args.path, args.batch_size)
+        print(f"写入 {count} 条价格记录，当前数据版本 {store.version}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+分桶价格趋势
+
+按周 / 月 / 季度对价格历史分桶，为图表提供体量可控的趋势数据：
+- TrendRollups 在某一数据版本上按 (产品, 时间桶) 预聚合 总价 / 条数 / 最低价 / 最高价，
+  列式数据按 (产品, 日期) 有序，每个桶是一段连续行，用 reduceat 一次完成
+- 查询时只取相关产品的预聚合行，再按 (分类或产品名, 时间桶) 合并，
+  耗时与时间桶数相关，与原始报价条数无关
+- 每条序列超过 max_points 个点时按 Largest-Triangle-Three-Buckets（LTTB）降采样，
+  保留首尾点与形状上的峰谷
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.pricing.columns import PriceColumns, date_to_day, day_to_date, days_to_months, expand_ranges
+
+BUCKETS = ("week", "month", "quarter")
+
+GROUP_BY = ("category", "product")
+
+# 1970-01-01 为周四，第 4 天（1970-01-05）为周一，周桶以周一为起点
+_MONDAY_OFFSET = 4
+
+
+def bucket_keys(days: np.ndarray, bucket: str) -> np.ndarray:
+    """天数 -> 时间桶序号"""
+    days = np.asarray(days, dtype=np.int64)
+    if bucket == "week":
+        return (days - _MONDAY_OFFSET) // 7
+    months = days_to_months(days).astype(np.int64)
+    if bucket == "month":
+        return months
+    if bucket == "quarter":
+        return months // 3
+    raise ValueError(f"不支持的时间粒度: {bucket}，可选 {', '.join(BUCKETS)}")
+
+
+def bucket_label(key: int, bucket: str) -> str:
+    """时间桶序号 -> 标签（周为周一日期，月为 YYYY-MM，季度为 YYYY-Qn）"""
+    if bucket == "week":
+        return day_to_date(key * 7 + _MONDAY_OFFSET)
+    if bucket == "month":
+        return f"{key // 12:04d}-{key % 12 + 1:02d}"
+    return f"{key // 4:04d}-Q{key % 4 + 1}"
+
+
+def lttb(x: Sequence[float], y: Sequence[float], threshold: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets 降采样
+
+    逐桶选点依赖上一桶的选择，无法整体向量化；每桶只有少量点，
+    直接在 Python 列表上计算比逐桶调用 NumPy 更快。
+
+    Returns:
+        保留点的下标（升序，含首尾点）
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    x = [float(v) for v in x]
+    y = [float(v) for v in y]
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        # 下一个桶的均值点作为三角形的第三个顶点
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(x[end:next_end]) / (next_end - end)
+        avg_y = sum(y[end:next_end]) / (next_end - end)
+
+        ax, ay = x[a], y[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (y[j] - ay) - (ax - x[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        a = best
+        selected.append(a)
+    selected.append(n - 1)
+    return selected
+
+
+class BucketRollup:
+    """单一粒度的 (产品, 时间桶) 预聚合，按产品、时间桶有序"""
+
+    def __init__(self, columns: PriceColumns, bucket: str):
+        self.bucket = bucket
+        n = len(columns)
+        keys = bucket_keys(columns.day, bucket)
+        boundary = np.ones(n, dtype=bool)
+        if n:
+            boundary[1:] = (columns.product_id[1:] != columns.product_id[:-1]) | (keys[1:] != keys[:-1])
+        starts = np.flatnonzero(boundary)
+
+        self.product_id = columns.product_id[starts]
+        self.key = keys[starts]
+        if n:
+            self.total = np.add.reduceat(columns.price, starts)
+            self.min_price = np.minimum.reduceat(columns.price, starts)
+            self.max_price = np.maximum.reduceat(columns.price, starts)
+        else:
+            self.total = self.min_price = self.max_price = np.zeros(0)
+        self.count = np.diff(np.append(starts, n))
+
+        self.offsets = np.zeros(columns.n_products + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.product_id, minlength=columns.n_products), out=self.offsets[1:])
+
+    def __len__(self) -> int:
+        return len(self.key)
+
+
+class TrendRollups:
+    """某一数据版本的分桶预聚合（各粒度首次查询时构建）"""
+
+    def __init__(self, columns: PriceColumns, version: int = 0):
+        self.columns = columns
+        self.version = version
+        self._rollups: Dict[str, BucketRollup] = {}
+
+        # 产品名分组：同名产品（分属不同分类）合并为一条序列
+        name_ids: Dict[str, int] = {}
+        self._name_group = np.array(
+            [name_ids.setdefault(p["name"], len(name_ids)) for p in columns.products], dtype=np.int64
+        )
+        self._names = list(name_ids)
+
+    def rollup(self, bucket: str) -> BucketRollup:
+        rollup = self._rollups.get(bucket)
+        if rollup is None:
+            if bucket not in BUCKETS:
+                raise ValueError(f"不支持的时间粒度: {bucket}，可选 {', '.join(BUCKETS)}")
+            rollup = self._rollups[bucket] = BucketRollup(self.columns, bucket)
+        return rollup
+
+    def series(self, product_ids: Sequence[int], bucket: str = "month", group_by: str = "category",
+               start: Optional[str] = None, end: Optional[str] = None,
+               max_points: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        分桶趋势序列
+
+        Args:
+            product_ids: 参与统计的产品
+            bucket: 时间粒度 week / month / quarter
+            group_by: 按分类（category）或产品名（product）分序列
+            start, end: 时间范围（'YYYY-MM' 或 'YYYY-MM-DD'，含首尾所在的整个时间桶）
+            max_points: 每条序列的最大点数，超过时 LTTB 降采样
+
+        Returns:
+            [{name, total_points, points: [{date, avg, min, max, count}]}]
+        """
+        if group_by not in GROUP_BY:
+            raise ValueError(f"不支持的分组方式: {group_by}，可选 {', '.join(GROUP_BY)}")
+        rollup = self.rollup(bucket)
+        rows = expand_ranges(rollup.offsets, product_ids)
+
+        keys = rollup.key[rows]
+        mask = np.ones(len(rows), dtype=bool)
+        if start:
+            mask &= keys >= bucket_keys([date_to_day(start)], bucket)[0]
+        if end:
+            mask &= keys <= bucket_keys([date_to_day(end)], bucket)[0]
+        rows, keys = rows[mask], keys[mask]
+        if len(rows) == 0:
+            return []
+
+        products = rollup.product_id[rows]
+        if group_by == "category":
+            groups = self.columns.product_category[products].astype(np.int64)
+            names = self.columns.categories
+        else:
+            groups = self._name_group[products]
+            names = self._names
+
+        # 按 (分组, 时间桶) 排序后各单元为连续段，用 reduceat 合并
+        key_min = int(keys.min())
+        span = int(keys.max()) - key_min + 1
+        combined = groups * span + (keys - key_min)
+        order = np.argsort(combined, kind="stable")
+        rows, combined = rows[order], combined[order]
+        starts = np.flatnonzero(np.append(True, combined[1:] != combined[:-1]))
+        cells = combined[starts]
+        totals = np.add.reduceat(rollup.total[rows], starts)
+        counts = np.add.reduceat(rollup.count[rows], starts)
+        mins = np.minimum.reduceat(rollup.min_price[rows], starts)
+        maxs = np.maximum.reduceat(rollup.max_price[rows], starts)
+
+        cell_groups = cells // span
+        cell_keys = cells % span + key_min
+        means = totals / counts
+        # 同一分组的时间桶连续且升序
+        bounds = np.flatnonzero(np.diff(cell_groups)) + 1
+        series = []
+        for lo, hi in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(cells)]))):
+            idx = np.arange(lo, hi)
+            if max_points and hi - lo > max_points:
+                idx = idx[lttb(cell_keys[lo:hi].tolist(), means[lo:hi].tolist(), max_points)]
+            series.append({
+                "name": names[int(cell_groups[lo])],
+                "total_points": int(hi - lo),
+                "points": [
+                    {"date": bucket_label(key, bucket), "avg": round(avg, 2), "min": low, "max": high,
+                     "count": int(count)}
+                    for key, avg, low, high, count in zip(cell_keys[idx].tolist(), means[idx].tolist(),
+                                                          mins[idx].tolist(), maxs[idx].tolist(),
+                                                          counts[idx].tolist())
+                ],
+            })
+        return series
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+# 批量报价单次请求最多处理的明细行数
+MAX_QUOTE_LINES = 10000
+
+
+class SimilarConfigRequest(BaseModel):
+    text: Optional[str] = None
+    features: Optional[Dict[str, float]] = None
+    category: Optional[str] = None
+    top_k: int = Field(5, ge=1, le=50)
+
+
+class QuoteLine(BaseModel):
+    product_name: str = Field(..., min_length=1)
+    quoted_price: float = Field(..., ge=0)
+    quantity: float = Field(1, gt=0)
+    supplier: Optional[str] = None
+    line_id: Optional[str] = None
+
+
+class BulkQuoteRequest(BaseModel):
+    items: List[QuoteLine] = Field(..., min_length=1, max_length=MAX_QUOTE_LINES)
@@ -3,19 +3,18 @@ from typing import Any, Dict, Optional
 
 from sqlalchemy.orm import Session
 
-from app.agents.contract_analyzer import ContractAnalyzer
-from app.agents.price_reference import PriceReference
-from app.agents.requirement_reviewer import RequirementReviewer
+from app.agents.registry import AgentRegistry, agent_registry
 from app.models.analysis_history import AnalysisHistory
 
 
 class AnalysisWorkflowService:
     """Orchestrates requirement/price/contract analysis and produces evidence-backed output."""
 
-    def __init__(self):
-        self.requirement_reviewer = RequirementReviewer()
-        self.price_reference = PriceReference()
-        self.contract_analyzer = ContractAnalyzer()
+    def __init__(self, registry: Optional[AgentRegistry] = None):
+        registry = registry or agent_registry
+        self.requirement_reviewer = registry.proxy("requirement_reviewer")
+        self.price_reference = registry.proxy("price_reference")
+        self.contract_analyzer = registry.proxy("contract_analyzer")
 
     def run_workflow(
         self,
@@ -0,0 +1,94 @@
+"""
+嵌入模型推理后端基准：比较 torch / onnx / onnx int8 的加载耗时、编码吞吐与向量一致性
+
+文本取自 data/knowledge 的分块（不足时循环复用），一致性为各后端向量与第一个成功加载的后端
+（默认 torch）向量的平均余弦相似度。
+ONNX 模型需先通过 scripts/export_onnx_model.py 导出；未安装依赖或未导出的后端会被跳过。
+
+用法（在 backend 目录下）:
+    python scripts/bench_encoder.py --texts 512 --batch-size 32 --threads 4
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.knowledge.chunking import chunk_markdown  # noqa: E402
+from app.knowledge.encoders import OnnxEncoder, onnx_model_dir  # noqa: E402
+from app.knowledge.knowledge_base import KnowledgeBase  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def sample_texts(count: int):
+    chunks = []
+    for path in sorted(glob.glob(os.path.join(BACKEND_DIR, "data", "knowledge", "*.md"))):
+        with open(path, "r", encoding="utf-8") as f:
+            chunks.extend(chunk["content"] for chunk in chunk_markdown(f.read()))
+    chunks = chunks or ["服务器采购需关注 CPU、内存、存储与电源冗余。"]
+    # 附加序号避免完全重复的文本
+    return [f"{chunks[i % len(chunks)]}（{i}）" for i in range(count)]
+
+
+def load(backend: str, model_name: str, threads: int):
+    if backend == "torch":
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads > 0:
+            torch.set_num_threads(threads)
+        return SentenceTransformer(model_name, device="cpu")
+    return OnnxEncoder(str(onnx_model_dir(model_name)), quantized=backend == "onnx-int8", threads=threads)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="嵌入推理后端基准")
+    parser.add_argument("--model", default=KnowledgeBase.DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--texts", type=int, default=512, help="编码文本数")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="推理线程数，0 为默认")
+    args = parser.parse_args(argv)
+
+    texts = sample_texts(args.texts)
+    print(f"模型 {args.model}，文本 {len(texts)} 条，batch_size={args.batch_size}，threads={args.threads or '默认'}")
+
+    rows, reference = [], None
+    for backend in args.backends:
+        try:
+            start = time.perf_counter()
+            model = load(backend, args.model, args.threads)
+            load_time = time.perf_counter() - start
+        except Exception as e:
+            print(f"跳过 {backend}: {e}")
+            continue
+
+        model.encode(texts[:args.batch_size], batch_size=args.batch_size)  # 预热
+        start = time.perf_counter()
+        vectors = np.asarray(model.encode(texts, batch_size=args.batch_size), dtype=np.float32)
+        encode_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for text in texts[:64]:
+            model.encode([text])
+        single_ms = (time.perf_counter() - start) / min(64, len(texts)) * 1000
+
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        if reference is None:
+            reference = vectors
+        agreement = float(np.mean(np.sum(vectors * reference, axis=1)))
+        rows.append((backend, load_time, len(texts) / encode_time, single_ms, agreement))
+
+    print(f"{'后端':<12}{'加载(s)':>10}{'批量(条/s)':>14}{'单条(ms)':>12}{'余弦一致性':>12}")
+    for backend, load_time, throughput, single_ms, agreement in rows:
+        print(f"{backend:<12}{load_time:>10.2f}{throughput:>14.1f}{single_ms:>12.2f}{agreement:>12.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
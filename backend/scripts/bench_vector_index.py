@@ -0,0 +1,130 @@
+"""
+知识库向量索引基准：比较 flat / ivf / hnsw / int8 / pq 的构建耗时、索引内存、查询延迟与召回率
+
+召回率以 FlatIndex 的精确结果为基准（recall@k）。向量为带簇结构的随机数据，
+模拟真实语料中主题聚集的分布。量化索引的重排向量直接从内存数组读取（实际运行时来自嵌入存储的内存映射）。
+
+用法（在 backend 目录下）:
+    python scripts/bench_vector_index.py --n 100000 --dim 512 --queries 200
+    python scripts/bench_vector_index.py --nprobe 4 8 16 32
+    python scripts/bench_vector_index.py --pq-m 64 128 --rerank-factor 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.knowledge.vector_index import (  # noqa: E402
+    FlatIndex, HNSWIndex, IVFIndex, ProductQuantizedIndex, ScalarQuantizedIndex,
+)
+
+
+def make_corpus(n: int, dim: int, topics: int, spread: float = 1.5, seed: int = 0) -> np.ndarray:
+    """主题中心 + 高斯噪声；spread 越大主题间重叠越多，近似检索越难"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, n)
+    return centers[labels] + spread * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    """在语料点附近扰动生成查询"""
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.choice(len(vectors), count, replace=False)]
+    return picked + rng.standard_normal(picked.shape).astype(np.float32)
+
+
+def run(index, queries: np.ndarray, truth, top_k: int, **search_kwargs):
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = index.search(query, top_k, **search_kwargs)
+        latencies.append(time.perf_counter() - start)
+        hits += len({i for i, _ in result} & expected)
+    latencies = np.array(latencies) * 1000
+    return {
+        "recall": hits / (len(queries) * top_k),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "qps": len(queries) / (latencies.sum() / 1000),
+    }
+
+
+def build(index, vectors: np.ndarray) -> float:
+    start = time.perf_counter()
+    index.add(vectors)
+    return time.perf_counter() - start
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="知识库向量索引基准")
+    parser.add_argument("--n", type=int, default=100000, help="向量数")
+    parser.add_argument("--dim", type=int, default=512, help="向量维度（bge-small-zh 为 512）")
+    parser.add_argument("--topics", type=int, default=500, help="数据中的主题簇数")
+    parser.add_argument("--spread", type=float, default=1.5, help="主题内噪声强度")
+    parser.add_argument("--queries", type=int, default=200, help="查询数")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None, help="IVF 簇数，默认 2 × sqrt(n)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32], help="IVF 扫描簇数")
+    parser.add_argument("--ef", type=int, nargs="+", default=[32, 64, 128], help="HNSW ef_search")
+    parser.add_argument("--pq-m", type=int, nargs="+", default=[None], help="乘积量化段数，默认维度 / 4")
+    parser.add_argument("--rerank-factor", type=int, default=4, help="量化索引重排候选倍数")
+    args = parser.parse_args(argv)
+
+    vectors = make_corpus(args.n, args.dim, args.topics, args.spread)
+    queries = make_queries(vectors, args.queries)
+    print(f"语料 {args.n} × {args.dim}，查询 {args.queries} 条，top_k={args.top_k}")
+
+    flat = FlatIndex(args.dim)
+    flat_build = build(flat, vectors)
+    truth = [{i for i, _ in flat.search(q, args.top_k)} for q in queries]
+
+    rows = [("flat", flat_build, flat.nbytes, run(flat, queries, truth, args.top_k))]
+
+    ivf = IVFIndex(args.dim, nlist=args.nlist)
+    ivf_build = build(ivf, vectors)
+    for nprobe in args.nprobe:
+        rows.append((f"ivf nlist={len(ivf.centroids)} nprobe={nprobe}", ivf_build, ivf.nbytes,
+                     run(ivf, queries, truth, args.top_k, nprobe=nprobe)))
+
+    originals = flat.vectors
+
+    def rerank(ids):
+        return originals[ids]
+
+    quantized = [("int8", ScalarQuantizedIndex(args.dim, reranker=rerank, rerank_factor=args.rerank_factor))]
+    for m in args.pq_m:
+        index = ProductQuantizedIndex(args.dim, m=m, reranker=rerank, rerank_factor=args.rerank_factor)
+        quantized.append((f"pq m={index.m}", index))
+    for name, index in quantized:
+        build_time = build(index, vectors)
+        rows.append((f"{name} rerank×{args.rerank_factor}", build_time, index.nbytes,
+                     run(index, queries, truth, args.top_k)))
+        index.reranker = None
+        rows.append((f"{name} 无重排", build_time, index.nbytes, run(index, queries, truth, args.top_k)))
+
+    try:
+        hnsw = HNSWIndex(args.dim)
+    except RuntimeError as e:
+        print(f"跳过 HNSW: {e}")
+    else:
+        hnsw_build = build(hnsw, vectors)
+        for ef in args.ef:
+            hnsw.ef_search = ef
+            rows.append((f"hnsw ef={ef}", hnsw_build, None, run(hnsw, queries, truth, args.top_k)))
+
+    print(f"{'索引':<30}{'构建(s)':>10}{'内存(MB)':>10}{'recall':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'QPS':>10}")
+    for name, build_time, nbytes, stats in rows:
+        memory = f"{nbytes / 2 ** 20:.1f}" if nbytes is not None else "-"
+        print(f"{name:<30}{build_time:>10.2f}{memory:>10}{stats['recall']:>10.3f}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['qps']:>10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
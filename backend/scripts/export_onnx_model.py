@@ -0,0 +1,98 @@
+"""
+将 sentence-transformers 嵌入模型导出为 ONNX（可选 int8 动态量化），供 KNOWLEDGE_ENCODER_BACKEND=onnx 使用
+
+导出需要 sentence-transformers / torch（量化另需 onnxruntime）；运行时只需要 onnxruntime 与 tokenizers。
+
+用法（在 backend 目录下）:
+    python scripts/export_onnx_model.py --model BAAI/bge-small-zh-v1.5 --quantize
+输出目录默认为 KNOWLEDGE_ONNX_DIR（或 data/models）下按模型名命名的子目录。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.knowledge.encoders import (  # noqa: E402
+    MODEL_FILE, POOLING_FILE, QUANTIZED_MODEL_FILE, onnx_model_dir,
+)
+from app.knowledge.knowledge_base import KnowledgeBase  # noqa: E402
+
+
+def pooling_config(model) -> dict:
+    """从 SentenceTransformer 的模块中读取池化方式、是否归一化与最大长度"""
+    mode, normalize = "cls", False
+    for module in model:
+        name = type(module).__name__
+        if name == "Pooling":
+            mode = "mean" if module.get_pooling_mode_str() == "mean" else "cls"
+        elif name == "Normalize":
+            normalize = True
+    return {"mode": mode, "normalize": normalize, "max_length": int(model.max_seq_length)}
+
+
+def export(model_name: str, output_dir: str, quantize: bool, opset: int = 14):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model[0].tokenizer
+    os.makedirs(output_dir, exist_ok=True)
+
+    class _HiddenStates(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    sample = tokenizer(["采购需求示例", "服务器"], padding=True, return_tensors="pt")
+    if "token_type_ids" not in sample:
+        sample["token_type_ids"] = torch.zeros_like(sample["input_ids"])
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    model_path = os.path.join(output_dir, MODEL_FILE)
+    start = time.perf_counter()
+    with torch.no_grad():
+        torch.onnx.export(
+            _HiddenStates(transformer),
+            tuple(sample[name] for name in names),
+            model_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in names},
+                          "last_hidden_state": {0: "batch", 1: "sequence"}},
+            opset_version=opset,
+        )
+    print(f"已导出 {model_path}（{time.perf_counter() - start:.1f}s）")
+
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, "tokenizer.json"))
+    with open(os.path.join(output_dir, POOLING_FILE), "w", encoding="utf-8") as f:
+        json.dump(pooling_config(model), f, ensure_ascii=False, indent=2)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = os.path.join(output_dir, QUANTIZED_MODEL_FILE)
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        print(f"已导出 int8 量化模型 {quantized_path}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="导出 ONNX 嵌入模型")
+    parser.add_argument("--model", default=KnowledgeBase.DEFAULT_EMBEDDING_MODEL, help="sentence-transformers 模型名")
+    parser.add_argument("--output", default=None, help="输出目录，默认 KNOWLEDGE_ONNX_DIR/<模型名>")
+    parser.add_argument("--quantize", action="store_true", help="同时导出 int8 动态量化模型")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args(argv)
+
+    export(args.model, args.output or str(onnx_model_dir(args.model)), args.quantize, args.opset)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from langchain.schema import AIMessage, HumanMessage
+
+from app.agents.chat_agent import ChatAgent
+from app.agents.chat_context import ChatContextPacker, ContextState
+
+
+def conversation(turns):
+    history = []
+    for i in range(turns):
+        history.append(HumanMessage(content=f"第{i}个问题：服务器采购需要注意哪些配置参数和交付要求"))
+        history.append(AIMessage(content=f"第{i}个回答：" + "建议明确CPU型号、内存容量、存储类型与质保年限。" * 3))
+    return history
+
+
+def test_pack_keeps_budget_summarizes_old_turns_and_reuses_prefix():
+    packer = ChatContextPacker(context_tokens=400, knowledge_tokens=0, summary_tokens=120)
+    state = ContextState()
+    history = conversation(2) + [HumanMessage(content="最后一个问题")]
+
+    messages = packer.pack(state, "系统提示", history)
+    assert [m["role"] for m in messages] == ["system", "user", "assistant", "user", "assistant", "user"]
+    assert state.rebuilds == 1
+
+    # 后续轮次只追加新消息，前缀不重建
+    for i in range(12):
+        history[-1:] = [HumanMessage(content=f"追问{i}"), AIMessage(content=f"答复{i}"), HumanMessage(content="最后一个问题")]
+        messages = packer.pack(state, "系统提示", history)
+        assert packer.estimate_tokens(messages) <= 400
+        assert len(state.token_counts) == len(history)
+        assert messages[-1] == {"role": "user", "content": "最后一个问题"}
+    # 超出预算后早期轮次并入摘要，窗口一次移出多条，重建次数远少于轮次
+    assert state.start > 0
+    assert 1 < state.rebuilds <= 4
+    assert messages[1]["role"] == "system" and messages[1]["content"].startswith("此前对话要点")
+    assert state.summary_tokens <= 120
+    assert history[state.start].content in [m["content"] for m in messages]
+
+
+def test_retrieved_knowledge_is_budgeted_and_placed_before_current_message():
+    documents = [
+        {"id": "a-0", "section": "服务器 > 选型", "content": "机架式服务器适合机房。" * 5, "score": 0.9},
+        {"id": "b-0", "section": "合同", "content": "注意免责条款。" * 200, "score": 0.5},
+    ]
+    queries = []
+    packer = ChatContextPacker(retriever=lambda q, k: queries.append((q, k)) or documents,
+                               context_tokens=2000, knowledge_tokens=200, knowledge_top_k=2)
+
+    knowledge = packer.retrieve("服务器怎么选")
+    assert queries == [("服务器怎么选", 2)]
+    assert [s["id"] for s in knowledge["sources"]] == ["a-0"]
+    assert "[1] 服务器 > 选型" in knowledge["content"] and "免责" not in knowledge["content"]
+
+    messages = packer.pack(ContextState(), "系统提示", conversation(1) + [HumanMessage(content="服务器怎么选")], knowledge)
+    assert messages[-2] == {"role": "system", "content": knowledge["content"]}
+    assert messages[-1]["content"] == "服务器怎么选"
+
+    # 检索失败时不影响对话
+    failing = ChatContextPacker(retriever=lambda q, k: 1 / 0, knowledge_tokens=200)
+    assert failing.retrieve("服务器")["content"] == ""
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs["messages"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="好的"))])
+
+
+def test_chat_agent_sends_packed_context_and_returns_sources(monkeypatch):
+    agent = ChatAgent()
+    completions = FakeCompletions()
+    agent.llm_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(agent, "_search_knowledge",
+                        lambda q, k: [{"id": "a-0", "section": "服务器", "content": "机架式服务器适合机房。", "score": 1.0}])
+    agent.context_packer.retriever = agent._search_knowledge
+
+    result = agent.chat("服务器怎么选", "s1")
+    assert result["response"] == "好的"
+    assert result["sources"] == [{"id": "a-0", "section": "服务器", "score": 1.0}]
+    assert "机架式服务器" in completions.calls[0][-2]["content"]
+
+    agent.chat("预算多少", "s1")
+    assert [m["role"] for m in completions.calls[1]] == ["system", "user", "assistant", "system", "user"]
+
+    agent.clear_session("s1")
+    assert agent.sessions["s1"]["context"].token_counts == []
+
+
+class SlowCompletions(FakeCompletions):
+    def create(self, **kwargs):
+        time.sleep(0.01)
+        return super().create(**kwargs)
+
+
+def test_concurrent_requests_in_one_session_keep_history_paired():
+    agent = ChatAgent()
+    agent.llm_client = SimpleNamespace(chat=SimpleNamespace(completions=SlowCompletions()))
+    agent.context_packer.retriever = None
+
+    threads = [threading.Thread(target=agent.chat, args=(f"问题{i}", "shared")) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    history = agent.get_history("shared")
+    assert len(history) == 16
+    assert [m["role"] for m in history] == ["user", "assistant"] * 8
+    assert len(agent.sessions["shared"]["context"].token_counts) == 15
@@ -0,0 +1,126 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.agents.chat_agent import ChatAgent
+
+
+def chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class FakeStream:
+    def __init__(self, contents, fail_after=None):
+        self.contents = contents
+        self.fail_after = fail_after
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for i, content in enumerate(self.contents):
+            if i == self.fail_after:
+                raise ConnectionError("stream reset")
+            yield chunk(content)
+
+
+class FakeAsyncCompletions:
+    def __init__(self, stream=None, error=None):
+        self.stream = stream
+        self.error = error
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.error:
+            raise self.error
+        return self.stream
+
+
+def make_agent(completions):
+    agent = ChatAgent()
+    agent.async_llm_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    agent.context_packer.retriever = None
+    return agent
+
+
+def collect(agent, message, session_id="s1"):
+    async def run():
+        return [event async for event in agent.chat_stream(message, session_id)]
+    return asyncio.run(run())
+
+
+def test_stream_forwards_llm_chunks_and_records_history():
+    completions = FakeAsyncCompletions(FakeStream(["建议", "", "先明确预算"]))
+    agent = make_agent(completions)
+
+    events = collect(agent, "服务器怎么选")
+    assert [e["event"] for e in events] == ["start", "delta", "delta", "done"]
+    assert events[-1]["response"] == "建议先明确预算" and events[-1]["fallback"] is False
+    assert completions.calls[0]["stream"] is True
+    assert completions.calls[0]["messages"][-1] == {"role": "user", "content": "服务器怎么选"}
+    assert agent.get_history("s1") == [
+        {"role": "user", "content": "服务器怎么选"},
+        {"role": "assistant", "content": "建议先明确预算"},
+    ]
+
+
+def test_stream_falls_back_to_keyword_response():
+    agent = make_agent(FakeAsyncCompletions(error=TimeoutError("timeout")))
+
+    events = collect(agent, "你好")
+    assert events[-1]["fallback"] is True
+    deltas = "".join(e["content"] for e in events if e["event"] == "delta")
+    assert deltas == events[-1]["response"] == agent.keyword_responses["greetings"]["response"]
+    assert len([e for e in events if e["event"] == "delta"]) > 1
+
+    # 输出部分内容后中断：保留已生成部分，不再降级
+    agent = make_agent(FakeAsyncCompletions(FakeStream(["第一段", "第二段"], fail_after=1)))
+    events = collect(agent, "你好", "s2")
+    assert events[-1]["response"] == "第一段" and events[-1]["fallback"] is False
+
+
+def test_stream_cancelled_before_output_keeps_history_paired():
+    agent = make_agent(FakeAsyncCompletions(FakeStream(["不会到达"])))
+
+    async def run():
+        stream = agent.chat_stream("你好", "s3")
+        assert (await stream.__anext__())["event"] == "start"
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert agent.get_history("s3") == []
+
+
+class PendingCompletions:
+    """请求发出后一直等待，用于模拟首个分片到达前客户端断开"""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+
+    async def create(self, **kwargs):
+        self.started.set()
+        await asyncio.Event().wait()
+
+
+def test_stream_cancelled_after_packing_drops_stale_token_counts():
+    completions = PendingCompletions()
+    agent = make_agent(completions)
+    context = agent.sessions[agent.get_or_create_session("s4")]["context"]
+
+    async def run():
+        stream = agent.chat_stream("第一个很长的问题：" + "服务器配置" * 20, "s4")
+        await stream.__anext__()
+        task = asyncio.ensure_future(stream.__anext__())
+        await completions.started.wait()
+        assert len(context.token_counts) == 1
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert agent.get_history("s4") == [] and context.token_counts == []
+
+    # 撤回后的下一轮按新消息重新计数
+    agent.async_llm_client = make_agent(FakeAsyncCompletions(FakeStream(["好的"]))).async_llm_client
+    events = collect(agent, "短问题", "s4")
+    assert events[-1]["response"] == "好的"
+    assert context.token_counts[0] == agent.context_packer.estimate_tokens([{"content": "短问题"}])
@@ -0,0 +1,99 @@
+import pytest
+
+from app.agents.registry import AgentRegistry
+
+
+class ClosableAgent:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_registry_constructs_lazily_and_shares_instance():
+    calls = []
+    registry = AgentRegistry()
+    registry.register("dummy", lambda: calls.append(1) or ClosableAgent())
+
+    proxy = registry.proxy("dummy")
+    assert calls == []
+    assert registry.is_loaded("dummy") is False
+
+    assert proxy.closed is False
+    assert registry.get("dummy") is registry.get("dummy")
+    assert len(calls) == 1
+
+
+def test_optional_factory_failure_returns_none():
+    registry = AgentRegistry()
+
+    def broken():
+        raise RuntimeError("model missing")
+
+    registry.register("kb", broken, optional=True)
+    assert registry.get("kb") is None
+    assert not registry.proxy("kb")
+
+    registry.register("strict", broken)
+    with pytest.raises(RuntimeError):
+        registry.get("strict")
+
+
+def test_shutdown_closes_instances_and_startup_preloads():
+    registry = AgentRegistry()
+    registry.register("dummy", ClosableAgent)
+
+    registry.startup(preload=["dummy"])
+    instance = registry.get("dummy")
+    assert registry.started is True
+
+    registry.shutdown()
+    assert instance.closed is True
+    assert registry.is_loaded("dummy") is False
+    assert registry.get("dummy") is not instance
+
+
+def test_readiness_waits_for_warmup_and_component_is_ready():
+    class WarmingAgent:
+        ready = False
+
+        def is_ready(self):
+            return self.ready
+
+    registry = AgentRegistry()
+    registry.register("kb", WarmingAgent)
+    registry.register("plain", ClosableAgent)
+    assert registry.readiness()["ready"] is False
+
+    registry.startup(preload=[], warmup=["kb", "plain"])
+    registry._warmup_thread.join()
+    readiness = registry.readiness()
+    assert readiness["pending"] == [] and readiness["components"] == {"kb": False}
+    assert readiness["ready"] is False
+
+    registry.get("kb").ready = True
+    assert registry.readiness()["ready"] is True
+
+
+def test_failed_warmup_is_reported_not_pending_and_retried_on_use():
+    registry = AgentRegistry()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+        return object()
+
+    registry.register("price_reference", flaky)
+    registry.startup(preload=[], warmup=["price_reference"])
+    registry._warmup_thread.join()
+
+    readiness = registry.readiness()
+    assert readiness == {"ready": True, "pending": [], "components": {},
+                         "errors": {"price_reference": "database is locked"}}
+
+    # 首次使用时重试构造，成功后不再报告错误
+    assert registry.get("price_reference") is not None
+    assert registry.readiness()["errors"] == {}
@@ -1,3 +1,5 @@
+import json
+
 from fastapi.testclient import TestClient
 
 from app.api import chat as chat_api
@@ -33,3 +35,25 @@ def test_chat_conversation_rejects_empty_message():
     response = client.post("/api/chat/conversation", json={"message": ""})
     assert response.status_code == 400
     assert response.json()["detail"] == "消息不能为空"
+
+
+def test_chat_conversation_stream_sends_sse_events(monkeypatch):
+    async def fake_stream(message, session_id=None):
+        yield {"event": "start", "session_id": "s1"}
+        for content in ["服务器", "报价"]:
+            yield {"event": "delta", "content": content}
+        yield {"event": "done", "response": "服务器报价", "session_id": "s1", "sources": [], "fallback": False}
+
+    monkeypatch.setattr(chat_api.chat_agent, "chat_stream", fake_stream)
+
+    with client.stream("POST", "/api/chat/conversation/stream", json={"message": "服务器价格"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = [block.split("\n", 1) for block in body.strip().split("\n\n")]
+    assert [name for name, _ in events] == ["event: start", "event: delta", "event: delta", "event: done"]
+    done = json.loads(events[-1][1][len("data: "):])
+    assert done["response"] == "服务器报价" and done["suggested_actions"]
+
+    assert client.post("/api/chat/conversation/stream", json={"message": ""}).status_code == 400
@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+
+from app.agents.registry import agent_registry
+from app.main import app
+
+
+client = TestClient(app)
+
+
+def test_health_reports_readiness(monkeypatch):
+    monkeypatch.setattr(agent_registry, "readiness",
+                        lambda: {"ready": False, "pending": ["knowledge_base"], "components": {}, "errors": {}})
+    response = client.get("/api/health/ready")
+    assert response.status_code == 503
+    assert response.json()["warmup"]["pending"] == ["knowledge_base"]
+    health = client.get("/api/health")
+    assert health.status_code == 200 and health.json()["ready"] is False
+
+    monkeypatch.setattr(agent_registry, "readiness",
+                        lambda: {"ready": True, "pending": [], "components": {},
+                                 "errors": {"price_reference": "database is locked"}})
+    response = client.get("/api/health/ready")
+    assert response.status_code == 200
+    assert response.json()["warmup"]["errors"] == {"price_reference": "database is locked"}
@@ -19,3 +19,89 @@ def test_price_reference_success():
 def test_price_predict_returns_422_without_keyword():
     response = client.get("/api/price-reference/predict", params={"months": 3})
     assert response.status_code == 422
+
+
+def test_price_predict_cache_hits_are_reported():
+    before = client.get("/api/price-reference/cache-stats").json()["data"]
+
+    first = client.get("/api/price-reference/predict", params={"keyword": "服务器", "months": 2}).json()
+    second = client.get("/api/price-reference/predict", params={"keyword": "服务器", "months": 2}).json()
+    assert first["data"]["predictions"] == second["data"]["predictions"]
+
+    after = client.get("/api/price-reference/cache-stats").json()["data"]
+    assert after["hits"] >= before["hits"] + 1
+    assert 0 < after["hit_rate"] <= 1
+
+
+def test_price_match_returns_scored_candidates():
+    response = client.get("/api/price-reference/match", params={"q": "thinkpad x1", "top_k": 3})
+
+    assert response.status_code == 200
+    candidates = response.json()["data"]["candidates"]
+    assert candidates[0]["name"] == "联想 ThinkPad X1 Carbon Gen11"
+    assert candidates[0]["score"] >= candidates[-1]["score"]
+
+
+def test_price_similar_requires_text_or_features():
+    response = client.post("/api/price-reference/similar", json={"category": "服务器"})
+    assert response.status_code == 400
+
+    response = client.post("/api/price-reference/similar", json={"features": {"gpu_count": 2}, "top_k": 2})
+    assert response.status_code == 200
+    assert len(response.json()["data"]["matches"]) == 2
+
+
+def test_price_analyze_bulk_json_and_csv():
+    items = [
+        {"product_name": "Dell PowerEdge R750", "quoted_price": 70000, "quantity": 2, "supplier": "A"},
+        {"product_name": "R750服务器", "quoted_price": 65000, "supplier": "B"},
+        {"product_name": "不存在的设备XYZ", "quoted_price": 100},
+    ]
+    response = client.post("/api/price-reference/analyze/bulk", json={"items": items})
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["lines"][1]["matched_product"] == "Dell PowerEdge R750"
+    assert data["package"]["matched_lines"] == 2
+    assert set(data["suppliers"]) == {"A", "B"}
+
+    csv_content = "product_name,quoted_price,quantity,supplier\nDell PowerEdge R750,70000,2,A\n"
+    response = client.post("/api/price-reference/analyze/bulk/upload",
+                           files={"file": ("quotes.csv", csv_content.encode("utf-8"), "text/csv")})
+    assert response.status_code == 200
+    assert response.json()["data"]["package"]["quoted_total"] == 140000
+
+    response = client.post("/api/price-reference/analyze/bulk/upload",
+                           files={"file": ("quotes.csv", b"name\nA\n", "text/csv")})
+    assert response.status_code == 400
+    for row in ("Dell PowerEdge R750,nan", "Dell PowerEdge R750,100,-3"):
+        response = client.post("/api/price-reference/analyze/bulk/upload",
+                               files={"file": ("quotes.csv", f"name,price,qty\n{row}\n".encode("utf-8"), "text/csv")})
+        assert response.status_code == 400 and "第 2 行" in response.json()["detail"]
+    assert client.post("/api/price-reference/analyze/bulk", json={"items": []}).status_code == 422
+
+
+def test_price_trend_buckets_and_validation():
+    response = client.get("/api/price-reference/trend", params={"bucket": "quarter", "keyword": "服务器"})
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["series"][0]["name"] == "服务器"
+    assert [p["date"] for p in data["series"][0]["points"]] == ["2024-Q1", "2024-Q2"]
+
+    assert client.get("/api/price-reference/trend", params={"bucket": "year"}).status_code == 422
+    for params in ({"start": "2024-13"}, {"start": "2024"}, {"end": "2024-02-30"}, {"end": "abc"}, {"start": "2024-03-"}):
+        response = client.get("/api/price-reference/trend", params=params)
+        assert response.status_code == 400 and "日期格式无效" in response.json()["detail"]
+
+
+def test_price_export_streams_npz_snapshot():
+    import io
+
+    import numpy as np
+
+    response = client.get("/api/price-reference/export", params={"format": "npz", "category": "服务器"})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith('.npz"')
+    data = np.load(io.BytesIO(response.content))
+    assert set(data["categories"][data["category_id"]].tolist()) == {"服务器"}
+
+    assert client.get("/api/price-reference/export", params={"format": "xlsx"}).status_code == 400
@@ -0,0 +1,23 @@
+import os
+import stat
+
+import pytest
+
+from app.core.files import atomic_write
+
+
+def test_atomic_write_replaces_file_and_cleans_up_on_failure(tmp_path, monkeypatch):
+    path = tmp_path / "manifest.json"
+    atomic_write(path, b"old")
+    atomic_write(path, b"new")
+    assert path.read_bytes() == b"new"
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        atomic_write(path, b"broken")
+    assert path.read_bytes() == b"new"
+    assert os.listdir(tmp_path) == ["manifest.json"]
@@ -0,0 +1,32 @@
+import jieba
+
+from app.core import segmenter
+
+
+def test_vocabulary_includes_rule_keywords_and_catalog_terms():
+    vocabulary = segmenter.build_vocabulary(
+        catalog={"服务器": [{"name": "浪潮英信 NF5280M6", "specs": "2U机架式, 10×2.4TB SAS"}]}
+    )
+    assert "机架式" in vocabulary
+    assert "NVMe" in vocabulary
+    assert "浪潮英信" in vocabulary
+    assert "2U机架式" in vocabulary
+    # 规则文件中的字段关键词
+    assert "交付内容" in vocabulary
+    assert all(" " not in word for word in vocabulary)
+
+
+def test_prebuilt_cache_loads_domain_dictionary(tmp_path):
+    catalog = {"服务器": [{"name": "浪潮英信 NF5280M6", "specs": "2U机架式"}]}
+    manifest = segmenter.build_cache(cache_dir=tmp_path, catalog=catalog)
+    assert manifest["vocabulary_size"] > 0
+
+    tokenizer = jieba.Tokenizer()
+    assert segmenter._load_prebuilt(tokenizer, tmp_path) is True
+    assert tokenizer.initialized is True
+    assert "浪潮英信" in list(tokenizer.cut("采购浪潮英信服务器"))
+
+    # 词典变化后缓存视为过期
+    with open(tmp_path / segmenter.USER_DICT_FILE, "a", encoding="utf-8") as f:
+        f.write("新增词条 2000 nz\n")
+    assert segmenter._load_prebuilt(jieba.Tokenizer(), tmp_path) is False
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+from app.core.startup_profile import StartupProfiler, parse_importtime
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def test_parse_importtime_reads_self_and_cumulative():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   yaml.error\n"
+        "import time:      2500 |       2620 | yaml\n"
+    )
+    entries = parse_importtime(stderr)
+    assert [e["module"] for e in entries] == ["yaml.error", "yaml"]
+    assert entries[1]["cumulative_ms"] == 2.62
+    assert entries[0]["depth"] == 1
+
+
+def test_profiler_records_phases():
+    profiler = StartupProfiler()
+    with profiler.phase("import_routers"):
+        pass
+    report = profiler.report()
+    assert report["phases"][0]["phase"] == "import_routers"
+    assert report["total_ms"] >= 0
+
+
+def test_importing_app_defers_heavy_dependencies():
+    code = (
+        "import sys, app.main; "
+        "print(','.join(m for m in ('jieba', 'docx', 'langchain', 'openai') if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == ""
@@ -0,0 +1,55 @@
+from app.knowledge.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from app.knowledge.knowledge_base import KnowledgeBase
+
+
+def test_tokenize_drops_punctuation_and_stopwords():
+    tokens = tokenize("服务器的选型，需关注 CPU 与 内存！")
+    assert "服务器" in tokens and "cpu" in tokens
+    assert "的" not in tokens and "，" not in tokens and "！" not in tokens
+
+
+def test_bm25_ranks_by_term_weight_and_length():
+    index = BM25Index()
+    index.add("服务器 选型 需要 关注 CPU 内存 存储")
+    index.add("笔记本 采购 关注 续航 重量")
+    index.add("服务器 服务器 服务器 机房 部署")
+    index.add("合同 条款 风险 关注")
+
+    results = index.search("服务器 机房", top_k=3)
+    assert [doc_id for doc_id, _ in results] == [2, 0]
+    # 常见词 "关注" 权重低于稀有词
+    assert index.search("关注 续航")[0][0] == 1
+    assert index.search("不存在的词汇xyz") == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+    assert [doc_id for doc_id, _ in fused][:2] == [1, 3]
+    assert {doc_id for doc_id, _ in fused} == {1, 2, 3, 4}
+
+
+def test_knowledge_base_keyword_fallback_uses_bm25(monkeypatch):
+    kb = KnowledgeBase()
+    monkeypatch.setattr(kb, "_load_model", lambda: False)
+    results = kb.search("合同 风险条款", top_k=2)
+    assert results and "条款" in results[0]["content"]
+    assert kb.query("完全无关的量子纠缠xyz") == "未找到相关知识，建议尝试其他查询方式。"
+
+
+def test_hybrid_search_fuses_vector_and_keyword_rankings(tmp_path):
+    import numpy as np
+
+    class ConstantModel:
+        """所有文本编码为同一向量：向量检索无区分度，排序由 BM25 决定"""
+
+        def encode(self, texts, show_progress_bar=False):
+            return np.ones((len(texts), 4), dtype=np.float32)
+
+    kb = KnowledgeBase(embedding_model="constant", embedding_dir=str(tmp_path))
+    kb.model = ConstantModel()
+    kb._model_loaded = True
+
+    results = kb.search("合同 风险条款", top_k=2)
+    assert len(results) == 2
+    assert "条款" in results[0]["content"]
+    assert results[0]["score"] > 0
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+
+from app.knowledge.chunking import chunk_markdown, count_tokens
+from app.knowledge.knowledge_base import KnowledgeBase
+from app.knowledge.sources import KnowledgeFiles
+
+
+def test_chunks_carry_heading_paths_and_skip_fenced_headings():
+    content = "# 指南\n\n## 服务器\n机架式适合机房。\n\n```\n# 不是标题\n```\n\n### 配置\nCPU 与内存。\n\n## 存储\nSSD 与 HDD。"
+    chunks = chunk_markdown(content, min_tokens=0)
+
+    assert [c["headings"] for c in chunks] == [["指南", "服务器"], ["指南", "服务器", "配置"], ["指南", "存储"]]
+    assert chunks[0]["content"].startswith("## 服务器\n")
+    assert "# 不是标题" in chunks[0]["content"]
+    assert chunks[2]["content"] == "## 存储\nSSD 与 HDD。"
+
+
+def test_short_sections_merge_into_neighbours():
+    long_body = "机架式服务器适合机房部署，需要关注散热与供电冗余。" * 3
+    content = f"# 指南\n本文介绍选型。\n\n## 服务器\n{long_body}\n\n## 存储\nSSD。\n\n## 网络\n万兆。"
+    chunks = chunk_markdown(content, min_tokens=20)
+
+    # 引言并入下一章节的首块，文末的短章节并入上一块，内容都不丢
+    assert len(chunks) == 1
+    assert chunks[0]["headings"] == ["指南", "服务器"]
+    assert chunks[0]["content"] == f"# 指南\n本文介绍选型。\n\n## 服务器\n{long_body}\n\n## 存储\nSSD。\n\n## 网络\n万兆。"
+    assert chunks[0]["tokens"] == count_tokens(long_body) + count_tokens("# 指南\n本文介绍选型。") \
+        + count_tokens("## 存储\nSSD。") + count_tokens("## 网络\n万兆。")
+
+    # 连续的短章节累计达到下限时单独成块，标题路径取公共前缀
+    short = "\n\n".join(f"## 条款{i}\n第{i}条注意事项。" for i in range(4))
+    chunks = chunk_markdown(f"# 合同\n\n{short}\n\n## 附录\n{long_body}", min_tokens=20)
+    assert [c["headings"] for c in chunks] == [["合同"], ["合同"], ["合同", "附录"]]
+    assert chunks[0]["content"] == "## 条款0\n第0条注意事项。\n\n## 条款1\n第1条注意事项。"
+    assert chunks[2]["content"] == f"## 附录\n{long_body}"
+
+
+def test_long_sections_split_within_budget_with_overlap():
+    sentences = [f"第{i}条要求说明。" for i in range(40)]
+    chunks = chunk_markdown("## 要求\n" + "".join(sentences), max_tokens=40, overlap_tokens=10)
+
+    assert len(chunks) > 1
+    assert all(c["tokens"] <= 40 for c in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        # 新块以上一块最后一句开头
+        last_sentence = previous["content"].rsplit("。", 2)[-2].split("\n")[-1] + "。"
+        assert current["content"].split("\n", 1)[1].startswith(last_sentence)
+    # 所有句子都被覆盖
+    joined = "".join(c["content"] for c in chunks)
+    assert all(s in joined for s in sentences)
+
+    # 无标点的超长文本按 token 硬切分
+    assert all(c["tokens"] <= 16 for c in chunk_markdown("字" * 100, max_tokens=16, overlap_tokens=0))
+    assert count_tokens("Dell R750 服务器") == 5
+
+
+class CountingModel:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, show_progress_bar=False, **kwargs):
+        self.encoded.extend(texts)
+        return np.array([[len(t), t.count("服"), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_refresh_only_rechunks_and_reembeds_changed_files(tmp_path):
+    knowledge_dir = tmp_path / "knowledge"
+    knowledge_dir.mkdir()
+    (knowledge_dir / "a.md").write_text("# A\n## 服务器\n机架式服务器适合机房部署。", encoding="utf-8")
+    (knowledge_dir / "b.md").write_text("# B\n## 合同\n注意免责条款。", encoding="utf-8")
+
+    def build():
+        kb = KnowledgeBase(embedding_model="counting", embedding_dir=str(tmp_path / "emb"),
+                           knowledge_dir=str(knowledge_dir))
+        kb.model = CountingModel()
+        kb._model_loaded = True
+        return kb
+
+    kb = build()
+    assert [d["section"] for d in kb.documents] == ["A > 服务器", "B > 合同"]
+    kb._generate_embeddings()
+    assert len(kb.model.encoded) == 2
+
+    # 重启：文件未变，清单命中，不再编码
+    kb = build()
+    assert kb.files.scan()["unchanged"] == ["a.md", "b.md"]
+    kb._generate_embeddings()
+    assert kb.model.encoded == []
+
+    # 修改 b、删除 a、新增 c：只有变化的分块被编码
+    (knowledge_dir / "b.md").write_text("# B\n## 合同\n注意免责条款和违约责任。", encoding="utf-8")
+    os.remove(knowledge_dir / "a.md")
+    (knowledge_dir / "c.txt").write_text("交付验收需要提供测试报告。", encoding="utf-8")
+    changes = kb.refresh()
+    assert changes["updated"] == ["b.md"] and changes["removed"] == ["a.md"] and changes["added"] == ["c.txt"]
+    assert [d["id"] for d in kb.documents] == ["b.md-0", "c.txt-0"]
+    assert kb.search("违约责任", top_k=1)[0]["id"] == "b.md-0"
+    assert len(kb.model.encoded) == 3  # 查询 + 两个新分块
+
+    # mtime 变化但内容不变时复用分块
+    os.utime(knowledge_dir / "c.txt", ns=(1, 1))
+    assert kb.refresh()["unchanged"] == ["b.md", "c.txt"]
+    assert KnowledgeFiles(str(knowledge_dir), str(tmp_path / "emb")).files["c.txt"]["mtime_ns"] == 1
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.knowledge.embedding_server import EmbeddingServer, RemoteEncoder
+from app.knowledge.query_encoder import QueryEncoder
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, show_progress_bar=False, **kwargs):
+        self.calls.append(list(texts))
+        if any(t == "boom" for t in texts):
+            raise ValueError("encode failed")
+        if any(t == "slow" for t in texts):
+            time.sleep(0.5)
+        return np.array([[len(t), sum(map(ord, t)) % 97, 1.0] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def server(tmp_path):
+    model = FakeModel()
+    server = EmbeddingServer(str(tmp_path / "emb.sock"), model, "fake@test", max_batch=64, max_wait_ms=20)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, model
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_remote_encoder_matches_local_model_and_batches_across_workers(server):
+    server, model = server
+    client = RemoteEncoder(server.server_address)
+    assert (client.model_id, client.dim) == ("fake@test", 3)
+
+    texts = [f"文档{i}" for i in range(300)]
+    assert np.array_equal(client.encode(texts), FakeModel().encode(texts))
+    assert client.encode("单条").shape == (3,)
+    assert client.encode([]).shape == (0, 3)
+
+    # 多个 worker（线程）并发的单条请求在服务端合并编码
+    model.calls.clear()
+    results = {}
+
+    def worker(i):
+        results[i] = RemoteEncoder(server.server_address).encode([f"查询{i}"])[0]
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 16
+    assert len(model.calls) < 16
+    assert client.info()["stats"]["batches"] >= 1
+
+
+def test_remote_encoder_reports_errors_and_reconnects(server, tmp_path):
+    server, _ = server
+    client = RemoteEncoder(server.server_address)
+    with pytest.raises(RuntimeError, match="encode failed"):
+        client.encode(["boom"])
+    # 错误不影响同一连接的后续请求
+    assert client.encode(["ok"]).shape == (1, 3)
+
+    client._connection().close()
+    assert client.encode(["again"]).shape == (1, 3)
+
+    with pytest.raises(RuntimeError):
+        EmbeddingServer(server.server_address, FakeModel(), "dup")
+    with pytest.raises(RuntimeError, match="无法连接"):
+        RemoteEncoder(str(tmp_path / "missing.sock"))
+
+
+def test_remote_encoder_does_not_resend_on_timeout(server):
+    server, model = server
+    client = RemoteEncoder(server.server_address, timeout=0.1)
+    model.calls.clear()
+    with pytest.raises(TimeoutError):
+        client.encode(["slow"])
+    time.sleep(0.6)
+    # 超时不重试：慢请求只提交一次
+    assert model.calls == [["slow"]]
+    # 超时后关闭连接，后续请求不会读到上一次的残留响应
+    assert np.array_equal(client.encode(["ok"]), FakeModel().encode(["ok"]))
+    assert client.info()["requests"] == 2
+
+
+def test_query_encoder_encode_many_uses_cache():
+    model = FakeModel()
+    encoder = QueryEncoder(model, cache_size=16, max_wait_ms=1)
+    first = encoder.encode_many(["a", "b", "a"])
+    assert first.shape == (3, 3) and np.array_equal(first[0], first[2])
+    encoder.encode_many(["a", "b"])
+    assert sum(len(c) for c in model.calls) == 2
+    encoder.close()
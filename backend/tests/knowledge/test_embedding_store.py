@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from app.knowledge.embedding_store import EmbeddingStore, content_hash
+from app.knowledge.knowledge_base import KnowledgeBase
+from app.knowledge.vector_index import ScalarQuantizedIndex
+
+
+class FakeModel:
+    """按字符编码的确定性假模型，记录被编码的文本"""
+
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.encoded = []
+
+    def encode(self, texts, show_progress_bar=False, **kwargs):
+        self.encoded.extend(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for ch in text:
+                vectors[i, ord(ch) % self.dim] += 1.0
+        return vectors
+
+
+def test_store_appends_and_reloads_across_instances(tmp_path):
+    store = EmbeddingStore("test/model", tmp_path, dtype="float16")
+    digests = [content_hash("a"), content_hash("b")]
+    assert store.append(digests, np.array([[1, 0], [0, 1]], dtype=np.float32)) == 2
+    # 已存在的哈希不重复写入
+    assert store.append([digests[0], content_hash("c")], np.array([[9, 9], [1, 1]])) == 1
+
+    other = EmbeddingStore("test/model", tmp_path, dtype="float16")
+    rows, missing = other.lookup([content_hash("c"), content_hash("x"), digests[0]])
+    assert rows.tolist() == [2, -1, 0]
+    assert missing == [1]
+    assert other.vectors(rows[[0, 2]]).tolist() == [[1, 1], [1, 0]]
+    assert other.vectors(rows).dtype == np.float32
+
+    # 其他实例追加后本实例自动重新映射
+    other.append([content_hash("d")], np.array([[2, 2]]))
+    assert store.lookup([content_hash("d")])[0].tolist() == [3]
+
+    # 不同模型、不同精度互不复用
+    assert len(EmbeddingStore("other-model", tmp_path)) == 0
+    assert len(EmbeddingStore("test/model", tmp_path, dtype="float32")) == 0
+    with pytest.raises(ValueError):
+        store.append([content_hash("e")], np.zeros((1, 3)))
+
+
+def test_mismatched_dtype_or_model_never_truncates_existing_store(tmp_path):
+    half = EmbeddingStore("test/model", tmp_path, dtype="float16")
+    half.append([content_hash("a"), content_hash("b")], np.array([[1, 0], [0, 1]], dtype=np.float32))
+    size = (half.path / "vectors.bin").stat().st_size
+
+    # 精度不同的 worker 写入自己的目录
+    full = EmbeddingStore("test/model", tmp_path, dtype="float32")
+    assert full.path != half.path
+    assert full.append([content_hash("c")], np.array([[1, 1]], dtype=np.float32)) == 1
+    assert (half.path / "vectors.bin").stat().st_size == size
+    assert half.lookup([content_hash("b")])[0].tolist() == [1]
+
+    # 模型名规范化后与已有目录重名：拒绝写入而不是截断
+    clash = EmbeddingStore("test--model", tmp_path, dtype="float16")
+    assert clash.path == half.path and len(clash) == 0
+    with pytest.raises(RuntimeError):
+        clash.append([content_hash("d")], np.array([[2, 2]], dtype=np.float32))
+    assert (half.path / "vectors.bin").stat().st_size == size
+    assert half.vectors(half.lookup([content_hash("a")])[0]).tolist() == [[1, 0]]
+
+
+def test_knowledge_base_reuses_persisted_embeddings(tmp_path):
+    def build():
+        kb = KnowledgeBase(embedding_model="fake", embedding_dir=str(tmp_path))
+        kb.model = FakeModel()
+        kb._model_loaded = True
+        return kb
+
+    first = build()
+    first._generate_embeddings()
+    assert len(first.model.encoded) == len(first.documents)
+
+    second = build()
+    second.add_document("新增文档：服务器采购需关注电源冗余与远程管理能力。" * 3, "test")
+    second.query("服务器 电源")
+    # 只为新增文档调用模型
+    assert [t for t in second.model.encoded if t != "服务器 电源"] == [second.documents[-1]["content"]]
+    assert len(second.vector_index) == len(second.documents)
+
+
+def test_knowledge_base_quantized_index_reranks_from_store(tmp_path, monkeypatch):
+    # 示例知识库条目不足以训练，这里让量化索引立即训练以覆盖重排路径
+    monkeypatch.setattr(ScalarQuantizedIndex, "min_train", 1)
+
+    def build(index_kind):
+        kb = KnowledgeBase(embedding_model="fake", embedding_dir=str(tmp_path), index_kind=index_kind)
+        kb.model = FakeModel()
+        kb._model_loaded = True
+        kb.hybrid = False
+        return kb
+
+    query = "服务器 机架式 选型"
+    quantized, flat = build("int8"), build("flat")
+    results = quantized.search(query, top_k=3)
+    assert quantized.vector_index.kind == "int8" and quantized.vector_index.is_trained
+    # 从嵌入存储取回原始向量重排后，结果与精确检索一致
+    assert results == flat.search(query, top_k=3)
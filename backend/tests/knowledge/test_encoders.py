@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from app.knowledge import knowledge_base as kb_module
+from app.knowledge.encoders import OnnxEncoder, onnx_model_dir, pool, resolve_backend
+from app.knowledge.knowledge_base import KnowledgeBase
+
+
+def test_pooling_matches_sentence_transformers_modes():
+    hidden = np.array([[[1.0, 0.0], [3.0, 4.0], [9.0, 9.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+
+    assert pool(hidden, mask, "cls", normalize=False).tolist() == [[1.0, 0.0]]
+    # padding 位置不参与平均
+    assert pool(hidden, mask, "mean", normalize=False).tolist() == [[2.0, 2.0]]
+    assert np.allclose(pool(hidden, mask, "mean"), [[2 ** -0.5, 2 ** -0.5]])
+    with pytest.raises(ValueError):
+        pool(hidden, mask, "max")
+
+
+def test_onnx_encoder_batches_by_length_and_restores_order():
+    encoder = OnnxEncoder.__new__(OnnxEncoder)
+    encoder.batch_size = 2
+    batches = []
+
+    def fake_run(texts):
+        batches.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+    encoder._run = fake_run
+    vectors = encoder.encode(["ccc", "a", "dddd", "bb"])
+    assert batches == [["a", "bb"], ["ccc", "dddd"]]
+    assert vectors[:, 0].tolist() == [3, 1, 4, 2]
+    assert encoder.encode("xy").tolist() == [2, 1]
+
+
+def test_backend_selection_and_model_dir(monkeypatch, tmp_path):
+    monkeypatch.delenv("KNOWLEDGE_ENCODER_BACKEND", raising=False)
+    assert resolve_backend() == "torch"
+    monkeypatch.setenv("KNOWLEDGE_ENCODER_BACKEND", "onnx")
+    assert resolve_backend() == "onnx"
+    with pytest.raises(ValueError):
+        resolve_backend("tensorrt")
+    assert onnx_model_dir("BAAI/bge-small-zh-v1.5", str(tmp_path)) == tmp_path / "BAAI--bge-small-zh-v1.5"
+
+    try:
+        import onnxruntime  # noqa: F401
+        import tokenizers  # noqa: F401
+    except ImportError:
+        with pytest.raises(RuntimeError):
+            OnnxEncoder(str(tmp_path))
+    else:
+        with pytest.raises(RuntimeError, match="未找到 ONNX 模型"):
+            OnnxEncoder(str(tmp_path))
+
+
+def test_knowledge_base_falls_back_from_onnx_to_torch(monkeypatch, tmp_path):
+    monkeypatch.setenv("KNOWLEDGE_ENCODER_BACKEND", "onnx")
+    attempts = []
+
+    def fake_load_encoder(model_name, backend=None):
+        attempts.append((model_name, backend))
+        if backend == "onnx":
+            raise RuntimeError("未找到 ONNX 模型")
+        return object(), model_name
+
+    monkeypatch.setattr(kb_module, "load_encoder", fake_load_encoder)
+    kb = KnowledgeBase(embedding_dir=str(tmp_path))
+    assert kb._load_model()
+    assert attempts == [(KnowledgeBase.DEFAULT_EMBEDDING_MODEL, "onnx"), (KnowledgeBase.DEFAULT_EMBEDDING_MODEL, "torch")]
+    assert kb._loaded_model_name == KnowledgeBase.DEFAULT_EMBEDDING_MODEL
@@ -0,0 +1,62 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.knowledge.query_encoder import QueryEncoder
+
+
+class SlowModel:
+    """记录每次 encode 调用的批次"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    def encode(self, texts, show_progress_bar=False):
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("模型异常")
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_query_cache_normalizes_whitespace():
+    model = SlowModel()
+    encoder = QueryEncoder(model, max_wait_ms=0)
+    first = encoder.encode("服务器 选型")
+    assert encoder.encode("  服务器   选型 ") is first
+    assert model.calls == [["服务器 选型"]]
+    assert encoder.stats()["hits"] == 1
+    encoder.close()
+
+
+def test_concurrent_queries_are_coalesced_into_batches():
+    model = SlowModel(delay=0.02)
+    encoder = QueryEncoder(model, cache_size=0, max_batch=8, max_wait_ms=20)
+    results = {}
+
+    def worker(i):
+        results[i] = encoder.encode(f"查询{i % 10}" + "x" * (i % 10))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(results[i][0] == len(f"查询{i % 10}" + "x" * (i % 10)) for i in range(20))
+    assert len(model.calls) < 20
+    assert all(len(batch) <= 8 and len(batch) == len(set(batch)) for batch in model.calls)
+    encoder.close()
+
+
+def test_encode_errors_propagate_to_callers():
+    encoder = QueryEncoder(SlowModel(fail=True), max_wait_ms=0)
+    with pytest.raises(RuntimeError):
+        encoder.encode("服务器")
+    encoder.close()
+    with pytest.raises(RuntimeError):
+        encoder.encode("新查询")
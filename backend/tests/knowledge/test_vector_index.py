@@ -0,0 +1,162 @@
+import numpy as np
+import pytest
+
+from app.knowledge.vector_index import (
+    AUTO_IVF_THRESHOLD, PQ_MIN_TRAIN, RETRAIN_GROWTH, SQ_MIN_TRAIN, FlatIndex, HNSWIndex, IVFIndex, ProductQuantizedIndex,
+    ScalarQuantizedIndex, VectorIndex, create_vector_index, normalize, resolve_index_kind,
+)
+
+
+def _clustered(n=4000, dim=16, topics=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim))
+    return (centers[rng.integers(0, topics, n)] + 0.5 * rng.standard_normal((n, dim))).astype(np.float32)
+
+
+def test_flat_index_returns_cosine_top_k():
+    index = FlatIndex(2)
+    index.add(np.array([[1, 0], [0, 3], [1, 1]], dtype=np.float32))
+    index.add(np.array([-1, 0], dtype=np.float32))
+
+    results = index.search(np.array([2.0, 0.1]), top_k=3)
+    assert [i for i, _ in results] == [0, 2, 1]
+    assert results[0][1] == pytest.approx(0.99875, abs=1e-4)
+    assert len(index.search(np.array([1.0, 0.0]), top_k=10)) == 4
+
+
+def test_ivf_index_matches_flat_with_full_probe_and_recalls_well():
+    vectors = _clustered()
+    flat, ivf = FlatIndex(16), IVFIndex(16, nlist=32, nprobe=4)
+    flat.add(vectors)
+    ivf.add(vectors[:2000])
+    ivf.add(vectors[2000:])
+    assert ivf.is_trained and len(ivf) == len(vectors)
+
+    queries = vectors[:50] + 0.1
+    hits = 0
+    for query in queries:
+        expected = [i for i, _ in flat.search(query, 10)]
+        assert [i for i, _ in ivf.search(query, 10, nprobe=32)] == expected
+        hits += len(set(expected) & {i for i, _ in ivf.search(query, 10)})
+    assert hits / (len(queries) * 10) > 0.9
+
+
+def test_ivf_index_falls_back_to_exact_search_before_training():
+    ivf = IVFIndex(4, nlist=16)
+    ivf.add(np.eye(4, dtype=np.float32))
+    assert not ivf.is_trained
+    assert ivf.search(np.array([0, 0, 1, 0]), 1)[0][0] == 2
+
+
+@pytest.mark.parametrize("build, max_ratio", [
+    (lambda rerank: ScalarQuantizedIndex(16, reranker=rerank), 0.3),
+    (lambda rerank: ProductQuantizedIndex(16, m=8, reranker=rerank), 0.3),
+])
+def test_quantized_indexes_shrink_memory_and_rerank_exactly(build, max_ratio):
+    vectors = _clustered()
+    flat = FlatIndex(16)
+    flat.add(vectors)
+    originals = normalize(vectors)
+    index = build(lambda ids: originals[ids])
+    index.add(vectors)
+    assert index.is_trained and index.nbytes < flat.nbytes * max_ratio
+
+    hits = 0
+    queries = vectors[:50] + 0.1
+    for query in queries:
+        expected = flat.search(query, 10)
+        result = index.search(query, 10)
+        hits += len({i for i, _ in expected} & {i for i, _ in result})
+        # 重排后的分数为精确余弦相似度
+        assert result[0][1] == pytest.approx(float(originals[result[0][0]] @ normalize(query)), abs=1e-5)
+    assert hits / (len(queries) * 10) > 0.9
+
+
+def test_pq_index_exact_before_training_and_retrains_on_growth():
+    vectors = _clustered(n=PQ_MIN_TRAIN * 5)
+    originals = normalize(vectors)
+    index = ProductQuantizedIndex(16, m=4, reranker=lambda ids: originals[ids])
+    index.add(vectors[:100])
+    assert not index.is_trained
+    assert index.search(vectors[5], 1)[0][0] == 5
+
+    index.add(vectors[100:PQ_MIN_TRAIN])
+    assert index.is_trained and index._trained_size == PQ_MIN_TRAIN
+    index.add(vectors[PQ_MIN_TRAIN:])
+    assert index._trained_size == len(vectors) == len(index)
+    assert index.search(vectors[4500], 1)[0][0] == 4500
+
+    with pytest.raises(ValueError):
+        ProductQuantizedIndex(16, m=5)
+
+
+@pytest.mark.parametrize("build, min_recall", [
+    (lambda: ScalarQuantizedIndex(16), 0.9),
+    # 乘积量化不重排时的召回本身有限，这里只确认逐条追加不比整批训练明显变差
+    (lambda: ProductQuantizedIndex(16, m=8), 0.5),
+])
+def test_quantized_indexes_recall_when_added_one_at_a_time_without_reranker(build, min_recall):
+    vectors = _clustered(n=PQ_MIN_TRAIN * RETRAIN_GROWTH + 100)
+    flat, index = FlatIndex(16), build()
+    for vector in vectors:
+        flat.add(vector)
+        index.add(vector)
+    assert index.is_trained and len(index) == len(vectors)
+    # 增长后用解码的近似向量重新训练
+    assert index._trained_size > index.min_train
+
+    hits = 0
+    queries = vectors[:50] + 0.1
+    for query in queries:
+        expected = {i for i, _ in flat.search(query, 5)}
+        hits += len(expected & {i for i, _ in index.search(query, 5)})
+    assert hits / (len(queries) * 5) > min_recall
+
+
+def test_scalar_quantized_index_waits_for_enough_training_vectors():
+    vectors = _clustered(n=SQ_MIN_TRAIN)
+    index = ScalarQuantizedIndex(16)
+    index.add(vectors[:-1])
+    assert not index.is_trained
+    index.add(vectors[-1])
+    assert index.is_trained and index._trained_size == SQ_MIN_TRAIN
+
+
+def test_incomplete_index_fails_at_construction():
+    class Incomplete(VectorIndex):
+        def add(self, vectors):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete(4)
+
+
+def test_index_kind_selection(monkeypatch):
+    monkeypatch.delenv("KNOWLEDGE_VECTOR_INDEX", raising=False)
+    assert resolve_index_kind(None, 10) == "flat"
+    assert resolve_index_kind(None, AUTO_IVF_THRESHOLD) == "ivf"
+    monkeypatch.setenv("KNOWLEDGE_VECTOR_INDEX", "ivf")
+    monkeypatch.setenv("KNOWLEDGE_IVF_NPROBE", "3")
+    assert create_vector_index(8).nprobe == 3
+    monkeypatch.setenv("KNOWLEDGE_VECTOR_INDEX", "pq")
+    monkeypatch.setenv("KNOWLEDGE_PQ_M", "2")
+    assert create_vector_index(8).m == 2
+    assert create_vector_index(512, "pq").m == 2
+    monkeypatch.delenv("KNOWLEDGE_PQ_M")
+    assert create_vector_index(512, "pq").m == 128
+    with pytest.raises(ValueError):
+        resolve_index_kind("annoy")
+
+
+def test_hnsw_index_requires_hnswlib():
+    try:
+        import hnswlib  # noqa: F401
+    except ImportError:
+        with pytest.raises(RuntimeError):
+            HNSWIndex(8)
+        return
+
+    vectors = _clustered(n=500)
+    index = HNSWIndex(16)
+    index.add(vectors)
+    assert index.search(vectors[7], 1)[0][0] == 7
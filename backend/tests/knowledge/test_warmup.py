@@ -0,0 +1,55 @@
+import threading
+
+import numpy as np
+
+from app.knowledge.knowledge_base import KnowledgeBase
+
+
+class FakeModel:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, show_progress_bar=False, **kwargs):
+        self.encoded.extend(texts)
+        return np.array([[len(t), t.count("服务器"), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_keyword_search_serves_until_background_warmup_finishes(tmp_path):
+    kb = KnowledgeBase(embedding_model="fake", embedding_dir=str(tmp_path))
+    gate = threading.Event()
+
+    def slow_load():
+        if not kb._model_loaded:
+            gate.wait(10)
+            kb.model = FakeModel()
+            kb._model_loaded = True
+        return True
+
+    kb._load_model = slow_load
+    assert kb.warmup_enabled and not kb.is_ready()
+
+    # 首个查询触发后台预热，请求本身立即以关键词检索返回
+    results = kb.search("服务器 选型", top_k=2)
+    assert results and kb.warmup_status == "loading"
+    assert kb.vector_index is None
+
+    gate.set()
+    kb._warmup_thread.join(10)
+    assert kb.warmup_status == "ready" and kb.is_ready()
+    assert len(kb.vector_index) == len(kb.documents) == len(kb.bm25)
+    assert kb.warmup_info()["semantic"] is True
+
+    encoded = len(kb.model.encoded)
+    kb.search("服务器 选型", top_k=2)
+    # 预热后只编码查询本身
+    assert kb.model.encoded[encoded:] == ["服务器 选型"]
+    kb.close()
+
+
+def test_failed_warmup_degrades_to_keyword_search(tmp_path):
+    kb = KnowledgeBase(embedding_model="fake", embedding_dir=str(tmp_path))
+    kb._load_model = lambda: False
+
+    assert kb.warm_up() is False
+    assert kb.warmup_status == "failed" and kb.is_ready()
+    assert kb.search("合同 条款", top_k=1)
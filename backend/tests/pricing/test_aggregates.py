@@ -0,0 +1,59 @@
+import math
+
+from app.agents.price_reference import PriceReference
+from app.pricing.aggregates import CategoryAggregates
+from app.pricing.columns import PriceColumns
+from app.pricing.store import MemoryPriceStore
+
+
+def _record(category, name, date, price):
+    return {"category": category, "name": name, "specs": "", "date": date, "price": price}
+
+
+def test_incremental_aggregates_match_rebuild():
+    base = [
+        _record("服务器", "A", "2024-01", 100.0),
+        _record("服务器", "A", "2024-02", 110.0),
+        _record("服务器", "B", "2024-01", 300.0),
+        _record("终端", "C", "2024-02", 50.0),
+    ]
+    extra = [
+        _record("服务器", "B", "2024-03", 330.0),
+        _record("服务器", "B", "2024-03", 340.0),  # 同日期保留先写入的一条
+        _record("显示", "D", "2024-03", 80.0),
+    ]
+
+    original = CategoryAggregates.from_columns(PriceColumns.from_records(base), version=1)
+    incremental = original.with_records(extra, version=2)
+    rebuilt = CategoryAggregates.from_columns(PriceColumns.from_records(base + extra))
+
+    assert list(incremental.categories) == list(rebuilt.categories) == ["服务器", "终端", "显示"]
+    for name, agg in rebuilt.categories.items():
+        other = incremental.categories[name]
+        assert (other.count, other.min_price, other.max_price) == (agg.count, agg.min_price, agg.max_price)
+        assert other.latest == agg.latest
+        assert other.monthly_means() == agg.monthly_means()
+        assert math.isclose(other.slope(), agg.slope())
+
+    # 原聚合不受影响，未变化的分类共享同一对象
+    assert incremental.version == 2 and original.version == 1
+    assert list(original.categories) == ["服务器", "终端"]
+    assert original.categories["服务器"].count == 3 and original.categories["服务器"].latest["B"][1] == 300.0
+    assert incremental.categories["终端"] is original.categories["终端"]
+
+    servers = rebuilt.categories["服务器"]
+    assert servers.latest == {"A": (servers.latest["A"][0], 110.0), "B": (servers.latest["B"][0], 330.0)}
+    assert servers.monthly_means() == {"2024-01": 200.0, "2024-02": 110.0, "2024-03": 335.0}
+
+
+def test_market_insights_follow_appended_prices():
+    records = [_record("终端", "升腾 C92", f"2024-{m:02d}", 2300.0) for m in range(1, 4)]
+    reference = PriceReference(MemoryPriceStore(records))
+    assert reference.get_market_insights()["insights"][0]["insight"] == "终端类产品价格稳定"
+
+    reference.append_prices([_record("终端", "升腾 C92", f"2024-{m:02d}", 2300.0 * (1 + 0.2 * (m - 3)))
+                             for m in range(4, 7)])
+    result = reference.get_market_insights("终端")
+    assert result["categories"]["终端"]["avg_price"] == 3680.0
+    assert result["insights"][0]["insight"] == "终端类产品价格呈上升趋势，建议尽早采购"
+    assert reference.aggregates.version == reference.data_version
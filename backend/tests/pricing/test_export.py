@@ -0,0 +1,67 @@
+import io
+
+import numpy as np
+import pytest
+
+from app.pricing.columns import PriceColumns
+from app.pricing import export
+from app.pricing.export import export_chunks, resolve_format
+
+
+def _columns():
+    return PriceColumns.from_records([
+        {"category": "服务器", "name": "A", "specs": "2U", "date": "2024-02", "price": 200.0, "source": "平台"},
+        {"category": "服务器", "name": "A", "specs": "2U", "date": "2024-01", "price": 100.0, "source": "平台"},
+        {"category": "终端", "name": "B", "specs": "", "date": "2024-01-15", "price": 50.0, "source": "报价"},
+    ])
+
+
+def test_npz_export_streams_in_chunks_and_round_trips():
+    columns = _columns()
+    chunks = list(export_chunks(columns, np.arange(len(columns)), "npz", chunk_rows=1))
+    assert len(chunks) > 3
+
+    data = np.load(io.BytesIO(b"".join(chunks)))
+    assert data["price"].tolist() == [100.0, 200.0, 50.0]
+    assert data["day"].tolist() == columns.day.tolist()
+    assert data["product_name"][data["product_id"]].tolist() == ["A", "A", "B"]
+    assert data["categories"][data["category_id"]].tolist() == ["服务器", "服务器", "终端"]
+    assert data["sources"].tolist() == ["平台", "报价"]
+
+
+def test_npz_export_of_selected_rows():
+    columns = _columns()
+    data = np.load(io.BytesIO(b"".join(export_chunks(columns, columns.rows([1]), "npz"))))
+    assert data["price"].tolist() == [50.0]
+
+
+def test_abandoned_export_closes_buffer(monkeypatch):
+    sinks = []
+
+    class RecordingSink(export._ChunkSink):
+        def __init__(self):
+            super().__init__()
+            sinks.append(self)
+
+    monkeypatch.setattr(export, "_ChunkSink", RecordingSink)
+    columns = _columns()
+    stream = export_chunks(columns, np.arange(len(columns)), "npz", chunk_rows=1)
+    next(stream)
+    # 客户端断开时 StreamingResponse 关闭生成器
+    stream.close()
+    assert sinks[0].closed and sinks[0].drain() == b""
+
+
+def test_resolve_format():
+    assert resolve_format("npz") == "npz"
+    with pytest.raises(ValueError):
+        resolve_format("xlsx")
+
+
+def test_arrow_export_round_trips():
+    pa = pytest.importorskip("pyarrow")
+    columns = _columns()
+    data = b"".join(export_chunks(columns, np.arange(len(columns)), "arrow", chunk_rows=2))
+    table = pa.ipc.open_stream(data).read_all()
+    assert table.column("name").to_pylist() == ["A", "A", "B"]
+    assert table.column("price").to_pylist() == [100.0, 200.0, 50.0]
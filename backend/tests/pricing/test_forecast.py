@@ -0,0 +1,60 @@
+import math
+
+import numpy as np
+
+from app.pricing.columns import PriceColumns
+from app.pricing.forecast import ForecastTable, fit_series
+
+
+def _reference_fit(values):
+    n = len(values)
+    x_mean = (n - 1) / 2
+    y_mean = sum(values) / n
+    slope = sum((i - x_mean) * (v - y_mean) for i, v in enumerate(values)) / sum((i - x_mean) ** 2 for i in range(n))
+    intercept = y_mean - slope * x_mean
+    std = math.sqrt(sum((v - intercept - slope * i) ** 2 for i, v in enumerate(values)) / (n - 2))
+
+    period = min(4, n // 2)
+    moving_avg = [sum(values[i - period + 1:i + 1]) / period for i in range(period - 1, n)]
+    ratios = [values[i + period - 1] / avg for i, avg in enumerate(moving_avg)]
+    seasonality = [r / (sum(ratios) / len(ratios)) for r in ratios]
+    return slope, intercept, std, seasonality
+
+
+def test_fit_series_matches_per_series_formulas():
+    series = [
+        [100.0, 104.0, 99.0, 110.0, 108.0, 115.0],
+        [50.0, 48.0, 47.5, 45.0, 46.0, 44.0],
+    ]
+    fit = fit_series(np.array(series))
+
+    for i, values in enumerate(series):
+        slope, intercept, std, seasonality = _reference_fit(values)
+        assert math.isclose(fit["slope"][i], slope)
+        assert math.isclose(fit["intercept"][i], intercept)
+        assert math.isclose(fit["std"][i], std)
+        assert np.allclose(fit["seasonality"][i][:fit["season_len"][i]], seasonality)
+
+
+def test_forecast_table_groups_products_of_different_lengths():
+    records = []
+    for month in range(1, 7):
+        records.append({"category": "服务器", "name": "A", "date": f"2024-{month:02d}", "price": 1000 + 100 * month})
+    for month in range(1, 4):
+        records.append({"category": "终端", "name": "B", "date": f"2024-{month:02d}", "price": 500.0})
+    records.append({"category": "终端", "name": "C", "date": "2024-01", "price": 800.0})
+
+    table = ForecastTable(PriceColumns.from_records(records))
+    groups = table.groups_for([0, 1, 2])
+    assert [table.names[g] for g in groups] == ["A", "B"]
+
+    a, b = table.predict(groups, 2)
+    assert a["trend_direction"] == "上升" and a["trend_strength"] == "强"
+    assert [p["date"] for p in a["predictions"]] == ["2024-07", "2024-08"]
+    slope, intercept, _, seasonality = _reference_fit([1000.0 + 100 * m for m in range(1, 7)])
+    expected = (intercept + slope * 6) * seasonality[6 % len(seasonality)]
+    assert a["predictions"][0]["predicted_price"] == round(expected, 2)
+    # 完全线性的序列残差为 0，置信区间收缩为预测值
+    assert a["predictions"][0]["lower_bound"] == a["predictions"][0]["upper_bound"] == round(expected, 2)
+    assert b["trend_direction"] == "稳定"
+    assert b["predictions"][1]["predicted_price"] == 500.0
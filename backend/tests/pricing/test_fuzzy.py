@@ -0,0 +1,31 @@
+from app.agents.price_reference import PriceReference
+from app.pricing.fuzzy import FuzzyMatcher, trigrams
+
+
+def test_trigrams_split_ascii_and_cjk_runs():
+    assert trigrams("R750服务器") == {"#r7", "r75", "750", "50#", "#服务", "服务器", "务器#"}
+
+
+def test_fuzzy_matcher_ranks_name_over_specs():
+    matcher = FuzzyMatcher()
+    matcher.add(0, "Dell PowerEdge R750", "服务器", "2U机架式, 256GB RAM")
+    matcher.add(1, "Dell PowerEdge T350", "服务器", "塔式服务器, R750兼容导轨")
+    matcher.add(2, "HP Z4 G4", "工作站", "RTX A5000")
+
+    results = matcher.search("R750服务器", top_k=3)
+    assert [doc_id for doc_id, _ in results[:2]] == [0, 1]
+    assert results[0][1] > results[1][1]
+    assert matcher.search("苹果手机") == []
+
+
+def test_price_analysis_falls_back_to_fuzzy_match():
+    reference = PriceReference()
+
+    result = reference.analyze_price("R750服务器", 60000)
+    assert result["matched_product"] == "Dell PowerEdge R750"
+    assert result["match_score"] >= 0.5
+    assert result["reference_price"] > 0
+
+    missing = reference.analyze_price("苹果手机", 5000)
+    assert missing["analysis"] == "未找到参考价格数据"
+    assert missing["candidates"] == []
@@ -0,0 +1,52 @@
+from app.agents.price_reference import PriceReference
+from app.pricing.store import MemoryPriceStore
+
+
+def test_prediction_cache_is_invalidated_by_new_prices():
+    records = [
+        {"category": "终端", "name": "HP EliteBook 840 G9", "date": f"2024-{m:02d}", "price": 7500 + m}
+        for m in range(1, 7)
+    ]
+    reference = PriceReference(MemoryPriceStore(records))
+
+    first = reference.predict_price("EliteBook", 2)
+    # 命中同一产品集合的不同关键词共享缓存，但返回各自的关键词
+    second = reference.predict_price("840", 2)
+    assert second["keyword"] == "840"
+    assert second["predictions"] == first["predictions"]
+    assert reference.cache_stats()["hits"] == 1
+
+    reference.append_prices([{"category": "终端", "name": "HP EliteBook 840 G9", "date": "2024-07", "price": 6000}])
+    third = reference.predict_price("EliteBook", 2)
+    assert third["predictions"][0]["predictions"][0]["date"] == "2024-08"
+    stats = reference.cache_stats()
+    assert stats["hits"] == 1 and stats["invalidations"] == 1
+
+
+def test_prediction_cache_returns_copies_and_skips_failures(monkeypatch):
+    records = [
+        {"category": "终端", "name": "HP EliteBook 840 G9", "date": f"2024-{m:02d}", "price": 7500 + m}
+        for m in range(1, 7)
+    ]
+    reference = PriceReference(MemoryPriceStore(records))
+
+    first = reference.predict_price("EliteBook", 2)
+    expected = first["predictions"][0]["predictions"][0]["predicted_price"]
+    first["predictions"][0]["predictions"].clear()
+    second = reference.predict_price("EliteBook", 2)
+    second["predictions"].clear()
+    # 调用方修改返回值不影响缓存
+    third = reference.predict_price("EliteBook", 2)
+    assert third["predictions"][0]["predictions"][0]["predicted_price"] == expected
+    assert reference.cache_stats()["hits"] == 2
+
+    calls = []
+
+    def failing(product_ids, keyword, months_ahead):
+        calls.append(keyword)
+        return {"success": False, "message": "无法生成有效预测", "predictions": []}
+
+    monkeypatch.setattr(reference, "_predict_products", failing)
+    reference.predict_price("EliteBook", 4)
+    reference.predict_price("EliteBook", 4)
+    assert calls == ["EliteBook", "EliteBook"]
@@ -0,0 +1,56 @@
+from app.pricing.columns import PriceColumns
+from app.pricing.index import NGramIndex, PriceIndex
+
+
+def _record(category, name, specs, date, price):
+    return {"category": category, "name": name, "specs": specs, "date": date, "price": price}
+
+
+def test_ngram_index_matches_substring_semantics():
+    index = NGramIndex()
+    texts = ["Dell PowerEdge R750", "HP ProLiant DL380", "浪潮英信 NF5280M6", "Dell Precision 3660"]
+    for doc_id, text in enumerate(texts):
+        index.add(doc_id, text)
+
+    for keyword in ["dell", "R7", "e", "英信", "poweredge r", "precision", "gen10", "ld"]:
+        expected = {i for i, t in enumerate(texts) if keyword.lower() in t.lower()}
+        assert index.search(keyword) == expected, keyword
+
+
+def test_price_index_buckets_and_search():
+    products = [
+        {"category": "服务器", "name": "Dell PowerEdge R750", "specs": "2U机架式"},
+        {"category": "工作站", "name": "HP Z4 G4", "specs": "RTX A5000"},
+        {"category": "服务器", "name": "HP Z4 G4", "specs": "塔式"},
+    ]
+    index = PriceIndex(products)
+
+    assert index.category_names() == ["工作站", "服务器"]
+    assert index.product_ids("服务器") == [0, 2]
+    assert index.search("机架", fields=("specs",)) == [0]
+    assert index.search("dell", category="工作站") == []
+    assert index.search_categories("工作") == [1]
+    assert index.ids_by_name("HP Z4 G4") == [1, 2]
+
+
+def test_price_columns_slices_latest_and_monthly_means():
+    records = [
+        _record("服务器", "Dell PowerEdge R750", "2U机架式", "2024-03", 70000),
+        _record("工作站", "HP Z4 G4", "RTX A5000", "2024-01", 45000),
+        _record("服务器", "Dell PowerEdge R750", "2U机架式", "2024-01", 68000),
+        _record("工作站", "HP Z4 G4", "RTX A5000", "2024-03", 47000),
+        _record("服务器", "Dell PowerEdge R750", "2U机架式", "2024-03", 71000),
+    ]
+    columns = PriceColumns.from_records(records)
+
+    rows = columns.rows([0])
+    assert [r["date"] for r in columns.records(rows)] == ["2024-01-01", "2024-03-01", "2024-03-01"]
+
+    # 同月多条记录时取最先出现的一条
+    latest = columns.records(columns.latest_rows(columns.rows([0, 1])))
+    assert [(r["name"], r["price"]) for r in latest] == [("Dell PowerEdge R750", 70000), ("HP Z4 G4", 47000)]
+
+    months, means = columns.monthly_means(columns.rows([1, 0]))
+    assert months == ["2024-01", "2024-03"]
+    assert list(means) == ["工作站", "服务器"]
+    assert means["服务器"] == {"2024-01": 68000, "2024-03": 70500}
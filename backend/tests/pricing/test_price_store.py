@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+from app.agents.price_reference import PriceReference, generate_price_history
+from app.pricing.store import MemoryPriceStore, PriceStore, SQLitePriceStore, create_price_store
+
+
+def _record(category, name, date, price, source="供应商报价"):
+    return {"category": category, "name": name, "specs": "", "date": date, "price": price, "source": source}
+
+
+def test_sqlite_store_append_load_and_version(tmp_path):
+    store = SQLitePriceStore(str(tmp_path / "prices.db"))
+    assert store.version == 0
+
+    store.append([
+        _record("服务器", "Dell PowerEdge R750", "2024-03-15", 70000),
+        _record("工作站", "HP Z4 G4", "2024-01", 45000),
+        _record("服务器", "Dell PowerEdge R750", "2024-01-02", 68000),
+    ])
+    store.append([_record("服务器", "Dell PowerEdge R750", "2024-04-01", 69000, "政府采购网")])
+    assert store.version == 2
+
+    indexes = {row[1] for row in store._conn.execute("PRAGMA index_list('prices')")}
+    assert {"ix_prices_product_day", "ix_prices_category_day"} <= indexes
+
+    version, columns = store.load_snapshot()
+    assert version == 2 and not store._conn.in_transaction
+    assert len(columns) == 4
+    assert [p["name"] for p in columns.products] == ["Dell PowerEdge R750", "HP Z4 G4"]
+    history = columns.records(columns.rows([0]))
+    assert [(r["date"], r["price"]) for r in history] == [
+        ("2024-01-02", 68000), ("2024-03-15", 70000), ("2024-04-01", 69000)
+    ]
+    assert history[-1]["source"] == "政府采购网"
+    store.close()
+
+
+def test_sqlite_store_csv_import_feeds_price_reference(tmp_path):
+    csv_path = tmp_path / "prices.csv"
+    csv_path.write_text(
+        "category,name,specs,date,price,source\n"
+        "显示,飞利浦 275E1S,27英寸,2024-01-05,1500,采购平台\n"
+        "显示,飞利浦 275E1S,27英寸,2024-02-05,1450,采购平台\n",
+        encoding="utf-8"
+    )
+    store = create_price_store(f"sqlite:///{tmp_path / 'prices.db'}")
+    assert store.import_csv(csv_path, batch_size=1) == 2
+
+    reference = PriceReference(store)
+    assert reference.get_price_by_name("飞利浦")["product"]["price"] == 1450
+
+    # 增量追加后查询自动看到新数据
+    reference.append_prices([_record("显示", "AOC U34P2C", "2024-02-10", 3800)])
+    assert reference.query_price(category="显示")["total"] == 2
+    reference.close()
+
+
+def test_memory_store_seeded_history_is_reproducible():
+    assert generate_price_history() == generate_price_history()
+    first = PriceReference(MemoryPriceStore(generate_price_history()))
+    second = PriceReference()
+    assert first.query_price()["records"] == second.query_price()["records"]
+
+
+def test_concurrent_writers_allocate_distinct_ids(tmp_path):
+    path = str(tmp_path / "prices.db")
+    # 每个存储有独立连接，模拟多个 worker 进程
+    stores = [SQLitePriceStore(path) for _ in range(4)]
+    errors = []
+
+    def write(worker, store):
+        try:
+            for batch in range(10):
+                store.append([_record(f"分类{worker}", f"产品{worker}-{batch}", "2024-01", 100),
+                              _record("共享分类", f"共享产品{batch}", "2024-01", 100, f"来源{worker}")])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(i, store)) for i, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    columns = stores[0].load_columns()
+    assert len(columns) == 80
+    assert len(columns.products) == 50 and len(columns.categories) == 5 and len(columns.sources) == 5
+    products = {(p["category"], p["name"]) for p in columns.products}
+    assert len(products) == 50
+    assert {r["name"] for r in columns.records(range(len(columns)))} == {name for _, name in products}
+    for store in stores:
+        store.close()
+
+
+def test_incomplete_store_fails_at_construction():
+    class Incomplete(PriceStore):
+        def load_columns(self):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,62 @@
+import pytest
+
+from app.pricing.quotes import analyze_quote_lines, parse_quote_csv
+
+
+def test_analyze_quote_lines_resolves_each_name_once():
+    calls = []
+
+    def resolve(name):
+        calls.append(name)
+        if name == "未知设备":
+            return None
+        return {"reference_price": 1000.0, "matched_product": name, "match_score": None}
+
+    items = [
+        {"product_name": "A", "quoted_price": 1100, "quantity": 2, "supplier": "甲"},
+        {"product_name": "A", "quoted_price": 850, "quantity": 1, "supplier": "乙"},
+        {"product_name": "未知设备", "quoted_price": 500, "quantity": 1, "supplier": "乙"},
+    ]
+    result = analyze_quote_lines(items, resolve)
+
+    assert calls == ["A", "未知设备"]
+    assert [line["assessment"] for line in result["lines"]] == ["报价合理", "报价偏低", "未找到参考价格"]
+    assert result["package"]["quoted_total"] == 3050
+    assert result["package"]["reference_total"] == 3000
+    assert result["package"]["quoted_total_all"] == 3550
+    assert result["package"]["matched_lines"] == 2
+    assert result["suppliers"]["甲"]["difference_percent"] == 10.0
+    assert result["suppliers"]["乙"]["difference_percent"] == -15.0
+    assert result["unmatched"] == ["未知设备"]
+
+
+def test_parse_quote_csv_accepts_chinese_headers():
+    content = "﻿序号,产品名称,报价,数量,供应商\n1,Dell PowerEdge R750,70000,2,供应商A\n2,,1,1,\n".encode("utf-8")
+    assert parse_quote_csv(content) == [{
+        "product_name": "Dell PowerEdge R750", "quoted_price": 70000.0, "quantity": 2.0,
+        "supplier": "供应商A", "line_id": "1",
+    }]
+
+    with pytest.raises(ValueError):
+        parse_quote_csv("name,qty\nA,1\n".encode("utf-8"))
+    with pytest.raises(ValueError):
+        parse_quote_csv("name,price\nA,abc\n".encode("utf-8"))
+    with pytest.raises(ValueError):
+        parse_quote_csv("name,price\nA,1\nB,2\n".encode("utf-8"), max_lines=1)
+    # 价格为 0 合法（与 QuoteLine 的 ge=0 一致）
+    assert parse_quote_csv(b"name,price\nA,0\n")[0]["quoted_price"] == 0.0
+
+
+@pytest.mark.parametrize("row, message", [
+    ("A,nan", "第 2 行报价无效"),
+    ("A,inf", "第 2 行报价无效"),
+    ("A,-1", "第 2 行报价无效"),
+    ("A,100,-3", "第 2 行数量无效"),
+    ("A,100,0", "第 2 行数量无效"),
+    ("A,100,inf", "第 2 行数量无效"),
+    ("A,100,1,B,extra", "第 2 行字段数多于表头"),
+])
+def test_parse_quote_csv_rejects_values_quote_line_would_reject(row, message):
+    content = f"name,price,qty,supplier\n{row}\n".encode("utf-8")
+    with pytest.raises(ValueError, match=message):
+        parse_quote_csv(content)
@@ -0,0 +1,41 @@
+from app.agents.price_reference import PriceReference
+from app.pricing.specs import SpecIndex, parse_specs
+
+
+def test_parse_specs_extracts_numeric_features():
+    assert parse_specs("2U机架式, 2×Intel Xeon Gold 6348, 256GB RAM, 4×2.4TB SAS") == {
+        "cpu_count": 2, "memory_gb": 256.0, "storage_tb": 9.6
+    }
+    assert parse_specs("Intel Xeon W-3345, 128GB DDR4, RTX A5000 24GB, 4TB NVMe + 8TB HDD") == {
+        "cpu_count": 1, "memory_gb": 128.0, "gpu_count": 1, "gpu_memory_gb": 24.0, "storage_tb": 12.0
+    }
+    # 需求文本：数量词、每颗核数、中文单位与一段内多个容量
+    assert parse_specs("CPU：2颗Intel至强金牌，每颗不少于24核，内存16G 硬盘2T") == {
+        "cpu_count": 2, "cpu_cores": 48, "memory_gb": 16.0, "storage_tb": 2.0
+    }
+    # GPU 数量词：卡 / ×
+    assert parse_specs("8卡A100 80GB") == {"gpu_count": 8, "gpu_memory_gb": 640.0}
+    assert parse_specs("8 × H100 80GB") == {"gpu_count": 8, "gpu_memory_gb": 640.0}
+    assert parse_specs("98英寸4K电视, 120Hz刷新") == {}
+
+
+def test_spec_index_ranks_closest_configuration():
+    index = SpecIndex()
+    index.add(0, "2×Intel Xeon Gold 6348, 256GB RAM, 4×2.4TB SAS")
+    index.add(1, "2×Intel Xeon Silver 4310, 96GB RAM, 6×1.8TB SAS")
+    index.add(2, "Intel i7-1355U, 16GB DDR5, 512GB SSD")
+
+    results = index.search({"memory_gb": 192, "storage_tb": 9.6}, top_k=2)
+    assert [product_id for product_id, _ in results] == [0, 1]
+    assert index.search({"gpu_count": 1}, top_k=1)[0][1] < 0.6  # 均缺失 GPU 特征
+    assert index.search({}, top_k=1) == []
+
+
+def test_find_similar_derives_price_reference_from_requirement():
+    reference = PriceReference()
+    result = reference.find_similar("内存不少于256GB，硬盘4块2.4TB SAS", category="服务器", top_k=3)
+
+    assert result["query_features"] == {"memory_gb": 256.0, "storage_tb": 9.6}
+    assert result["matches"][0]["name"] == "Dell PowerEdge R750"
+    assert all(m["category"] == "服务器" for m in result["matches"])
+    assert result["price_reference"]["min"] <= result["price_reference"]["weighted_avg"] <= result["price_reference"]["max"]
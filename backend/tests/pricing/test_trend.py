@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from app.pricing.columns import PriceColumns, date_to_day, day_to_date
+from app.pricing.trend import TrendRollups, bucket_keys, bucket_label, lttb
+
+
+def _daily_columns(days=400):
+    records = []
+    for p, category in enumerate(["服务器", "服务器", "网络设备"]):
+        for d in range(days):
+            records.append({"category": category, "name": f"P{p}", "specs": "",
+                            "date": day_to_date(date_to_day("2024-01-01") + d), "price": 100.0 * (p + 1) + d})
+    return PriceColumns.from_records(records)
+
+
+def test_bucket_keys_and_labels():
+    days = np.array([date_to_day(d) for d in ("2024-01-01", "2024-01-07", "2024-01-08", "2024-05-20")])
+    weeks = bucket_keys(days, "week")
+    assert weeks[0] == weeks[1] != weeks[2]
+    assert bucket_label(int(weeks[2]), "week") == "2024-01-08"
+    assert [bucket_label(int(k), "quarter") for k in bucket_keys(days, "quarter")] == ["2024-Q1"] * 3 + ["2024-Q2"]
+    with pytest.raises(ValueError):
+        bucket_keys(days, "year")
+
+
+def test_date_to_day_rejects_malformed_dates():
+    assert date_to_day("2024-03") == date_to_day("2024-03-01") == date_to_day("2024-03-01T08:00:00")
+    for value in ("2024", "2024-13", "2024-02-30", "2024-03-", "", "20240301"):
+        with pytest.raises(ValueError, match="日期格式无效"):
+            date_to_day(value)
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(100)
+    y = np.zeros(100)
+    y[37] = 50
+    selected = lttb(x, y, 10)
+    assert len(selected) == 10
+    assert selected[0] == 0 and selected[-1] == 99
+    assert 37 in selected
+    assert lttb(x[:5], y[:5], 10) == [0, 1, 2, 3, 4]
+
+
+def test_trend_series_aggregates_buckets_and_ranges():
+    trends = TrendRollups(_daily_columns())
+
+    series = trends.series([0, 1, 2], bucket="month", start="2024-02", end="2024-03-15")
+    assert [s["name"] for s in series] == ["服务器", "网络设备"]
+    february = series[0]["points"][0]
+    assert february["date"] == "2024-02"
+    assert february["count"] == 2 * 29
+    assert february["min"] == 100 + 31 and february["max"] == 200 + 59
+    assert [p["date"] for p in series[1]["points"]] == ["2024-02", "2024-03"]
+
+    weekly = trends.series([0], bucket="week", group_by="product", max_points=20)
+    assert weekly[0]["name"] == "P0"
+    assert weekly[0]["total_points"] == 58
+    assert len(weekly[0]["points"]) == 20
+    assert weekly[0]["points"][0]["date"] == "2024-01-01"
+    assert trends.series([], bucket="quarter") == []